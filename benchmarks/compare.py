@@ -0,0 +1,40 @@
+# benchmarks/compare.py
+# Compara dois JSON de benchmarks/run.py (mediana): razão > 1 = ficou mais lento.
+#
+# Uso: python -m benchmarks.compare antes.json depois.json [--threshold 1.10]
+from pathlib import Path
+import argparse
+import json
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("before", type=Path)
+    ap.add_argument("after", type=Path)
+    ap.add_argument("--threshold", type=float, default=1.10, help="marca regressões acima desta razão")
+    args = ap.parse_args()
+
+    a = json.loads(args.before.read_text(encoding="utf-8"))
+    b = json.loads(args.after.read_text(encoding="utf-8"))
+    print(f"antes:  {a['meta']['commit']} ({a['meta']['rows']} linhas)")
+    print(f"depois: {b['meta']['commit']} ({b['meta']['rows']} linhas)\n")
+
+    regressions = 0
+    print(f"{'benchmark':34s} {'antes (ms)':>12s} {'depois (ms)':>12s} {'razão':>7s}")
+    for name in sorted(set(a["results"]) | set(b["results"])):
+        ra, rb = a["results"].get(name), b["results"].get(name)
+        if ra is None or rb is None:
+            fa = "—" if ra is None else f"{ra['median_s'] * 1e3:.2f}"
+            fb = "—" if rb is None else f"{rb['median_s'] * 1e3:.2f}"
+            print(f"{name:34s} {fa:>12s} {fb:>12s}")
+            continue
+        ratio = rb["median_s"] / ra["median_s"] if ra["median_s"] else float("inf")
+        flag = "  <-- regressão" if ratio > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{name:34s} {ra['median_s'] * 1e3:12.2f} {rb['median_s'] * 1e3:12.2f} {ratio:7.2f}{flag}")
+
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/loadtest.py
+# Teste de carga da API de ingestão: dispara /collect e /backfill concorrentes
+# e reporta latência p50/p95/p99, throughput e contenção de escrita no DuckDB
+# (respostas 500 com conflito/lock de transação).
+# Use com a API apontando para o stub (benchmarks/openmeteo_stub.py) para não
+# depender da Open-Meteo real; varie os workers do uvicorn para dimensionar.
+#
+# Uso:
+#   python -m benchmarks.loadtest --api http://127.0.0.1:8000 \
+#       --concurrency 16 --requests 400 --backfill-ratio 0.1 --locations 13 --out load.json
+from pathlib import Path
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from benchmarks.synth import make_locations
+
+CONTENTION_MARKERS = ("conflict", "lock", "could not set lock", "transaction")
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _one(api: str, kind: str, lat: float, lon: float, backfill_days: int) -> dict:
+    t0 = time.perf_counter()
+    try:
+        if kind == "collect":
+            r = _session().get(
+                f"{api}/collect", params={"latitude": lat, "longitude": lon, "past_hours": 6}, timeout=120
+            )
+        else:
+            r = _session().post(
+                f"{api}/backfill", params={"latitude": lat, "longitude": lon, "days": backfill_days}, timeout=300
+            )
+        status, body = r.status_code, r.text
+    except Exception as e:
+        status, body = 0, str(e)
+    dt = time.perf_counter() - t0
+
+    contention = status == 500 and any(m in body.lower() for m in CONTENTION_MARKERS)
+    inserted = 0
+    if status == 200:
+        try:
+            inserted = int(json.loads(body).get("inserted_rows", 0))
+        except Exception:
+            pass
+    return {"kind": kind, "status": status, "latency_s": dt, "contention": contention, "inserted": inserted}
+
+
+def _stats(rows: list, wall_s: float) -> dict:
+    lat = np.array([r["latency_s"] for r in rows]) if rows else np.array([0.0])
+    ok = [r for r in rows if r["status"] == 200]
+    return {
+        "requests": len(rows),
+        "ok": len(ok),
+        "errors": len(rows) - len(ok),
+        "write_contention_errors": sum(r["contention"] for r in rows),
+        "inserted_rows": sum(r["inserted"] for r in rows),
+        "p50_ms": float(np.percentile(lat, 50) * 1e3),
+        "p95_ms": float(np.percentile(lat, 95) * 1e3),
+        "p99_ms": float(np.percentile(lat, 99) * 1e3),
+        "max_ms": float(lat.max() * 1e3),
+        "throughput_rps": len(rows) / wall_s if wall_s else 0.0,
+    }
+
+
+def run(api: str, concurrency: int, n_requests: int, backfill_ratio: float,
+        n_locations: int, backfill_days: int, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    locs = make_locations(n_locations, seed)
+    plan = [
+        ("backfill" if rng.random() < backfill_ratio else "collect", *rng.choice(locs))
+        for _ in range(n_requests)
+    ]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        rows = list(pool.map(lambda p: _one(api, p[0], p[1], p[2], backfill_days), plan))
+    wall = time.perf_counter() - t0
+
+    return {
+        "config": {
+            "api": api,
+            "concurrency": concurrency,
+            "requests": n_requests,
+            "backfill_ratio": backfill_ratio,
+            "locations": n_locations,
+            "backfill_days": backfill_days,
+        },
+        "wall_s": wall,
+        "all": _stats(rows, wall),
+        "collect": _stats([r for r in rows if r["kind"] == "collect"], wall),
+        "backfill": _stats([r for r in rows if r["kind"] == "backfill"], wall),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--api", default="http://127.0.0.1:8000")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--backfill-ratio", type=float, default=0.1)
+    ap.add_argument("--backfill-days", type=int, default=30)
+    ap.add_argument("--locations", type=int, default=13)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+
+    report = run(args.api, args.concurrency, args.requests, args.backfill_ratio,
+                 args.locations, args.backfill_days, args.seed)
+
+    for k in ("all", "collect", "backfill"):
+        s = report[k]
+        if not s["requests"]:
+            continue
+        print(
+            f"{k:9s} n={s['requests']:5d} ok={s['ok']:5d} err={s['errors']:4d} "
+            f"lock={s['write_contention_errors']:4d}  p50={s['p50_ms']:8.1f}ms "
+            f"p95={s['p95_ms']:8.1f}ms p99={s['p99_ms']:8.1f}ms  {s['throughput_rps']:.1f} req/s"
+        )
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[OK] resultados salvos em {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/openmeteo_stub.py
+# Stub local da Open-Meteo (forecast + archive) para testar a ingestão offline.
+# - sintetiza o payload com benchmarks/synth.py (determinístico por lat/lon)
+#   ou reproduz JSONs gravados (STUB_REPLAY_DIR/forecast.json, archive.json)
+# - latência e taxa de erro ajustáveis por variável de ambiente:
+#     STUB_LATENCY_MS   latência média (padrão 50)
+#     STUB_JITTER_MS    desvio padrão da latência (padrão 20)
+#     STUB_ERROR_RATE   fração de respostas 503 (padrão 0.0)
+#     STUB_REPLAY_DIR   diretório com JSONs gravados (opcional)
+#
+# Uso:
+#   uvicorn benchmarks.openmeteo_stub:app --port 8099
+#   OPEN_METEO_FORECAST_URL=http://127.0.0.1:8099/v1/forecast \
+#   OPEN_METEO_ARCHIVE_URL=http://127.0.0.1:8099/v1/archive \
+#   uvicorn src.ingestion.api:app --port 8000
+from pathlib import Path
+import asyncio
+import json
+import os
+import random
+import zlib
+from typing import Optional
+
+import pandas as pd
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+from benchmarks.synth import synth_location
+
+LATENCY_MS = float(os.environ.get("STUB_LATENCY_MS", "50"))
+JITTER_MS = float(os.environ.get("STUB_JITTER_MS", "20"))
+ERROR_RATE = float(os.environ.get("STUB_ERROR_RATE", "0.0"))
+REPLAY_DIR = os.environ.get("STUB_REPLAY_DIR")
+
+# nomes antigos que a API real às vezes devolve (exercita o fallback de _json_to_df)
+ALIASES = {"relative_humidity_2m": "relativehumidity_2m", "wind_speed_10m": "windspeed_10m"}
+
+app = FastAPI(title="Open-Meteo stub", version="1.0.0")
+stats = {"requests": 0, "errors": 0}
+
+
+async def _delay_or_fail() -> Optional[JSONResponse]:
+    stats["requests"] += 1
+    delay = max(0.0, random.gauss(LATENCY_MS, JITTER_MS)) / 1000
+    await asyncio.sleep(delay)
+    if random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse(status_code=503, content={"error": True, "reason": "stub: erro injetado"})
+    return None
+
+
+def _replay(kind: str) -> Optional[dict]:
+    if not REPLAY_DIR:
+        return None
+    path = Path(REPLAY_DIR) / f"{kind}.json"
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+
+
+def _payload(lat: float, lon: float, start: pd.Timestamp, hours: int, hourly: str) -> dict:
+    seed = zlib.crc32(f"{lat:.4f},{lon:.4f}".encode())
+    df = synth_location(lat, lon, start, hours, seed)
+    out = {"time": df["ts"].dt.strftime("%Y-%m-%dT%H:%M").tolist()}
+    for var in filter(None, hourly.split(",")):
+        if var in df.columns:
+            out[ALIASES.get(var, var) if seed % 2 else var] = df[var].tolist()
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": "GMT",
+        "timezone_abbreviation": "GMT",
+        "hourly": out,
+    }
+
+
+@app.get("/v1/forecast")
+async def forecast(
+    latitude: float = Query(...),
+    longitude: float = Query(...),
+    hourly: str = Query(""),
+    past_hours: int = Query(0),
+    forecast_hours: int = Query(48),
+    current_weather: bool = Query(False),
+    timezone: str = Query("UTC"),
+):
+    err = await _delay_or_fail()
+    if err is not None:
+        return err
+    if current_weather and not hourly:
+        return {"latitude": latitude, "longitude": longitude, "timezone": "UTC"}
+    replay = _replay("forecast")
+    if replay is not None:
+        return replay
+    now = pd.Timestamp.now("UTC").floor("h").tz_localize(None)
+    start = now - pd.Timedelta(hours=past_hours)
+    return _payload(latitude, longitude, start, past_hours + forecast_hours, hourly)
+
+
+@app.get("/v1/archive")
+async def archive(
+    latitude: float = Query(...),
+    longitude: float = Query(...),
+    start_date: str = Query(...),
+    end_date: str = Query(...),
+    hourly: str = Query(""),
+    timezone: str = Query("UTC"),
+):
+    err = await _delay_or_fail()
+    if err is not None:
+        return err
+    replay = _replay("archive")
+    if replay is not None:
+        return replay
+    start = pd.Timestamp(start_date)
+    hours = int((pd.Timestamp(end_date) - start) / pd.Timedelta(hours=1)) + 24
+    return _payload(latitude, longitude, start, hours, hourly)
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
@@ -0,0 +1,375 @@
+# benchmarks/run.py
+# Benchmarks ponta a ponta sobre dados sintéticos (benchmarks/synth.py):
+# - ingest:    IngestWriter.insert().result() com um chamador concorrente por
+#              local (carga inicial, re-inserção 100% duplicada e coletas
+#              pequenas sobre a tabela já cheia)
+# - parse:     JSON do archive (payload da Open-Meteo com `years` anos) -> pa.Table
+# - features:  make_features (pandas, por local) e features_query (SQL, todos)
+# - train:     RandomForestRegressor com os mesmos parâmetros do train.py
+# - memory:    pico de memória (tracemalloc) para montar treino/teste: DataFrame
+#              float64 + cópias (caminho antigo) vs feature_matrix float32 + views
+# - predict:   latência de 1 linha e throughput em lote (sklearn e floresta
+#              achatada, src/inference/forest.py, com a diferença máxima entre os dois)
+# - dashboard: leituras do app (série da cidade, visão geral, gráfico agregado)
+# - startup:   partida a frio, cada medida num interpretador novo: import da API,
+#              import + lifespan (tabelas criadas) e os imports do topo do app
+# Resultado em JSON (com commit, versões e tamanho do dataset) para comparar
+# entre commits com `python -m benchmarks.compare antes.json depois.json`.
+#
+# Tudo roda num diretório temporário: não toca em data/ nem em models/ do projeto.
+#
+# Uso: python -m benchmarks.run --locations 13 --years 1 --out bench.json
+from pathlib import Path
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# o cliente de leitura não deve achar uma API real rodando: força o fallback local
+os.environ["RT_WEATHER_API"] = "http://127.0.0.1:9"
+
+
+def timed(fn, repeat: int = 5, warmup: int = 1) -> list:
+    for _ in range(warmup):
+        fn()
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def summarize(durations: list, **extra) -> dict:
+    d = np.asarray(durations)
+    return {
+        "median_s": float(np.median(d)),
+        "min_s": float(d.min()),
+        "p95_s": float(np.percentile(d, 95)),
+        "repeats": int(len(d)),
+        **extra,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+# ---------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------
+def bench_ingest(workdir: Path, frames: list, repeat: int) -> dict:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from benchmarks.synth import write_duckdb
+    from src.ingestion.api import _create_tables, _on_insert
+    from src.ingestion.writer import IngestWriter, _as_table
+
+    # mesmo caminho das requisições: IngestWriter.insert(...).result(), um
+    # chamador concorrente por local (como coletas simultâneas), e o mesmo
+    # on_connect/on_insert da API (tabelas meta, pontuação e alertas no lote)
+    tables = [_as_table(f) for f in frames]
+    n_rows = sum(t.num_rows for t in tables)
+    db = workdir / "ingest.duckdb"
+    pool = ThreadPoolExecutor(max_workers=len(tables))
+    res = {}
+
+    def new_writer() -> IngestWriter:
+        return IngestWriter(db, on_connect=_create_tables, on_insert=_on_insert)
+
+    def concurrent(writer: IngestWriter, batch: list) -> list:
+        return list(pool.map(lambda t: writer.insert(t).result(), batch))
+
+    def bulk():
+        write_duckdb(db, 0, 0)  # tabela vazia
+        writer = new_writer()
+        try:
+            concurrent(writer, tables)
+        finally:
+            writer.close()
+
+    extra = {"callers": len(tables)}
+    res["ingest_bulk"] = summarize(timed(bulk, repeat, warmup=0), rows=n_rows, **extra)
+    res["ingest_bulk"]["rows_per_s"] = n_rows / res["ingest_bulk"]["median_s"]
+
+    # tabela já cheia: re-inserir tudo (100% duplicado) e coletas de 6h
+    writer = new_writer()
+    try:
+        dup = summarize(timed(lambda: concurrent(writer, tables), repeat), rows=n_rows, **extra)
+        dup["rows_per_s"] = n_rows / dup["median_s"]
+        res["ingest_dedup_all_duplicates"] = dup
+
+        # latência vista por cada chamador: inclui a janela de micro-lote do escritor
+        small = [t.slice(t.num_rows - 6) for t in tables]
+        res["ingest_collect_6h"] = summarize(
+            timed(lambda: concurrent(writer, small), repeat),
+            rows_per_call=6,
+            table_rows=n_rows,
+            writer_delay_s=writer.max_delay_s,
+            **extra,
+        )
+    finally:
+        writer.close()
+        pool.shutdown()
+    return res
+
+
+def bench_parse(years: float, repeat: int) -> dict:
+    from benchmarks.openmeteo_stub import _payload
+    from src.ingestion.payload import HOURLY_VARS, parse_payload
+
+    hours = int(round(years * 365.25 * 24))
+    raw = json.dumps(
+        _payload(-23.55, -46.63, pd.Timestamp("2015-01-01"), hours, ",".join(HOURLY_VARS))
+    ).encode()
+    res = {"parse_archive_payload": summarize(
+        timed(lambda: parse_payload(raw, -23.55, -46.63), repeat), rows=hours, payload_mb=len(raw) / 1e6
+    )}
+    res["parse_archive_payload"]["rows_per_s"] = hours / res["parse_archive_payload"]["median_s"]
+    return res
+
+
+def bench_features(db: Path, frames: list, repeat: int) -> dict:
+    import duckdb
+    from src.ingestion.queries import features_query
+    from src.processing.prepare_data import make_features
+
+    n_rows = sum(len(f) for f in frames)
+    res = {}
+    res["features_pandas"] = summarize(
+        timed(lambda: [make_features(f.copy()) for f in frames], repeat), rows=n_rows
+    )
+    res["features_pandas"]["rows_per_s"] = n_rows / res["features_pandas"]["median_s"]
+
+    con = duckdb.connect(db.as_posix(), read_only=True)
+    sql, params = features_query()
+    res["features_sql"] = summarize(timed(lambda: con.execute(sql, params).arrow(), repeat), rows=n_rows)
+    res["features_sql"]["rows_per_s"] = n_rows / res["features_sql"]["median_s"]
+    con.close()
+    return res
+
+
+def bench_memory(frames: list) -> dict:
+    import tracemalloc
+    from src.processing.prepare_data import TARGET, feature_matrix, make_features
+    from src.training.train import time_split
+
+    feat = pd.concat([make_features(f.copy()) for f in frames], ignore_index=True)
+    feat32 = feat.astype({c: "float32" for c in feat.columns if c != "ts"})
+
+    def legacy():
+        df = feat.copy()  # o que pd.read_parquet devolvia
+        y = df[TARGET]
+        X = df.drop(columns=[TARGET, "ts"])
+        train, test = time_split(pd.concat([X, y], axis=1))
+        return train.iloc[:, :-1], train.iloc[:, -1], test.iloc[:, :-1], test.iloc[:, -1]
+
+    def compact():
+        df = feat32.copy()  # Parquet gravado com RT_WEATHER_COMPACT=1
+        X, y, _ = feature_matrix(df)
+        del df
+        Xtr, Xte = time_split(X)
+        ytr, yte = time_split(y)
+        return Xtr, ytr, Xte, yte
+
+    res = {}
+    for name, fn in (("train_matrix_legacy", legacy), ("train_matrix_compact", compact)):
+        tracemalloc.start()
+        out = fn()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del out
+        res[name] = summarize(
+            timed(fn, 3), rows=len(feat), peak_mb=peak / 1e6, retained_mb=current / 1e6
+        )
+    return res
+
+
+def bench_model(frames: list, trees: int, max_rows: int, repeat: int) -> dict:
+    from sklearn.ensemble import RandomForestRegressor
+    from src.inference.forest import FlatForest
+    from src.processing.prepare_data import feature_matrix, make_features
+
+    feat = pd.concat([make_features(f.copy()) for f in frames], ignore_index=True).tail(max_rows)
+    X, y, _ = feature_matrix(feat)
+
+    res = {}
+    model = None
+
+    def fit():
+        nonlocal model
+        model = RandomForestRegressor(n_estimators=trees, random_state=42, n_jobs=-1)
+        model.fit(X, y)
+
+    res["train_rf"] = summarize(timed(fit, max(1, repeat // 2), warmup=0), rows=len(X), trees=trees)
+
+    x1 = X[-1:]
+    res["predict_single"] = summarize(timed(lambda: model.predict(x1), 50, warmup=3), trees=trees)
+    xb = X[-10_000:]
+    res["predict_batch"] = summarize(timed(lambda: model.predict(xb), repeat), rows=len(xb), trees=trees)
+    res["predict_batch"]["rows_per_s"] = len(xb) / res["predict_batch"]["median_s"]
+
+    flat = FlatForest.from_sklearn(model)
+    parity = float(np.abs(flat.predict(xb) - model.predict(xb)).max())
+    res["predict_single_flat"] = summarize(timed(lambda: flat.predict(x1), 50, warmup=3), trees=trees)
+    res["predict_batch_flat"] = summarize(
+        timed(lambda: flat.predict(xb), repeat), rows=len(xb), trees=trees, max_abs_diff=parity
+    )
+    res["predict_batch_flat"]["rows_per_s"] = len(xb) / res["predict_batch_flat"]["median_s"]
+    return res
+
+
+def bench_dashboard(db: Path, locations: list, repeat: int) -> dict:
+    from src.ingestion.client import read_features, read_series
+
+    lat, lon = locations[0]
+    end = pd.Timestamp(read_series(lat, lon, columns=["ts"], db_path=db)["ts"].max())
+    res = {}
+    res["dashboard_city_series"] = summarize(
+        timed(lambda: read_series(lat, lon, db_path=db), repeat)
+    )
+    res["dashboard_overview"] = summarize(
+        timed(lambda: read_features(latest=True, db_path=db), repeat), locations=len(locations)
+    )
+    res["dashboard_chart_1y_bucketed"] = summarize(
+        timed(
+            lambda: read_series(
+                lat, lon, start=end - pd.Timedelta(days=365), end=end,
+                columns=["precipitation_probability"], bucket_hours=48, db_path=db,
+            ),
+            repeat,
+        )
+    )
+    return res
+
+
+def _app_imports() -> str:
+    """Imports de nível de módulo de src/app/app.py (o que a 1ª página paga antes de renderizar)."""
+    tree = ast.parse((ROOT / "src" / "app" / "app.py").read_text(encoding="utf-8"))
+    nodes = []
+    for node in tree.body:
+        for n in node.body if isinstance(node, ast.Try) else [node]:
+            if isinstance(n, (ast.Import, ast.ImportFrom)):
+                nodes.append(ast.unparse(n))
+    return "\n".join(nodes)
+
+
+STARTUP_CODE = {
+    "startup_api_import": "import src.ingestion.api",
+    "startup_api_ready": (
+        "import asyncio\n"
+        "from src.ingestion.api import app\n"
+        "async def _up():\n"
+        "    async with app.router.lifespan_context(app):\n"
+        "        pass\n"
+        "asyncio.run(_up())"
+    ),
+}
+
+
+def bench_startup(workdir: Path, repeat: int) -> dict:
+    env = {**os.environ, "PYTHONPATH": ROOT.as_posix()}
+    codes = {**STARTUP_CODE, "startup_app_imports": _app_imports()}
+    res = {}
+    for name, code in codes.items():
+        # o tempo é medido dentro do filho: sem a partida do próprio interpretador
+        script = f"import time\n_t0 = time.perf_counter()\n{code}\nprint(time.perf_counter() - _t0)"
+        run = lambda: subprocess.run(
+            [sys.executable, "-c", script], cwd=workdir, env=env, check=True, capture_output=True, text=True
+        )
+        run()  # aquece o cache de disco e os .pyc
+        res[name] = summarize([float(run().stdout.split()[-1]) for _ in range(repeat)])
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--locations", type=int, default=13)
+    ap.add_argument("--years", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--trees", type=int, default=100)
+    ap.add_argument("--train-rows", type=int, default=50_000)
+    ap.add_argument("--only", default="", help="lista: ingest,parse,features,memory,model,dashboard,startup")
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+    only = set(filter(None, args.only.split(",")))
+
+    from benchmarks.synth import make_locations, synth, write_duckdb
+
+    out_path = args.out.resolve() if args.out else None
+    with tempfile.TemporaryDirectory(prefix="rt_bench_") as tmp:
+        workdir = Path(tmp)
+        os.chdir(workdir)  # módulos do projeto usam caminhos relativos (data/, models/)
+
+        t0 = time.perf_counter()
+        db = workdir / "bench.duckdb"
+        n_rows = write_duckdb(db, args.locations, args.years, args.seed)
+        frames = [df for _, _, df in synth(args.locations, args.years, seed=args.seed)]
+        gen_s = time.perf_counter() - t0
+
+        results = {}
+        if not only or "ingest" in only:
+            results.update(bench_ingest(workdir, frames, args.repeat))
+        if not only or "parse" in only:
+            results.update(bench_parse(args.years, args.repeat))
+        if not only or "features" in only:
+            results.update(bench_features(db, frames, args.repeat))
+        if not only or "memory" in only:
+            results.update(bench_memory(frames))
+        if not only or "model" in only:
+            results.update(bench_model(frames, args.trees, args.train_rows, args.repeat))
+        if not only or "dashboard" in only:
+            results.update(bench_dashboard(db, make_locations(args.locations, args.seed), args.repeat))
+        if not only or "startup" in only:
+            results.update(bench_startup(workdir, args.repeat))
+        os.chdir(ROOT)
+
+    import duckdb
+    import sklearn
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp_utc": pd.Timestamp.now("UTC").isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "duckdb": duckdb.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "locations": args.locations,
+            "years": args.years,
+            "rows": n_rows,
+            "seed": args.seed,
+            "generate_s": gen_s,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if out_path:
+        out_path.write_text(text, encoding="utf-8")
+        print(f"[OK] resultados salvos em {out_path}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
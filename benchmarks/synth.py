@@ -0,0 +1,175 @@
+# benchmarks/synth.py
+# Gerador DETERMINÍSTICO de clima horário sintético para N locais x M anos.
+# Mesmo seed -> mesmos dados (benchmarks comparáveis entre commits).
+# - temperatura: média por latitude + sazonalidade (anual) + ciclo diário + ruído AR(1)
+# - umidade anticorrelacionada com a temperatura; nuvens/chuva em "eventos"
+# - weathercode derivado de nuvens/precipitação; prob. de chuva coerente com o evento
+#
+# Uso:
+#   python -m benchmarks.synth --locations 13 --years 2 --duckdb data/bench.duckdb
+#   python -m benchmarks.synth --locations 13 --years 2 --parquet data/bench_parquet
+from pathlib import Path
+import argparse
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    "ts",
+    "latitude",
+    "longitude",
+    "temperature_2m",
+    "relative_humidity_2m",
+    "precipitation",
+    "wind_speed_10m",
+    "weathercode",
+    "precipitation_probability",
+    "cloudcover",
+]
+
+
+def make_locations(n: int, seed: int = 42) -> list:
+    """n pares (lat, lon) arredondados a 4 casas, fixos para um seed."""
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(-45, 60, n).round(4)
+    lons = rng.uniform(-180, 180, n).round(4)
+    return list(zip(lats.tolist(), lons.tolist()))
+
+
+def synth_location(lat: float, lon: float, start, hours: int, seed: int) -> pd.DataFrame:
+    """Série horária sintética de um local (ts UTC naive, colunas de raw.weather_hourly)."""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range(start, periods=hours, freq="h")
+    t = np.arange(hours)
+
+    # sazonalidade invertida no hemisfério sul; ciclo diário com pico ~15h locais
+    doy = ts.dayofyear.to_numpy()
+    local_hour = (ts.hour.to_numpy() + lon / 15.0) % 24
+    season = np.cos(2 * np.pi * (doy - 200) / 365.25) * np.sign(lat or 1.0)
+    base = 27 - 0.35 * abs(lat)
+    amp_season = 2 + 0.18 * abs(lat)
+    diurnal = 4.5 * np.cos(2 * np.pi * (local_hour - 15) / 24)
+
+    # ruído AR(1) (persistência de hora em hora)
+    eps = rng.normal(0, 0.6, hours)
+    noise = np.empty(hours)
+    noise[0] = eps[0]
+    for i in range(1, hours):
+        noise[i] = 0.95 * noise[i - 1] + eps[i]
+    temp = base + amp_season * season + diurnal + noise
+
+    # "eventos" de chuva: processo liga/desliga com duração média ~6h
+    wet = np.zeros(hours, dtype=bool)
+    state = False
+    flips = rng.random(hours)
+    for i in range(hours):
+        state = flips[i] < (0.84 if state else 0.03)
+        wet[i] = state
+    precip = np.where(wet, rng.gamma(1.2, 1.5, hours), 0.0).round(1)
+    cloud = np.clip(np.where(wet, 85, 35) + rng.normal(0, 20, hours), 0, 100).round()
+    pop = np.clip(np.where(wet, 75, 10) + rng.normal(0, 12, hours), 0, 100).round()
+    hum = np.clip(75 - 1.8 * (temp - temp.mean()) + 15 * wet + rng.normal(0, 6, hours), 5, 100).round()
+    wind = np.clip(rng.weibull(2.0, hours) * 12 + 6 * wet, 0, None).round(1)
+
+    code = np.select(
+        [precip >= 8, precip >= 2.5, precip > 0, cloud >= 85, cloud >= 50, cloud >= 20],
+        [95, 63, 61, 3, 2, 1],
+        default=0,
+    ).astype(np.int16)
+    temp = temp.round(1)
+
+    return pd.DataFrame(
+        {
+            "ts": ts,
+            "latitude": lat,
+            "longitude": lon,
+            "temperature_2m": temp,
+            "relative_humidity_2m": hum,
+            "precipitation": precip,
+            "wind_speed_10m": wind,
+            "weathercode": code,
+            "precipitation_probability": pop,
+            "cloudcover": cloud,
+        }
+    )[COLUMNS]
+
+
+def synth(n_locations: int, years: float, end=None, seed: int = 42):
+    """Gera (lat, lon, DataFrame) por local; a janela termina em `end` (padrão: 2025-01-01)."""
+    hours = int(round(years * 365.25 * 24))
+    end = pd.Timestamp(end or "2025-01-01")
+    start = end - pd.Timedelta(hours=hours - 1)
+    for i, (lat, lon) in enumerate(make_locations(n_locations, seed)):
+        yield lat, lon, synth_location(lat, lon, start, hours, seed + i)
+
+
+def write_duckdb(db_path: Path, n_locations: int, years: float, seed: int = 42, end=None) -> int:
+    """Cria/recria raw.weather_hourly em db_path com os dados sintéticos; devolve nº de linhas."""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect(db_path.as_posix())
+    try:
+        con.execute("CREATE SCHEMA IF NOT EXISTS raw;")
+        con.execute("DROP TABLE IF EXISTS raw.weather_hourly;")
+        con.execute(
+            """
+            CREATE TABLE raw.weather_hourly (
+                ts TIMESTAMP,
+                latitude DOUBLE,
+                longitude DOUBLE,
+                temperature_2m DOUBLE,
+                relative_humidity_2m DOUBLE,
+                precipitation DOUBLE,
+                wind_speed_10m DOUBLE,
+                weathercode SMALLINT,
+                precipitation_probability DOUBLE,
+                cloudcover DOUBLE
+            );
+            """
+        )
+        n = 0
+        for _, _, df in synth(n_locations, years, end=end, seed=seed):
+            con.register("synth_df", df)
+            con.execute("INSERT INTO raw.weather_hourly SELECT * FROM synth_df")
+            con.unregister("synth_df")
+            n += len(df)
+        con.execute("CHECKPOINT;")
+        return n
+    finally:
+        con.close()
+
+
+def write_parquet(out_dir: Path, n_locations: int, years: float, seed: int = 42, end=None) -> int:
+    """Um arquivo Parquet por local em out_dir; devolve nº de linhas."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n = 0
+    for lat, lon, df in synth(n_locations, years, end=end, seed=seed):
+        df.to_parquet(out_dir / f"loc_{lat:.4f}_{lon:.4f}.parquet", index=False)
+        n += len(df)
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--locations", type=int, default=13)
+    ap.add_argument("--years", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--end", default=None, help="fim da série (UTC); padrão 2025-01-01")
+    ap.add_argument("--duckdb", type=Path, default=None)
+    ap.add_argument("--parquet", type=Path, default=None)
+    args = ap.parse_args()
+
+    if args.duckdb is None and args.parquet is None:
+        ap.error("informe --duckdb e/ou --parquet")
+    if args.duckdb is not None:
+        n = write_duckdb(args.duckdb, args.locations, args.years, args.seed, args.end)
+        print(f"[OK] {n} linhas em {args.duckdb}")
+    if args.parquet is not None:
+        n = write_parquet(args.parquet, args.locations, args.years, args.seed, args.end)
+        print(f"[OK] {n} linhas em {args.parquet}/")
+
+
+if __name__ == "__main__":
+    main()
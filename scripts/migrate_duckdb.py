@@ -1,7 +1,11 @@
 from pathlib import Path
+import sys
 import duckdb
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, ROOT.as_posix())
+from src.ingestion.queries import COMPACT_TYPES  # noqa: E402
+
 DB_PATH = ROOT / "data" / "rt_weather.duckdb"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
@@ -32,6 +36,30 @@ for col, typ in [
     except Exception:
         pass
 
+# --compact: converte só as colunas de valores para os tipos compactos (REAL /
+# UTINYINT); ts/latitude/longitude ficam como estão. UTINYINT arredonda para
+# inteiro (63.4% -> 63%): perde as casas decimais, por isso exige --allow-rounding
+if "--compact" in sys.argv:
+    from src.ingestion.queries import RAW_TYPES  # noqa: E402
+
+    changes = {c: t for c, t in COMPACT_TYPES.items() if t != RAW_TYPES[c]}
+    lossy = [c for c, t in changes.items() if t == "UTINYINT"]
+    fractional = {
+        c: con.execute(f"SELECT COUNT(*) FROM raw.weather_hourly WHERE {c} <> round({c})").fetchone()[0]
+        for c in lossy
+    }
+    print("⚠️  --compact arredonda para inteiro (perde as casas decimais): "
+          + ", ".join(f"{c} ({n} valores não inteiros)" for c, n in fractional.items()))
+    if "--allow-rounding" not in sys.argv:
+        con.close()
+        sys.exit("Nada foi alterado. Para converter mesmo assim: --compact --allow-rounding")
+    for col, typ in changes.items():
+        expr = f"CAST(round({col}) AS {typ})" if typ == "UTINYINT" else f"CAST({col} AS {typ})"
+        con.execute(f"ALTER TABLE raw.weather_hourly ALTER COLUMN {col} TYPE {typ} USING {expr};")
+    con.execute("CHECKPOINT;")
+    print("Tipos compactos aplicados; para devolver o espaço ao disco (API parada):")
+    print("  python -m src.ingestion.retention --rebuild")
+
 print(con.execute("PRAGMA table_info('raw.weather_hourly')").df())
 con.close()
 print(f"✅ Migração concluída em: {DB_PATH}")
@@ -1,12 +1,17 @@
 # src/app/app.py
 # App Streamlit: histórico + previsão da PRÓXIMA hora (t+1h)
-# - Seleção de cidade ou coordenadas
+# - Seleção de cidade ou coordenadas (ou visão geral de todas as localidades)
 # - Hora local do lugar + último registro local + Δh
-# - Coleta via API (collect/backfill)
+# - Coleta via API (collect/backfill) em background + auto-refresh pelo watermark
+# - Leitura via API (/series, /features); DuckDB local só se a API estiver fora
 # - Limpeza SOMENTE de dados brutos (raw.weather_hourly): por cidade ou geral
 # - Gráfico no fuso da cidade (dedup por hora + gaps explícitos)
-# - Inferência alinhada às features do treino (feature_cols.json)
+# - Previsão pela API (/predict registra em meta.predictions) + acurácia servida;
+#   API fora do ar: inferência local alinhada às features do treino (feature_cols.json)
 # - Mantém: render_conditions (sua feature extra)
+# - Debug (RT_WEATHER_PROFILE=1 ou ?debug=1): tempo por seção do rerun na sidebar
+# - Partida leve: matplotlib, altair, modelo (joblib/sklearn) e make_features só
+#   são importados/carregados na seção que os usa
 
 # --- garantir que a raiz do projeto esteja no sys.path (para importar src/*) ---
 import sys
@@ -23,14 +28,24 @@ except Exception:
     render_conditions = None  # caso o arquivo não exista, o app continua
 
 import json
-import requests
+import os
 import duckdb
-import joblib
+import requests
 import pandas as pd
 import streamlit as st
-import matplotlib.pyplot as plt
 
-from src.processing.prepare_data import make_features  # MESMAS features do treino
+from src.app.overview import render_overview
+from src.app.timings import section, start_rerun
+from src.ingestion.accuracy import ACCURACY_DAYS, log_prediction
+from src.ingestion.client import (
+    API_BASE,
+    delete_raw,
+    nearest_location,
+    predict_next,
+    read_accuracy,
+    read_series,
+    read_watermark,
+)
 
 # --------------------------- 
 # Caminhos e configs
@@ -38,10 +53,13 @@ from src.processing.prepare_data import make_features  # MESMAS features do trei
 DB_PATH = ROOT / "data" / "rt_weather.duckdb"
 MODEL_PATH = ROOT / "models" / "model_rf_temp_next_hour.pkl"
 FEATURES_PATH = ROOT / "models" / "feature_cols.json"
-API_BASE = "http://127.0.0.1:8000"
+MULTI_MODEL_PATH = ROOT / "models" / "model_rf_multi_next_hour.pkl"  # opcional (train.py --targets)
+FORECAST_URL = os.environ.get("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+NEAREST_TTL_S = 300  # cache do snap das coordenadas manuais (local novo aparece em até 5 min)
 
 st.set_page_config(page_title="RT Weather – Next Hour Temp", layout="centered")
 st.title("🌦️ Previsão de Temperatura (Próxima Hora)")
+start_rerun()
 
 # ---------------------------
 # Utilitários
@@ -50,7 +68,7 @@ def get_timezone_for(lat: float, lon: float) -> str:
     """Descobre o fuso da localidade consultando a Open-Meteo (não grava no DB)."""
     try:
         url = (
-            "https://api.open-meteo.com/v1/forecast"
+            f"{FORECAST_URL}"
             f"?latitude={lat}&longitude={lon}&current_weather=true&timezone=auto"
         )
         r = requests.get(url, timeout=10)
@@ -62,67 +80,33 @@ def get_timezone_for(lat: float, lon: float) -> str:
 
 def get_last_ts_utc_for(lat: float, lon: float):
     """MAX(ts) para a cidade atual (UTC, naive)."""
-    if not DB_PATH.exists():
-        return None
-    con = duckdb.connect(DB_PATH.as_posix())
     try:
-        return con.execute(
-            """
-            SELECT MAX(ts)
-            FROM raw.weather_hourly
-            WHERE round(latitude,4)=round(?,4)
-              AND round(longitude,4)=round(?,4)
-            """,
-            [lat, lon],
-        ).fetchone()[0]
+        return read_watermark(lat, lon, db_path=DB_PATH)
     except Exception:
         return None
-    finally:
-        con.close()
+
+
+@st.cache_data(ttl=NEAREST_TTL_S, show_spinner=False)
+def nearest_cached(lat: float, lon: float):
+    """Local gravado mais próximo, por (lat, lon): o modo manual roda isto a cada
+    rerun (slider, auto-refresh dos jobs) e a resposta só muda com locais novos."""
+    return nearest_location(lat, lon, db_path=DB_PATH)
 
 
 def delete_raw_city(lat: float, lon: float) -> int:
-    """Remove SOMENTE linhas da cidade atual."""
-    if not DB_PATH.exists():
-        return 0
-    con = duckdb.connect(DB_PATH.as_posix())
+    """Remove SOMENTE linhas da cidade atual (via API: fila do escritor único)."""
     try:
-        n = con.execute(
-            """
-            SELECT COUNT(*) FROM raw.weather_hourly
-            WHERE round(latitude,4)=round(?,4)
-              AND round(longitude,4)=round(?,4)
-            """,
-            [lat, lon],
-        ).fetchone()[0]
-        con.execute(
-            """
-            DELETE FROM raw.weather_hourly
-            WHERE round(latitude,4)=round(?,4)
-              AND round(longitude,4)=round(?,4)
-            """,
-            [lat, lon],
-        )
-        return int(n)
+        return delete_raw(lat, lon, db_path=DB_PATH)
     except Exception:
         return 0
-    finally:
-        con.close()
 
 
 def delete_raw_all() -> int:
     """Remove TODAS as linhas da tabela bruta (não mexe em refined/modelos)."""
-    if not DB_PATH.exists():
-        return 0
-    con = duckdb.connect(DB_PATH.as_posix())
     try:
-        n = con.execute("SELECT COUNT(*) FROM raw.weather_hourly").fetchone()[0]
-        con.execute("DELETE FROM raw.weather_hourly")
-        return int(n)
+        return delete_raw(db_path=DB_PATH)
     except Exception:
         return 0
-    finally:
-        con.close()
 
 
 def load_city_raw(lat: float, lon: float):
@@ -139,18 +123,7 @@ def load_city_raw(lat: float, lon: float):
     tz = get_timezone_for(lat, lon)
     now_utc = pd.Timestamp.now("UTC").floor("H")
 
-    con = duckdb.connect(DB_PATH.as_posix())
-    df = con.execute(
-        """
-        SELECT *
-        FROM raw.weather_hourly
-        WHERE round(latitude,4)=round(?,4)
-          AND round(longitude,4)=round(?,4)
-        ORDER BY ts
-        """,
-        [lat, lon],
-    ).df()
-    con.close()
+    df = read_series(lat, lon, db_path=DB_PATH)
 
     if df.empty:
         return df, df, tz  # vazio
@@ -187,6 +160,83 @@ def load_city_raw(lat: float, lon: float):
     return df_agg, df_local, tz
 
 
+# ---------------------------
+# Jobs em background (API) + auto-refresh pelo watermark
+# ---------------------------
+PENDING_STATUS = ("queued", "running")
+JOB_POLL_S = 2     # intervalo de polling com job pendente
+IDLE_POLL_S = 30   # sem jobs: só observa o watermark (coletas de outros clientes)
+JOB_MAX_MISSES = 30  # polls seguidos sem resposta da API até desistir do job (~1 min)
+JOB_ICONS = {"queued": "⏳", "running": "🔄", "done": "✅", "error": "❌"}
+
+if "jobs" not in st.session_state:
+    st.session_state.jobs = []
+if "watermarks" not in st.session_state:
+    st.session_state.watermarks = {}
+
+
+def submit_job(kind: str, params: dict) -> dict:
+    """Dispara collect/backfill em background na API e devolve o job (com job_id)."""
+    r = requests.post(f"{API_BASE}/jobs/{kind}", params=params, timeout=5)
+    r.raise_for_status()
+    return r.json()
+
+
+def get_job(job: dict) -> dict:
+    """Status atual do job na API.
+    - 404: a API reiniciou ou já descartou o job (o registro é em memória) -> erro
+    - sem resposta: mantém o status e conta a falha; após JOB_MAX_MISSES -> erro"""
+    try:
+        r = requests.get(f"{API_BASE}/jobs/{job['job_id']}", timeout=3)
+        if r.status_code == 404:
+            return {**job, "status": "error", "error": "job perdido (API reiniciada ou job expirado)"}
+        r.raise_for_status()
+        return r.json()
+    except requests.RequestException:
+        misses = job.get("misses", 0) + 1
+        if misses >= JOB_MAX_MISSES:
+            return {**job, "status": "error", "error": "API sem resposta", "misses": misses}
+        return {**job, "misses": misses}
+
+
+def get_watermark(lat: float, lon: float):
+    """Último ts gravado da cidade (ISO) — a API responde; fora do ar, lê do DuckDB."""
+    ts = get_last_ts_utc_for(lat, lon)
+    return ts.isoformat() if ts is not None else None
+
+
+def job_monitor(lat: float, lon: float):
+    """
+    Roda como fragmento (st.fragment com run_every): atualiza o status dos jobs e
+    recarrega o app inteiro quando um job termina ou o watermark da cidade avança.
+    """
+    finished = False
+    for i, job in enumerate(st.session_state.jobs):
+        if job["status"] in PENDING_STATUS:
+            fresh = get_job(job)
+            finished |= fresh["status"] not in PENDING_STATUS
+            st.session_state.jobs[i] = fresh
+
+    for job in st.session_state.jobs[-5:][::-1]:
+        icon = JOB_ICONS.get(job["status"], "•")
+        p = job.get("params", {})
+        where = f"{p.get('latitude', 0):.4f}, {p.get('longitude', 0):.4f}"
+        if job["status"] == "done":
+            info = f"{job['result'].get('inserted_rows', 0)} linhas novas"
+        elif job["status"] == "error":
+            info = job.get("error") or "erro"
+        else:
+            info = job["status"]
+        st.caption(f"{icon} {job['kind']} ({where}) — {info}")
+
+    key = f"{round(lat, 4)},{round(lon, 4)}"
+    wm = get_watermark(lat, lon)
+    seen = st.session_state.watermarks.get(key)
+    st.session_state.watermarks[key] = wm
+    if finished or (seen is not None and wm != seen):
+        st.rerun(scope="app")
+
+
 # ---------------------------
 # Seleção do local
 # ---------------------------
@@ -210,10 +260,16 @@ CITIES = {
 
 modo = st.radio(
     "Como escolher o lugar?",
-    ["Lista de cidades", "Coordenadas manuais"],
+    ["Lista de cidades", "Coordenadas manuais", "Visão geral"],
     horizontal=True,
 )
 
+if modo == "Visão geral":
+    # todas as localidades numa consulta + uma previsão batch; sem seleção de cidade
+    with section("visão geral"):
+        render_overview(DB_PATH, CITIES, MODEL_PATH, FEATURES_PATH)
+    st.stop()
+
 if modo == "Lista de cidades":
     cidade = st.selectbox("Cidade", list(CITIES.keys()), index=0)
     lat, lon = CITIES[cidade]
@@ -222,39 +278,50 @@ else:
     col1, col2 = st.columns(2)
     lat = col1.number_input("Latitude", value=-23.55, step=0.01, format="%.4f")
     lon = col2.number_input("Longitude", value=-46.63, step=0.01, format="%.4f")
+    # coordenada a poucos km de um local já gravado usa a série dele
+    # (em vez de criar outro local e buscar tudo de novo na Open-Meteo)
+    try:
+        near = nearest_cached(round(lat, 4), round(lon, 4))
+    except Exception:
+        near = None
+    if near is not None and (near["lat"], near["lon"]) != (round(lat, 4), round(lon, 4)):
+        st.caption(
+            f"Usando o local já gravado {near['lat']:.4f}, {near['lon']:.4f} "
+            f"({near['distance_km']:.2f} km daqui)"
+        )
+        lat, lon = near["lat"], near["lon"]
 
 # ---------------------------
 # Barra lateral: Coleta + Relógio local + Limpeza de dados brutos
 # ---------------------------
 with st.sidebar:
     st.header("Coleta (API FastAPI)")
+    # jobs rodam em background na API; o monitor abaixo acompanha e atualiza a tela
     if st.button("🔄 Coletar agora (últimas 6h)"):
         try:
-            r = requests.get(
-                f"{API_BASE}/collect",
-                params={"latitude": lat, "longitude": lon, "past_hours": 6},
-                timeout=30,
+            st.session_state.jobs.append(
+                submit_job("collect", {"latitude": lat, "longitude": lon, "past_hours": 6})
             )
-            st.success(r.json())
         except Exception as e:
             st.error(str(e))
 
     if st.button("📦 Backfill (últimos 30 dias)"):
         try:
-            r = requests.post(
-                f"{API_BASE}/backfill",
-                params={"latitude": lat, "longitude": lon, "days": 30},
-                timeout=120,
+            st.session_state.jobs.append(
+                submit_job("backfill", {"latitude": lat, "longitude": lon, "days": 30})
             )
-            st.success(r.json())
         except Exception as e:
             st.error(str(e))
 
+    has_pending = any(j["status"] in PENDING_STATUS for j in st.session_state.jobs)
+    st.fragment(run_every=JOB_POLL_S if has_pending else IDLE_POLL_S)(job_monitor)(lat, lon)
+
     st.divider()
     st.subheader("🕒 Hora local & status")
-    tz_sidebar = get_timezone_for(lat, lon)
-    now_local = pd.Timestamp.now(tz_sidebar).floor("H")
-    last_utc_city = get_last_ts_utc_for(lat, lon)
+    with section("sidebar: timezone + watermark"):
+        tz_sidebar = get_timezone_for(lat, lon)
+        now_local = pd.Timestamp.now(tz_sidebar).floor("H")
+        last_utc_city = get_last_ts_utc_for(lat, lon)
     if last_utc_city is not None:
         last_local = pd.Timestamp(last_utc_city, tz="UTC").tz_convert(tz_sidebar)
         delta_h = (now_local - last_local) / pd.Timedelta(hours=1)
@@ -266,7 +333,8 @@ with st.sidebar:
         # sua seção extra (se existir)
         if render_conditions is not None:
             try:
-                render_conditions(DB_PATH=DB_PATH, latitude=lat, longitude=lon, tz=tz_sidebar)
+                with section("sidebar: condições"):
+                    render_conditions(DB_PATH=DB_PATH, latitude=lat, longitude=lon, tz=tz_sidebar)
             except Exception as e:
                 st.info(f"(conditions) {e}")
     else:
@@ -281,14 +349,16 @@ with st.sidebar:
         confirm_city = st.checkbox("Confirmo (cidade atual)")
         if st.button("Apagar dados brutos\n(desta cidade)", disabled=not confirm_city):
             n = delete_raw_city(lat, lon)
+            nearest_cached.clear()  # o local apagado não serve mais de snap
             st.success(f"Removidas {n} linhas desta cidade.")
-            st.experimental_rerun()
+            st.rerun()
     with col_b:
         confirm_all = st.checkbox("Confirmo (todos os locais)")
         if st.button("Apagar dados brutos\n(todos os locais)", disabled=not confirm_all):
             n = delete_raw_all()
+            nearest_cached.clear()
             st.success(f"Removidas {n} linhas de todos os locais.")
-            st.experimental_rerun()
+            st.rerun()
 
 # ---------------------------
 # Carregar dados da cidade
@@ -297,7 +367,8 @@ if not DB_PATH.exists():
     st.warning("Banco DuckDB não encontrado. Rode a API /backfill ou /collect primeiro.")
     st.stop()
 
-df_agg, df_local, tz = load_city_raw(lat, lon)
+with section("série da cidade"):
+    df_agg, df_local, tz = load_city_raw(lat, lon)
 if df_agg.empty:
     st.warning("Sem dados para esta cidade. Faça backfill/coleta.")
     st.stop()
@@ -309,54 +380,104 @@ st.write(f"Fuso da cidade: **{tz}**")
 st.line_chart(df_local["temperature_2m"].tail(48))
 
 # ---------------------------
-# Carregar modelo e lista de features do treino
-# ---------------------------
-if not MODEL_PATH.exists() or not FEATURES_PATH.exists():
-    st.error(
-        "Modelo/feature_cols não encontrados. Rode o treino primeiro "
-        "(prepare_data.py e training/train.py)."
-    )
-    st.stop()
-
-model = joblib.load(MODEL_PATH)
-with open(FEATURES_PATH, "r", encoding="utf-8") as f:
-    feature_cols = json.load(f)
-
-# ---------------------------
-# Gerar features atuais e ALINHAR ao conjunto do treino
+# Previsão da próxima hora
 # ---------------------------
-# Para features, usamos df_agg (1/h em UTC) com coluna 'ts' (naive/UTC)
-feat = make_features(df_agg.copy())
-if len(feat) == 0:
-    st.warning("Ainda não há features suficientes (rode mais coletas ou o backfill).")
-    st.stop()
-
-X = feat.drop(columns=["temp_t_plus_1h", "ts"], errors="ignore")
+def predict_local(df_agg: pd.DataFrame, multi: bool) -> dict:
+    """API fora do ar: features em pandas + modelo local, no mesmo formato do /predict.
+    A previsão é registrada direto no DuckDB (ninguém mais está gravando)."""
+    if not MODEL_PATH.exists() or not FEATURES_PATH.exists():
+        st.error(
+            "Modelo/feature_cols não encontrados. Rode o treino primeiro "
+            "(prepare_data.py e training/train.py)."
+        )
+        st.stop()
+    from src.inference.predict import load_model, model_version, predict_rows, predict_targets
+    from src.processing.prepare_data import make_features  # MESMAS features do treino
+
+    with open(FEATURES_PATH, "r", encoding="utf-8") as f:
+        feature_cols = json.load(f)
+
+    # Para features, usamos df_agg (1/h em UTC) com coluna 'ts' (naive/UTC)
+    with section("features (pandas)"):
+        feat = make_features(df_agg.copy())
+    if len(feat) == 0:
+        st.warning("Ainda não há features suficientes (rode mais coletas ou o backfill).")
+        st.stop()
+    # adiciona colunas faltantes com zero e ordena exatamente como no treino
+    x_last = feat.reindex(columns=feature_cols, fill_value=0).iloc[[-1]]
+
+    # temperatura sempre do modelo dedicado; multi-alvo (se treinado) só para os demais alvos
+    with section("carregar modelo"):
+        model = load_model(MODEL_PATH)
+        multi_model = load_model(MULTI_MODEL_PATH) if multi else None
+    with section("model.predict"):
+        y_hat = float(predict_rows(model, x_last, mode="single")[0])
+        targets = predict_targets(multi_model, x_last)[0] if multi_model is not None else None
+    target_ts = pd.Timestamp(feat["ts"].iloc[-1]) + pd.Timedelta(hours=1)
+    out = {"y_hat": y_hat, "target_ts_utc": target_ts.isoformat(), "model_version": model_version(MODEL_PATH)}
+    if targets is not None:
+        out["targets"] = targets
+    try:
+        with duckdb.connect(DB_PATH.as_posix()) as con:
+            log_prediction(con, lat, lon, target_ts, out["model_version"], y_hat)
+    except Exception:
+        pass  # registrar é melhor esforço; a previsão continua valendo
+    return out
 
-# adiciona colunas faltantes com zero e ordena exatamente como no treino
-for c in feature_cols:
-    if c not in X.columns:
-        X[c] = 0
-X = X[feature_cols]
 
-# ---------------------------
-# Previsão da próxima hora
-# ---------------------------
-x_last = X.iloc[[-1]]
-y_hat = model.predict(x_last)[0]
+with section("previsão (API)"):
+    try:
+        # a API decide se há multi-alvo (o arquivo é dela): sem ele a resposta vem sem "targets"
+        served = predict_next(lat, lon, multi=True)
+    except Exception as e:  # 409 (histórico curto), 503 (sem modelo), ...
+        st.warning(f"Previsão indisponível: {e}")
+        st.stop()
+if served is None:
+    served = predict_local(df_agg, MULTI_MODEL_PATH.exists())  # sem API: arquivos locais
+y_hat = served["y_hat"]
 
 st.subheader("🔮 Previsão (próxima hora)")
 st.metric("Temperatura prevista", f"{y_hat:.2f} °C")
 
+# demais alvos (modelo multi-alvo, se treinado)
+nxt = served.get("targets")
+if nxt:
+    c1, c2, c3 = st.columns(3)
+    if "rh_t_plus_1h" in nxt:
+        c1.metric("Umidade prevista", f"{nxt['rh_t_plus_1h']:.0f}%")
+    if "pop_t_plus_1h" in nxt:
+        c2.metric("Prob. de chuva prevista", f"{nxt['pop_t_plus_1h']:.0f}%")
+    if "wmo_label" in nxt:
+        proba = ", ".join(f"{k}: {v:.0%}" for k, v in nxt["wmo_proba"].items() if v > 0)
+        c3.metric("Condição prevista", nxt["wmo_label"], help=proba)
+
+# acurácia das previsões já servidas para este local (atualizada a cada ingestão)
+with section("acurácia servida"):
+    try:
+        acc = read_accuracy(lat, lon, db_path=DB_PATH)
+    except Exception:
+        acc = pd.DataFrame()
+if not acc.empty:
+    cur = acc[acc["model_version"] == served["model_version"]]
+    if not cur.empty:
+        a = cur.iloc[0]
+        st.caption(
+            f"Acurácia do modelo aqui ({ACCURACY_DAYS} dias): MAE {a['mae']:.2f} °C · "
+            f"RMSE {a['rmse']:.2f} °C em {int(a['n'])} previsões conferidas"
+        )
+
 # gráfico com ponto previsto (+1h) no fuso local
-fig, ax = plt.subplots()
-hist = df_local["temperature_2m"].tail(24)
-hist.plot(ax=ax)
-if not hist.index.empty:
-    ax.scatter([hist.index[-1] + pd.Timedelta(hours=1)], [y_hat], marker="x")
-ax.set_title("Últimas 24h (local) + ponto previsto (+1h)")
-ax.set_ylabel("ºC")
-st.pyplot(fig)
+with section("gráfico 24h (matplotlib)"):
+    import matplotlib.pyplot as plt  # ~0,5 s de import: só aqui, depois da previsão
+
+    fig, ax = plt.subplots()
+    hist = df_local["temperature_2m"].tail(24)
+    hist.plot(ax=ax)
+    if not hist.index.empty:
+        ax.scatter([hist.index[-1] + pd.Timedelta(hours=1)], [y_hat], marker="x")
+    ax.set_title("Últimas 24h (local) + ponto previsto (+1h)")
+    ax.set_ylabel("ºC")
+    st.pyplot(fig)
 
 # ---------------------------
 # Tabela exploratória + download
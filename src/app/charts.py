@@ -0,0 +1,61 @@
+# src/app/charts.py
+# Séries reduzidas para gráficos longos:
+# - agrega no DuckDB (API /series?bucket_hours=) por "balde" de tempo
+#   (min/máx/média) conforme a janela visível
+# - o tamanho do balde cresce com a janela, então o payload enviado ao navegador
+#   fica limitado a ~MAX_POINTS pontos, mesmo com anos de histórico
+# - ao "dar zoom" (janela menor) a consulta é refeita com resolução mais fina
+import math
+from typing import Tuple
+
+import pandas as pd
+
+from src.ingestion.client import read_series
+from src.ingestion.queries import BUCKET_COLUMNS
+
+MAX_POINTS = 240
+# tamanhos de balde (em horas) tentados em ordem; o primeiro que cabe em MAX_POINTS vence
+BUCKET_LADDER_H = [1, 2, 3, 6, 12, 24, 48, 72, 168, 336, 720]
+
+
+def pick_bucket_hours(start: pd.Timestamp, end: pd.Timestamp, max_points: int = MAX_POINTS) -> int:
+    """Menor balde (h) que mantém a janela [start, end] com até max_points pontos."""
+    span_h = max(1.0, (end - start) / pd.Timedelta(hours=1))
+    for b in BUCKET_LADDER_H:
+        if span_h / b <= max_points:
+            return b
+    return int(math.ceil(span_h / max_points))
+
+
+def load_bucketed(
+    DB_PATH,
+    lat: float,
+    lon: float,
+    column: str,
+    start_utc: pd.Timestamp,
+    end_utc: pd.Timestamp,
+    max_points: int = MAX_POINTS,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Agrega `column` em baldes de tempo dentro de [start_utc, end_utc].
+    Devolve (df, bucket_hours) com colunas: ts (UTC tz-aware, início do balde),
+    v_min, v_max, v_mean, n (linhas no balde).
+    """
+    if column not in BUCKET_COLUMNS:
+        raise ValueError(f"coluna não suportada para gráfico: {column}")
+
+    bucket_h = pick_bucket_hours(start_utc, end_utc, max_points)
+    df = read_series(
+        lat, lon, start=start_utc, end=end_utc, columns=[column],
+        bucket_hours=bucket_h, db_path=DB_PATH,
+    )
+    if df.empty:  # janela sem linhas (ou fallback local sem arquivo): pode vir sem colunas
+        return pd.DataFrame(columns=["ts", "v_min", "v_max", "v_mean", "n"]).astype(
+            {"ts": "datetime64[ns, UTC]", "v_min": float, "v_max": float, "v_mean": float, "n": "int64"}
+        ), bucket_h
+    df = df.rename(
+        columns={f"{column}_min": "v_min", f"{column}_max": "v_max", f"{column}_mean": "v_mean"}
+    )[["ts", "v_min", "v_max", "v_mean", "n"]]
+
+    df["ts"] = pd.to_datetime(df["ts"]).dt.tz_localize("UTC")
+    return df, bucket_h
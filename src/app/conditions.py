@@ -1,10 +1,12 @@
 # src/app/conditions.py
 from typing import Tuple, Optional
-import duckdb
 import pandas as pd
-import altair as alt
 import streamlit as st
 
+from src.app.charts import load_bucketed
+from src.ingestion.alerts import describe
+from src.ingestion.client import read_alerts, read_series, read_time_range
+
 
 # ------------------------------ utilidades ------------------------------ #
 def decode_wmo(code) -> Tuple[str, str]:
@@ -58,6 +60,17 @@ def heat_index_c(temp_c: Optional[float], rh: Optional[float]) -> Optional[float
 
 
 # ------------------------------- UI/consulta ---------------------------- #
+# colunas das métricas de "agora" (inclui umidade para sensação térmica)
+NOW_COLUMNS = [
+    "temperature_2m",
+    "relative_humidity_2m",
+    "weathercode",
+    "precipitation",
+    "precipitation_probability",
+    "cloudcover",
+]
+
+
 def render_conditions(DB_PATH, latitude: float, longitude: float, tz: str):
     # compactar st.metric
     st.markdown(
@@ -73,29 +86,26 @@ def render_conditions(DB_PATH, latitude: float, longitude: float, tz: str):
     lat = round(float(latitude), 4)
     lon = round(float(longitude), 4)
 
-    # traz colunas necessárias (inclui umidade para sensação térmica)
-    with duckdb.connect(DB_PATH.as_posix()) as con:
-        df = con.execute(
-            """
-            SELECT
-                ts,
-                temperature_2m,
-                relative_humidity_2m,
-                weathercode,
-                precipitation,
-                precipitation_probability,
-                cloudcover
-            FROM raw.weather_hourly
-            WHERE ROUND(latitude, 4) = ? AND ROUND(longitude, 4) = ?
-            ORDER BY ts
-            """,
-            [lat, lon],
-        ).df()
-
-    if df.empty:
+    # limites da série por agregado (MIN/MAX ts), sem ler o histórico
+    first_ts, last_ts = read_time_range(lat, lon, db_path=DB_PATH)
+    if last_ts is None:
         st.info("Sem registros ainda — use os botões de coleta/backfill.")
         return
 
+    # "agora" + próximas 6h: só uma janela curta em volta de agora (ou do último
+    # registro, se a coleta estiver atrasada); o gráfico agrega à parte
+    now_utc = pd.Timestamp.now(tz="UTC")
+    now_naive = now_utc.tz_localize(None)
+    df = read_series(
+        lat, lon,
+        start=min(now_naive, last_ts) - pd.Timedelta(hours=1),
+        end=now_naive + pd.Timedelta(hours=7),
+        columns=NOW_COLUMNS,
+        db_path=DB_PATH,
+    )
+    if df.empty:  # nada perto de agora: sem métricas, mas o gráfico continua
+        df = pd.DataFrame(columns=["ts", *NOW_COLUMNS])
+
     # garantir tipos
     df["ts"] = pd.to_datetime(df["ts"], utc=True, errors="coerce")
     for c in [
@@ -115,7 +125,6 @@ def render_conditions(DB_PATH, latitude: float, longitude: float, tz: str):
     # Observação: quando não houver esse campo na resposta da API, ficará NaN
     # e a UI mostrará "—" (ou nada nos ícones), evitando qualquer valor “inventado”.
 
-    now_utc = pd.Timestamp.now(tz="UTC")
     now_row = df[df["ts"] <= now_utc].tail(1)
     next_row = df[df["ts"] > now_utc].head(1)
 
@@ -158,17 +167,42 @@ def render_conditions(DB_PATH, latitude: float, longitude: float, tz: str):
                 )
 
     # gráfico de prob. de chuva (barras) com marcador do "agora"
-    df_plot = df.assign(local=df["ts"].dt.tz_convert(tz))
+    # agregado no DuckDB conforme a janela escolhida: payload limitado a ~MAX_POINTS barras
+    lo_utc, hi_utc = first_ts.tz_localize("UTC"), last_ts.tz_localize("UTC")
+    lo_local = lo_utc.tz_convert(tz).floor("h").to_pydatetime()
+    hi_local = hi_utc.tz_convert(tz).ceil("h").to_pydatetime()
+    default_lo = max(lo_local, hi_local - pd.Timedelta(days=7))
+    if lo_local < hi_local:
+        win_lo, win_hi = st.slider(
+            "Janela do gráfico (zoom)",
+            min_value=lo_local,
+            max_value=hi_local,
+            value=(default_lo, hi_local),
+            step=pd.Timedelta(hours=1).to_pytimedelta(),
+            format="DD/MM HH'h'",
+            key=f"pop_window_{lat}_{lon}",
+        )
+    else:
+        win_lo, win_hi = lo_local, hi_local
+
+    df_plot, bucket_h = load_bucketed(
+        DB_PATH, lat, lon, "precipitation_probability",
+        pd.Timestamp(win_lo).tz_convert("UTC"), pd.Timestamp(win_hi).tz_convert("UTC"),
+    )
+    df_plot = df_plot.assign(local=df_plot["ts"].dt.tz_convert(tz))
+
+    import altair as alt  # só quando o gráfico é desenhado (partida do app mais leve)
 
     bars = (
-        alt.Chart(df_plot)
+        alt.Chart(df_plot[["local", "v_max", "v_mean"]])
         .mark_bar()
         .encode(
             x="local:T",
-            y=alt.Y("pop:Q", title="Prob. de chuva (%)", scale=alt.Scale(domain=[0, 100])),
+            y=alt.Y("v_max:Q", title="Prob. de chuva (%)", scale=alt.Scale(domain=[0, 100])),
             tooltip=[
                 alt.Tooltip("local:T", title="Hora"),
-                alt.Tooltip("pop:Q", title="Prob (%)", format=".0f"),
+                alt.Tooltip("v_max:Q", title="Prob. máx (%)", format=".0f"),
+                alt.Tooltip("v_mean:Q", title="Prob. média (%)", format=".0f"),
             ],
         )
         .properties(height=160)
@@ -179,14 +213,13 @@ def render_conditions(DB_PATH, latitude: float, longitude: float, tz: str):
     ).encode(x="local:T")
 
     st.altair_chart(bars + now_rule, use_container_width=True)
+    if bucket_h > 1:
+        st.caption(f"Barras agregadas a cada {bucket_h} h (máximo do período). Reduza a janela para mais detalhe.")
 
-    # alertas simples
-    if (pd.to_numeric(df["weathercode"], errors="coerce") >= 95).any():
-        st.warning("⚠️ Possibilidade de **tempestade** nas próximas horas.")
-        
-    # Onda de calor: considerar APENAS as próximas 6h (sem depender de nxt6)
-    window6h = df[(df["ts"] > now_utc) & (df["ts"] <= now_utc + pd.Timedelta(hours=6))]
-    if not window6h.empty:
-        max6h = pd.to_numeric(window6h["temperature_2m"], errors="coerce").max()
-        if pd.notna(max6h) and max6h >= 37:
-            st.warning("🥵 **Onda de calor** (≥ 37 °C) detectada.")
+    # alertas: avaliados pela ingestão (meta.alerts); aqui só a leitura dos ativos
+    try:
+        active = read_alerts(lat, lon, db_path=DB_PATH)
+    except Exception:
+        active = pd.DataFrame()
+    for a in active.itertuples(index=False):
+        st.warning(describe(a.rule, a.peak))
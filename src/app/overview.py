@@ -0,0 +1,102 @@
+# src/app/overview.py
+# Visão geral: todas as localidades gravadas numa única tabela
+# - UMA consulta agrupada no DuckDB (API /features?latest=true) traz, por local:
+#   condições atuais, atraso da ingestão, últimas 24h (sparkline) e as features
+#   da última hora (mesmas de make_features, ver src/ingestion/queries.py)
+# - UMA chamada batch de model.predict para a próxima hora de todos os locais
+# - Alertas ativos de todos os locais (meta.alerts, mantidos pela ingestão)
+import json
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.app.conditions import decode_wmo
+from src.inference.predict import load_model, predict_rows
+from src.ingestion.alerts import RULES
+from src.ingestion.client import read_alerts, read_features
+
+
+def load_overview(DB_PATH) -> pd.DataFrame:
+    """Uma linha por local (última hora observada) com condições, lag e features."""
+    now_utc = pd.Timestamp.now("UTC").floor("h")
+    df = read_features(latest=True, end=now_utc, db_path=DB_PATH)
+    if df.empty:
+        return df
+    df["ts"] = pd.to_datetime(df["ts"]).dt.tz_localize("UTC")
+    df["lag_h"] = (now_utc - df["ts"]) / pd.Timedelta(hours=1)
+    return df
+
+
+def predict_batch(df: pd.DataFrame, MODEL_PATH, FEATURES_PATH) -> pd.Series:
+    """Previsão t+1h para todas as linhas com features completas (uma chamada ao modelo)."""
+    y_hat = pd.Series(np.nan, index=df.index)
+    if df.empty or not MODEL_PATH.exists() or not FEATURES_PATH.exists():
+        return y_hat
+    with open(FEATURES_PATH, "r", encoding="utf-8") as f:
+        feature_cols = json.load(f)
+
+    X = df.reindex(columns=feature_cols, fill_value=0)
+    ok = X.notna().all(axis=1)
+    if ok.any():
+        model = load_model(MODEL_PATH)  # em cache entre reruns; carregado só se houver o que prever
+        y_hat[ok] = predict_rows(model, X[ok])
+    return y_hat
+
+
+def render_overview(DB_PATH, CITIES: dict, MODEL_PATH, FEATURES_PATH):
+    st.subheader("🌍 Visão geral (todas as localidades)")
+    if not DB_PATH.exists():
+        st.warning("Banco DuckDB não encontrado. Rode a API /backfill ou /collect primeiro.")
+        return
+
+    df = load_overview(DB_PATH)
+    if df.empty:
+        st.info("Sem registros ainda — use os botões de coleta/backfill.")
+        return
+
+    df["y_hat"] = predict_batch(df, MODEL_PATH, FEATURES_PATH)
+
+    names = {(round(la, 4), round(lo, 4)): name for name, (la, lo) in CITIES.items()}
+    df["local"] = [
+        names.get((la, lo), f"{la:.4f}, {lo:.4f}")
+        for la, lo in zip(df["latitude"], df["longitude"])
+    ]
+    df["condicao"] = [" ".join(decode_wmo(c)[::-1]) for c in df["weathercode"]]
+    try:
+        active = read_alerts(db_path=DB_PATH)
+    except Exception:
+        active = pd.DataFrame()
+    icons = {}
+    for a in active.itertuples(index=False):
+        key = (round(a.latitude, 4), round(a.longitude, 4))
+        icons[key] = icons.get(key, "") + RULES.get(a.rule, {}).get("icon", "⚠️")
+    df["alertas"] = [icons.get((round(la, 4), round(lo, 4)), "") for la, lo in zip(df["latitude"], df["longitude"])]
+
+    view = df[
+        [
+            "local", "condicao", "alertas", "temperature_2m", "y_hat", "precipitation_probability",
+            "relative_humidity_2m", "wind_speed_10m", "lag_h", "temp_24h",
+        ]
+    ]
+    st.dataframe(
+        view,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "local": "Local",
+            "condicao": "Agora",
+            "alertas": "Alertas",
+            "temperature_2m": st.column_config.NumberColumn("Temp. (°C)", format="%.1f"),
+            "y_hat": st.column_config.NumberColumn("Próx. hora (°C)", format="%.1f"),
+            "precipitation_probability": st.column_config.NumberColumn("Prob. chuva (%)", format="%.0f"),
+            "relative_humidity_2m": st.column_config.NumberColumn("Umidade (%)", format="%.0f"),
+            "wind_speed_10m": st.column_config.NumberColumn("Vento (km/h)", format="%.1f"),
+            "lag_h": st.column_config.NumberColumn("Atraso (h)", format="%.0f"),
+            "temp_24h": st.column_config.LineChartColumn("Últimas 24h"),
+        },
+    )
+    st.caption(
+        f"{len(df)} localidades • atraso = horas desde o último registro • "
+        "previsão em branco: modelo ausente ou histórico curto (< 25 h)."
+    )
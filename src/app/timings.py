@@ -0,0 +1,54 @@
+# src/app/timings.py
+# Painel de depuração do app: tempo de cada seção do rerun atual.
+# - Liga com RT_WEATHER_PROFILE=1 (mesma variável do profiling da API) ou ?debug=1 na URL
+# - start_rerun() no topo do script; `with section("nome"):` em volta de cada bloco
+# - O painel é um placeholder na sidebar, reescrito ao fim de cada seção: continua
+#   certo mesmo quando o script para no meio (st.stop)
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+_KEY = "_rt_timings"
+
+
+def enabled() -> bool:
+    if os.environ.get("RT_WEATHER_PROFILE", "").lower() in ("1", "true", "yes"):
+        return True
+    return st.query_params.get("debug", "").lower() in ("1", "true", "yes")
+
+
+def start_rerun() -> None:
+    """Zera as medições; cria o painel (vazio) se o modo debug estiver ligado."""
+    st.session_state[_KEY] = {
+        "t0": time.perf_counter(),
+        "sections": [],
+        "panel": st.sidebar.empty() if enabled() else None,
+    }
+
+
+def _render(state: dict) -> None:
+    rows = pd.DataFrame(state["sections"], columns=["seção", "ms"])
+    total_ms = (time.perf_counter() - state["t0"]) * 1000
+    with state["panel"].container():
+        st.markdown("**⏱️ Debug: tempos deste rerun**")
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.caption(
+            f"Total até agora: {total_ms:.0f} ms · seções: {rows['ms'].sum():.0f} ms"
+        )
+
+
+@contextmanager
+def section(name: str):
+    """Mede o bloco (em ms) e atualiza o painel; sem start_rerun() não faz nada."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        state = st.session_state.get(_KEY)
+        if state is not None:
+            state["sections"].append((name, round((time.perf_counter() - t0) * 1000, 1)))
+            if state["panel"] is not None:
+                _render(state)
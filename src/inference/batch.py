@@ -0,0 +1,269 @@
+# src/inference/batch.py
+# Previsões t+1h em lote sobre TODO o histórico, sem carregar tudo na memória.
+# - Fonte "duckdb": as features do /features (calculadas no DuckDB), lidas lote a
+#   lote em Arrow pela API ou, com a API parada, numa conexão somente-leitura
+# - Fonte "parquet": arquivo ou diretório com as colunas de features
+#   (ex.: data/refined/weather_features.parquet), lido por row group
+# - Cada lote: X float32 (feature_matrix) -> model.predict -> Parquet
+#   particionado por year=/month= da hora-alvo; memória ~ --chunk-rows linhas
+# - Unidades de trabalho: (local, janela de --unit-days) no DuckDB e row groups no
+#   Parquet; com --workers > 1 cada processo pega unidades inteiras (modelo
+#   carregado uma vez por processo, predict com 1 thread)
+# - Nome dos arquivos = unidade + nº do lote: rodar de novo o mesmo recorte
+#   (--start/--end/--unit-days) substitui os arquivos da unidade, não duplica;
+#   outro recorte pede outro --out
+# - Backend sklearn por padrão: em lotes grandes ele é mais rápido que o flat
+# - --log: grava também em meta.predictions (acurácia, src/ingestion/accuracy.py)
+#   pela conexão de escrita, então só com a API parada
+#
+# Uso:
+#   python -m src.inference.batch --out data/predictions
+#   python -m src.inference.batch --start 2024-01-01 --end 2024-12-31 --workers 4
+#   python -m src.inference.batch --source parquet --input data/refined/weather_features.parquet
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+import argparse
+import hashlib
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.inference.multi import MultiTargetModel
+from src.inference.predict import (
+    DB_PATH,
+    FEATURES_PATH,
+    MODEL_PATH,
+    load_feature_cols,
+    load_model,
+    model_version,
+    predict_rows,
+)
+from src.ingestion.accuracy import log_predictions
+from src.ingestion.client import iter_features, read_series
+from src.processing.prepare_data import TARGET, feature_matrix
+
+OUT_DIR = Path("data") / "predictions"
+CHUNK_ROWS = 65536
+UNIT_DAYS = 365
+
+# modelo e features carregados uma vez por processo (_init_worker)
+_state = {}
+
+
+def _utc_naive(value):
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_convert("UTC").tz_localize(None) if ts.tzinfo else ts
+
+
+def duckdb_units(start=None, end=None, unit_days: int = UNIT_DAYS, db_path: Path = DB_PATH) -> list:
+    """Uma unidade por (local, janela de unit_days) com dados; uma consulta agregada."""
+    hours = unit_days * 24
+    buckets = read_series(
+        start=start, end=end, columns=["temperature_2m"], bucket_hours=hours, db_path=db_path
+    )
+    start, end = _utc_naive(start), _utc_naive(end)
+    units = []
+    for row in buckets.itertuples(index=False):
+        lo = pd.Timestamp(row.ts)
+        hi = lo + pd.Timedelta(hours=hours - 1)
+        units.append(
+            {
+                "kind": "duckdb",
+                "lat": float(row.latitude),
+                "lon": float(row.longitude),
+                "start": max(lo, start) if start is not None else lo,
+                "end": min(hi, end) if end is not None else hi,
+            }
+        )
+    return units
+
+
+def parquet_units(path: Path) -> list:
+    """Uma unidade por row group de cada arquivo."""
+    path = Path(path)
+    files = sorted(path.rglob("*.parquet")) if path.is_dir() else [path]
+    return [
+        {"kind": "parquet", "file": f.as_posix(), "row_group": i}
+        for f in files
+        for i in range(pq.ParquetFile(f).num_row_groups)
+    ]
+
+
+def _unit_key(unit: dict) -> str:
+    if unit["kind"] == "duckdb":
+        raw = f"{unit['lat']:.4f}_{unit['lon']:.4f}_{unit['start']:%Y%m%dT%H}"
+    else:
+        raw = f"{unit['file']}#{unit['row_group']}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def _batches(unit: dict, chunk_rows: int, db_path: Path):
+    if unit["kind"] == "duckdb":
+        yield from iter_features(
+            unit["lat"], unit["lon"], unit["start"], unit["end"], batch_rows=chunk_rows, db_path=db_path
+        )
+    else:
+        yield from pq.ParquetFile(unit["file"]).iter_batches(batch_size=chunk_rows, row_groups=[unit["row_group"]])
+
+
+def score_batch(batch: pa.RecordBatch, model, feature_cols: list, version: str) -> pa.Table:
+    """Um lote de features -> tabela de previsões (com o valor real, se a fonte tiver)."""
+    df = batch.to_pandas()
+    X, _, _ = feature_matrix(df.reindex(columns=feature_cols, fill_value=0), feature_cols)
+    ok = ~np.isnan(X).any(axis=1)
+    y_hat = np.full(len(df), np.nan)
+    if ok.any():
+        Xo = X[ok]
+        if hasattr(model, "feature_names_in_"):  # modelo antigo, treinado em DataFrame
+            Xo = pd.DataFrame(Xo, columns=feature_cols)
+        y_hat[ok] = predict_rows(model, Xo, mode="batch")
+    base_ts = pd.to_datetime(df["ts"])
+    target_ts = base_ts + pd.Timedelta(hours=1)
+    nan = pd.Series(np.nan, index=df.index)
+    out = pd.DataFrame(
+        {
+            "latitude": df["latitude"] if "latitude" in df else nan,
+            "longitude": df["longitude"] if "longitude" in df else nan,
+            "base_ts": base_ts,
+            "target_ts": target_ts,
+            "model_version": version,
+            "y_hat": y_hat,
+            "actual": df[TARGET] if TARGET in df else nan,
+            "year": target_ts.dt.year.astype("int32"),
+            "month": target_ts.dt.month.astype("int32"),
+        }
+    )
+    return pa.Table.from_pandas(out[ok], preserve_index=False)
+
+
+def _init_worker(model_path: str, features_path: str, backend: str, threads: int) -> None:
+    model = load_model(Path(model_path), backend)
+    if isinstance(model, MultiTargetModel):
+        raise ValueError("batch só pontua o modelo de temperatura (uma saída)")
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = threads
+    _state.update(
+        model=model,
+        feature_cols=load_feature_cols(Path(features_path)),
+        version=model_version(Path(model_path)),
+    )
+
+
+def score_unit(unit: dict, out_dir: str, chunk_rows: int, db_path: str) -> int:
+    """Pontua uma unidade lote a lote e grava cada lote; devolve as linhas gravadas."""
+    key, rows = _unit_key(unit), 0
+    for old in Path(out_dir).glob(f"year=*/month=*/{key}-*.parquet"):
+        old.unlink()  # rodada anterior desta unidade (outro --chunk-rows ou dados novos)
+    for i, batch in enumerate(_batches(unit, chunk_rows, Path(db_path))):
+        if batch.num_rows == 0:
+            continue
+        tbl = score_batch(batch, _state["model"], _state["feature_cols"], _state["version"])
+        if tbl.num_rows:
+            pq.write_to_dataset(
+                tbl,
+                out_dir,
+                partition_cols=["year", "month"],
+                basename_template=f"{key}-{i:05d}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                compression="zstd",
+            )
+        rows += tbl.num_rows
+    return rows
+
+
+def log_output(out_dir: Path, version: str, db_path: Path = DB_PATH, chunk_rows: int = CHUNK_ROWS) -> int:
+    """Copia as previsões da saída (desta versão do modelo) para meta.predictions."""
+    dset = ds.dataset(Path(out_dir).as_posix(), format="parquet", partitioning="hive")
+    flt = (ds.field("model_version") == version) & ds.field("latitude").is_valid()
+    logged = 0
+    with duckdb.connect(Path(db_path).as_posix()) as con:
+        for batch in dset.to_batches(filter=flt, batch_size=chunk_rows):
+            logged += log_predictions(con, batch.to_pandas())
+    return logged
+
+
+def run(
+    source: str = "duckdb",
+    input_path: Path = None,
+    out_dir: Path = OUT_DIR,
+    start=None,
+    end=None,
+    unit_days: int = UNIT_DAYS,
+    chunk_rows: int = CHUNK_ROWS,
+    workers: int = 1,
+    model_path: Path = MODEL_PATH,
+    features_path: Path = FEATURES_PATH,
+    backend: str = "sklearn",
+    db_path: Path = DB_PATH,
+) -> dict:
+    if source == "duckdb":
+        units = duckdb_units(start, end, unit_days, db_path)
+    elif source == "parquet":
+        if input_path is None:
+            raise ValueError("--input é obrigatório com --source parquet")
+        units = parquet_units(input_path)
+    else:
+        raise ValueError(f"fonte desconhecida: {source}")
+
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    job = partial(score_unit, out_dir=Path(out_dir).as_posix(), chunk_rows=chunk_rows, db_path=Path(db_path).as_posix())
+    init = (Path(model_path).as_posix(), Path(features_path).as_posix(), backend)
+    t0 = time.perf_counter()
+    if workers > 1 and len(units) > 1:
+        # um predict de 1 thread por processo (sem disputar núcleos)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(*init, 1)) as pool:
+            rows = sum(pool.map(job, units))
+    else:
+        _init_worker(*init, -1)
+        rows = sum(job(u) for u in units)
+    return {
+        "units": len(units),
+        "rows": int(rows),
+        "seconds": time.perf_counter() - t0,
+        "out_dir": Path(out_dir).as_posix(),
+        "model_version": model_version(Path(model_path)),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", choices=["duckdb", "parquet"], default="duckdb")
+    ap.add_argument("--input", type=Path, default=None, help="arquivo/diretório Parquet (--source parquet)")
+    ap.add_argument("--out", type=Path, default=OUT_DIR)
+    ap.add_argument("--start", default=None, help="ISO 8601 (UTC); só fonte duckdb")
+    ap.add_argument("--end", default=None, help="ISO 8601 (UTC); só fonte duckdb")
+    ap.add_argument("--unit-days", type=int, default=UNIT_DAYS, help="janela por unidade de trabalho (<= 365)")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--model", type=Path, default=MODEL_PATH)
+    ap.add_argument("--backend", choices=["sklearn", "flat"], default="sklearn")
+    ap.add_argument("--log", action="store_true", help="grava em meta.predictions (API parada)")
+    args = ap.parse_args()
+
+    if not 1 <= args.unit_days <= 365:
+        ap.error("--unit-days deve estar entre 1 e 365")
+    report = run(
+        args.source, args.input, args.out, args.start, args.end, args.unit_days,
+        args.chunk_rows, args.workers, args.model, FEATURES_PATH, args.backend,
+    )
+    print(f"[OK] {report['rows']} previsões de {report['units']} unidades em {report['seconds']:.1f}s "
+          f"({report['rows'] / max(report['seconds'], 1e-9):,.0f} linhas/s) -> {report['out_dir']}")
+    if args.log:
+        try:
+            n = log_output(args.out, report["model_version"])
+        except duckdb.IOException:
+            print("[WARN] banco em uso pela API: pare-a para gravar em meta.predictions")
+            return
+        print(f"[OK] {n} previsões novas em meta.predictions")
+
+
+if __name__ == "__main__":
+    main()
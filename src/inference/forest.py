@@ -0,0 +1,187 @@
+# src/inference/forest.py
+# Backend opcional de inferência: a floresta do sklearn "achatada" em arrays NumPy.
+# - Todos os nós de todas as árvores num vetor de registros (feature, filhos,
+#   threshold) + valor das folhas; a descida anda um nível por passo, vetorizada
+#   sobre todos os pares (linha, árvore) que ainda não chegaram a uma folha
+# - Sem validação de entrada nem threads do joblib por chamada: 1 linha com
+#   300 árvores fica bem mais barata que RandomForestRegressor.predict
+# - Mesma regra de decisão do sklearn: float32(x) <= threshold (float64), NaN
+#   segue missing_go_to_left; a saída é a média das folhas
+# - Salvo em .npz ao lado do .pkl pelo train.py; ligado com
+#   RT_WEATHER_MODEL_BACKEND=flat (ver predict.load_model)
+#
+# Uso: python -m src.inference.forest [models/model_rf_temp_next_hour.pkl]
+#      (gera/atualiza o .npz e confere paridade e latência contra o sklearn)
+from pathlib import Path
+import sys
+import time
+
+import numpy as np
+
+# linhas x árvores por passo da descida em lote (limita a memória dos índices)
+CHUNK_NODES = 1 << 20
+
+
+# um registro de 24 bytes por nó: feature, filhos e threshold caem na mesma linha de cache
+NODE_DTYPE = np.dtype(
+    [("feature", "<i4"), ("left", "<i4"), ("right", "<i4"), ("missing_left", "<i4"), ("threshold", "<f8")]
+)
+
+
+class FlatForest:
+    """Floresta de regressão em arrays planos; predict(X) como o do sklearn."""
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, max_depth, n_features):
+        self.nodes = np.empty(len(feature), dtype=NODE_DTYPE)
+        self.nodes["feature"] = feature
+        self.nodes["left"] = left
+        self.nodes["right"] = right
+        self.nodes["missing_left"] = missing_left
+        self.nodes["threshold"] = threshold
+        self.is_leaf = self.nodes["left"] == np.arange(len(self.nodes))
+        self.has_missing = bool(self.nodes["missing_left"].any())
+        self.value = np.ascontiguousarray(value, dtype=np.float64)  # (nós, saídas)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int64)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_outputs(self) -> int:
+        return self.value.shape[1]
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        """Converte RandomForestRegressor/ExtraTreesRegressor já treinado."""
+        feature, threshold, left, right, missing, value, roots = [], [], [], [], [], [], []
+        offset = 0
+        for est in model.estimators_:
+            t = est.tree_
+            n = t.node_count
+            leaf = t.children_left == -1
+            own = np.arange(offset, offset + n, dtype=np.int64)
+            feature.append(np.where(leaf, 0, t.feature))
+            threshold.append(np.where(leaf, np.inf, t.threshold))
+            left.append(np.where(leaf, own, t.children_left + offset))
+            right.append(np.where(leaf, own, t.children_right + offset))
+            missing.append(getattr(t, "missing_go_to_left", np.zeros(n, dtype=np.uint8)))
+            value.append(t.value[:, :, 0])
+            roots.append(offset)
+            offset += n
+        return cls(
+            np.concatenate(feature),
+            np.concatenate(threshold),
+            np.concatenate(left),
+            np.concatenate(right),
+            np.concatenate(missing),
+            np.concatenate(value),
+            np.asarray(roots),
+            max(est.tree_.max_depth for est in model.estimators_),
+            model.n_features_in_,
+        )
+
+    def save(self, path: Path) -> None:
+        np.savez(
+            path,
+            **{name: self.nodes[name] for name in NODE_DTYPE.names},
+            value=self.value,
+            roots=self.roots,
+            meta=np.array([self.max_depth, self.n_features]),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "FlatForest":
+        with np.load(path) as z:
+            max_depth, n_features = z["meta"].tolist()
+            return cls(
+                z["feature"], z["threshold"], z["left"], z["right"], z["missing_left"],
+                z["value"], z["roots"], max_depth, n_features,
+            )
+
+    # ---------------- inferência ----------------
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Índice da folha de cada (linha, árvore), achatado em linhas * árvores.
+        Só os pares que ainda não chegaram a uma folha seguem para o próximo nível."""
+        n, T = len(X), self.n_trees
+        flat_x = X.ravel()
+        base = np.repeat(np.arange(n, dtype=np.int64) * self.n_features, T)
+        leaves = np.tile(self.roots, n)
+        active = np.arange(n * T)
+        node = leaves.copy()
+        while active.size:
+            rec = self.nodes[node]
+            x = flat_x[base[active] + rec["feature"]]
+            go_left = x <= rec["threshold"]
+            if self.has_missing:
+                go_left |= np.isnan(x) & (rec["missing_left"] != 0)
+            node = np.where(go_left, rec["left"], rec["right"])
+            leaves[active] = node
+            alive = ~self.is_leaf[node]
+            active, node = active[alive], node[alive]
+        return leaves
+
+    def predict(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X deve ter {self.n_features} colunas; recebido {X.shape}")
+        step = max(1, CHUNK_NODES // self.n_trees)
+        out = np.empty((len(X), self.n_outputs))
+        for i in range(0, len(X), step):
+            chunk = X[i : i + step]
+            leaves = self._leaves(chunk)
+            out[i : i + step] = self.value[leaves].reshape(len(chunk), self.n_trees, -1).mean(axis=1)
+        return out[:, 0] if self.n_outputs == 1 else out
+
+
+def flat_path(model_path: Path) -> Path:
+    """models/x.pkl -> models/x.npz"""
+    return Path(model_path).with_suffix(".npz")
+
+
+def _best_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    import joblib
+    import pandas as pd
+
+    model_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("models") / "model_rf_temp_next_hour.pkl"
+    model = joblib.load(model_path)
+    t0 = time.perf_counter()
+    flat = FlatForest.from_sklearn(model)
+    flat.save(flat_path(model_path))
+    print(f"[OK] {flat_path(model_path)} ({flat.n_trees} árvores, {len(flat.nodes)} nós, "
+          f"profundidade {flat.max_depth}) em {time.perf_counter() - t0:.1f}s")
+
+    feat_pq = Path("data") / "refined" / "weather_features.parquet"
+    if feat_pq.exists():
+        from src.processing.prepare_data import feature_matrix
+
+        X = feature_matrix(pd.read_parquet(feat_pq))[0][-5000:]
+    else:  # sem features: pontos aleatórios no intervalo dos thresholds
+        rng = np.random.default_rng(0)
+        finite = flat.nodes["threshold"][~flat.is_leaf]
+        X = rng.uniform(finite.min(), finite.max(), (5000, flat.n_features)).astype(np.float32)
+    if hasattr(model, "feature_names_in_"):  # modelo antigo, treinado em DataFrame
+        X = pd.DataFrame(X, columns=model.feature_names_in_)
+    diff = np.abs(flat.predict(X) - model.predict(X)).max()
+    print(f"paridade: max |flat - sklearn| = {diff:.2e} em {len(X)} linhas")
+
+    x1 = X[-1:] if isinstance(X, np.ndarray) else X.iloc[[-1]]
+    sk1, fl1 = _best_ms(lambda: model.predict(x1), 20), _best_ms(lambda: flat.predict(x1), 20)
+    skb, flb = _best_ms(lambda: model.predict(X), 3), _best_ms(lambda: flat.predict(X), 3)
+    print(f"1 linha:      sklearn {sk1:8.2f} ms | flat {fl1:8.2f} ms ({sk1 / fl1:.0f}x)")
+    print(f"{len(X)} linhas: sklearn {skb:8.2f} ms | flat {flb:8.2f} ms ({skb / flb:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# src/inference/multi.py
+# Modelo multi-alvo t+1h: UMA floresta com várias saídas, treinada e servida de uma vez.
+# - Saídas contínuas (temperatura, umidade, prob. de chuva) + a classe WMO
+#   grossa em one-hot: a média das folhas de cada coluna one-hot é a fração
+#   de cada classe, ou seja, a probabilidade da classe
+# - As saídas são padronizadas (média 0, desvio 1) no fit para nenhuma
+#   dominar os splits (umidade varia em dezenas, o one-hot entre 0 e 1);
+#   predict() desfaz a padronização
+# - Mais alvos = mais colunas na MESMA floresta: as features são montadas uma
+#   vez e cada previsão é uma única descida pelas árvores
+# - A floresta pode ser a do sklearn ou a FlatForest (src/inference/forest.py);
+#   os metadados também vão para um .json ao lado do .pkl (backend flat)
+from pathlib import Path
+import json
+
+import numpy as np
+
+from src.processing.prepare_data import TARGETS, WMO_CLASSES
+
+WMO_TARGET = TARGETS["wmo"]
+# limites físicos das saídas contínuas
+CLIP = {TARGETS["humidity"]: (0, 100), TARGETS["pop"]: (0, 100)}
+
+
+def output_columns(targets: list) -> list:
+    """Colunas de saída: uma por alvo contínuo + uma por classe WMO."""
+    cols = []
+    for t in targets:
+        if t == WMO_TARGET:
+            cols += [f"{WMO_TARGET}={k}" for k in range(len(WMO_CLASSES))]
+        else:
+            cols.append(t)
+    return cols
+
+
+def encode_targets(Y: np.ndarray, targets: list) -> np.ndarray:
+    """(linhas, alvos) -> (linhas, saídas): classe WMO vira one-hot."""
+    blocks = []
+    for j, t in enumerate(targets):
+        if t == WMO_TARGET:
+            blocks.append(np.eye(len(WMO_CLASSES))[Y[:, j].astype(int)])
+        else:
+            blocks.append(Y[:, j : j + 1])
+    return np.hstack(blocks)
+
+
+class MultiTargetModel:
+    """Floresta multi-saída + padronização + decodificação por alvo."""
+
+    def __init__(self, forest, targets: list, y_mean, y_std):
+        self.forest = forest
+        self.targets = list(targets)
+        self.outputs = output_columns(self.targets)
+        self.y_mean = np.asarray(y_mean, dtype=np.float64)
+        self.y_std = np.asarray(y_std, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, forest, X: np.ndarray, Y: np.ndarray, targets: list) -> "MultiTargetModel":
+        """Y: (linhas, alvos) com a classe WMO como índice; treina `forest` (não ajustada)."""
+        Z = encode_targets(Y, targets)
+        mean, std = Z.mean(axis=0), Z.std(axis=0)
+        std[std == 0] = 1.0
+        forest.fit(X, (Z - mean) / std)
+        return cls(forest, targets, mean, std)
+
+    def predict(self, X) -> np.ndarray:
+        """(linhas, saídas) na escala original (one-hot = probabilidades)."""
+        Z = np.asarray(self.forest.predict(X)).reshape(len(X), -1)
+        return Z * self.y_std + self.y_mean
+
+    def decode(self, raw: np.ndarray) -> list:
+        """Saídas -> um dict por linha: valor de cada alvo; WMO com classe, rótulo e probabilidades."""
+        rows = []
+        for r in np.atleast_2d(raw):
+            out, j = {}, 0
+            for t in self.targets:
+                if t == WMO_TARGET:
+                    proba = np.clip(r[j : j + len(WMO_CLASSES)], 0, 1)
+                    k = int(proba.argmax())
+                    out[t] = k
+                    out["wmo_label"] = WMO_CLASSES[k]
+                    out["wmo_proba"] = {c: round(float(p), 4) for c, p in zip(WMO_CLASSES, proba)}
+                    j += len(WMO_CLASSES)
+                else:
+                    lo, hi = CLIP.get(t, (-np.inf, np.inf))
+                    out[t] = float(np.clip(r[j], lo, hi))
+                    j += 1
+            rows.append(out)
+        return rows
+
+    # ---------------- metadados (backend flat) ----------------
+    def meta(self) -> dict:
+        return {"targets": self.targets, "y_mean": self.y_mean.tolist(), "y_std": self.y_std.tolist()}
+
+    def save_meta(self, path: Path) -> None:
+        Path(path).write_text(json.dumps(self.meta(), ensure_ascii=False, indent=2), encoding="utf-8")
+
+    @classmethod
+    def from_meta(cls, forest, path: Path) -> "MultiTargetModel":
+        meta = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(forest, meta["targets"], meta["y_mean"], meta["y_std"])
+
+
+def meta_path(model_path: Path) -> Path:
+    """models/x.pkl -> models/x.json"""
+    return Path(model_path).with_suffix(".json")
@@ -1,22 +1,79 @@
 from pathlib import Path
-import duckdb, joblib, pandas as pd
+import json
+import os
+import numpy as np, pandas as pd
+from src.inference.forest import FlatForest, flat_path
+from src.inference.multi import MultiTargetModel, meta_path
+from src.ingestion.client import read_series
+from src.ingestion.metrics import FEATURE_BUILD_SECONDS, MODEL_PREDICT_SECONDS
 from src.processing.prepare_data import make_features
 
 DB_PATH = Path("data") / "rt_weather.duckdb"
 MODEL_PATH = Path("models") / "model_rf_temp_next_hour.pkl"
+FEATURES_PATH = Path("models") / "feature_cols.json"
+# modelo multi-alvo (train.py --targets temp,humidity,pop,wmo)
+MULTI_MODEL_PATH = Path("models") / "model_rf_multi_next_hour.pkl"
+# "flat": inferência pela floresta achatada (src/inference/forest.py), bem mais
+# rápida para poucas linhas; "sklearn" (padrão): o .pkl como está
+MODEL_BACKEND = os.environ.get("RT_WEATHER_MODEL_BACKEND", "sklearn").lower()
+
+# cache do modelo em memória, invalidado quando o arquivo muda (re-treino)
+_model_cache = {}
+
+def _load(path: Path, backend: str):
+    import joblib  # só quando há modelo a carregar (traz o sklearn junto com o pickle)
+
+    if backend != "flat":
+        return joblib.load(path)
+    npz, meta = flat_path(path), meta_path(path)
+    if npz.exists() and npz.stat().st_mtime >= path.stat().st_mtime:
+        forest = FlatForest.load(npz)
+        return MultiTargetModel.from_meta(forest, meta) if meta.exists() else forest
+    model = joblib.load(path)  # .npz ausente/antigo: converte em memória
+    if isinstance(model, MultiTargetModel):
+        model.forest = FlatForest.from_sklearn(model.forest)
+        return model
+    return FlatForest.from_sklearn(model)
+
+def load_model(path: Path = MODEL_PATH, backend: str = MODEL_BACKEND):
+    mtime = path.stat().st_mtime  # FileNotFoundError se ainda não treinou
+    key = (path.resolve().as_posix(), backend)
+    if key not in _model_cache or _model_cache[key][0] != mtime:
+        _model_cache[key] = (mtime, _load(path, backend))
+    return _model_cache[key][1]
+
+def model_version(path: Path = MODEL_PATH) -> str:
+    """Nome do arquivo + data de modificação (UTC), ex.: model_rf_temp_next_hour@20250101T120000."""
+    ts = pd.Timestamp(path.stat().st_mtime, unit="s")
+    return f"{path.stem}@{ts:%Y%m%dT%H%M%S}"
+
+def load_feature_cols(path: Path = FEATURES_PATH) -> list:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def predict_rows(model, X, mode: str = "batch"):
+    """model.predict medido em rt_model_predict_seconds{mode=...}.
+    Modelo treinado na matriz float32 (sem nomes de coluna) recebe X no mesmo
+    formato; modelos antigos, treinados em DataFrame, recebem X como veio."""
+    if not hasattr(model, "feature_names_in_"):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+    with MODEL_PREDICT_SECONDS.time(mode=mode):
+        return model.predict(X)
+
+def predict_targets(model: MultiTargetModel, X, mode: str = "multi") -> list:
+    """Todos os alvos do modelo multi-alvo numa chamada: um dict por linha."""
+    return model.decode(predict_rows(model, X, mode=mode))
 
 def main():
-    con = duckdb.connect(DB_PATH.as_posix())
-    df = con.execute("SELECT * FROM raw.weather_hourly ORDER BY ts").df()
-    con.close()
+    df = read_series(db_path=DB_PATH)
     if df.empty or len(df) < 12:
         print("[WARN] dados insuficientes, rode a API /backfill e /collect.")
         return
-    feat = make_features(df)
+    with FEATURE_BUILD_SECONDS.time(source="pandas"):
+        feat = make_features(df)
     # última linha contém features para prever a próxima hora do último ponto observado
-    x = feat.drop(columns=["temp_t_plus_1h","ts"]).iloc[[-1]]
-    model = joblib.load(MODEL_PATH)
-    pred = model.predict(x)[0]
+    x = feat.reindex(columns=load_feature_cols()).iloc[[-1]]
+    model = load_model()
+    pred = predict_rows(model, x, mode="single")[0]
     print(f"Previsão para a PRÓXIMA hora: {pred:.2f} °C")
 
 if __name__ == "__main__":
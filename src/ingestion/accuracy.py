@@ -0,0 +1,208 @@
+# src/ingestion/accuracy.py
+# Log das previsões servidas + acurácia do modelo em produção, atualizada aos poucos.
+# - meta.predictions: uma linha por (local, target_ts, model_version) servida
+#   (issued_at, y_hat); a mesma previsão pedida de novo (rerun do app) não duplica
+# - Quando a ingestão grava linhas novas, o escritor chama score_new_rows() na
+#   MESMA transação: ASOF JOIN das previsões ainda sem valor real contra SÓ as
+#   linhas novas (não relê a série nem refaz backtest)
+# - Os erros entram somados em meta.prediction_accuracy por local/versão/dia
+#   (n, soma |erro|, soma erro²); MAE/RMSE dos últimos N dias = soma dos baldes
+# - Exposto pela API em /accuracy e em /metrics (rt_model_mae / rt_model_rmse)
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+import pandas as pd
+
+DB_PATH = Path("data") / "rt_weather.duckdb"
+ACCURACY_DAYS = 7  # janela padrão do MAE/RMSE "rolante"
+
+
+def ensure_prediction_tables(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("CREATE SCHEMA IF NOT EXISTS meta;")
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta.predictions (
+            latitude DOUBLE,
+            longitude DOUBLE,
+            issued_at TIMESTAMP,
+            target_ts TIMESTAMP,
+            model_version VARCHAR,
+            y_hat DOUBLE,
+            actual DOUBLE,
+            scored_at TIMESTAMP,
+            PRIMARY KEY (latitude, longitude, target_ts, model_version)
+        );
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta.prediction_accuracy (
+            latitude DOUBLE,
+            longitude DOUBLE,
+            model_version VARCHAR,
+            day DATE,
+            n INTEGER,
+            sum_abs_err DOUBLE,
+            sum_sq_err DOUBLE,
+            last_target_ts TIMESTAMP,
+            PRIMARY KEY (latitude, longitude, model_version, day)
+        );
+        """
+    )
+
+
+def _now():
+    return pd.Timestamp.now("UTC").tz_localize(None).floor("s").to_pydatetime()
+
+
+def _score(con: duckdb.DuckDBPyConnection, rows_sql: str, params: list) -> int:
+    """Casa previsões pendentes com as linhas de `rows_sql` (ASOF: última linha na
+    hora até target_ts), grava o valor real e soma os erros nos baldes diários."""
+    con.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE _pred_scored AS
+        WITH actual AS (
+          SELECT round(latitude,4) AS latitude, round(longitude,4) AS longitude,
+                 ts, AVG(temperature_2m) AS y
+          FROM ({rows_sql})
+          WHERE temperature_2m IS NOT NULL
+          GROUP BY ALL
+        ),
+        pending AS (
+          SELECT p.*
+          FROM meta.predictions p
+          SEMI JOIN (SELECT DISTINCT latitude, longitude FROM actual) l
+            ON p.latitude = l.latitude AND p.longitude = l.longitude
+          WHERE p.actual IS NULL
+        )
+        SELECT p.latitude, p.longitude, p.target_ts, p.model_version, p.y_hat, a.y AS actual
+        FROM pending p
+        ASOF JOIN actual a
+          ON p.latitude = a.latitude AND p.longitude = a.longitude AND p.target_ts >= a.ts
+        WHERE a.ts > p.target_ts - INTERVAL 1 HOUR
+        """,
+        params,
+    )
+    n = con.execute("SELECT COUNT(*) FROM _pred_scored").fetchone()[0]
+    if n:
+        con.execute(
+            """
+            UPDATE meta.predictions p
+            SET actual = s.actual, scored_at = ?
+            FROM _pred_scored s
+            WHERE p.latitude = s.latitude AND p.longitude = s.longitude
+              AND p.target_ts = s.target_ts AND p.model_version = s.model_version
+            """,
+            [_now()],
+        )
+        con.execute(
+            """
+            INSERT INTO meta.prediction_accuracy
+            SELECT latitude, longitude, model_version, CAST(target_ts AS DATE) AS day,
+                   COUNT(*), SUM(abs(actual - y_hat)), SUM((actual - y_hat) ^ 2), MAX(target_ts)
+            FROM _pred_scored
+            GROUP BY ALL
+            ON CONFLICT DO UPDATE SET
+              n = n + EXCLUDED.n,
+              sum_abs_err = sum_abs_err + EXCLUDED.sum_abs_err,
+              sum_sq_err = sum_sq_err + EXCLUDED.sum_sq_err,
+              last_target_ts = greatest(last_target_ts, EXCLUDED.last_target_ts)
+            """
+        )
+    con.execute("DROP TABLE _pred_scored")
+    return int(n)
+
+
+def score_new_rows(con: duckdb.DuckDBPyConnection, relation: str = "_ingest_new") -> int:
+    """Chamado pelo escritor depois do INSERT: pontua só com as linhas recém-gravadas."""
+    return _score(con, f"SELECT * FROM {relation}", [])
+
+
+def log_predictions(con: duckdb.DuckDBPyConnection, preds: pd.DataFrame) -> int:
+    """Grava previsões servidas (latitude, longitude, target_ts, model_version, y_hat).
+    Se o valor real já estiver gravado (ex.: previsões históricas), pontua na hora."""
+    if preds.empty:
+        return 0
+    ensure_prediction_tables(con)
+    df = preds[["latitude", "longitude", "target_ts", "model_version", "y_hat"]].copy()
+    df["latitude"], df["longitude"] = df["latitude"].round(4), df["longitude"].round(4)
+    df["target_ts"] = pd.to_datetime(df["target_ts"])
+    if "issued_at" in preds:
+        df["issued_at"] = pd.to_datetime(preds["issued_at"])
+    else:
+        df["issued_at"] = _now()
+    con.register("_pred_batch", df)
+    con.execute("BEGIN TRANSACTION")
+    try:
+        before = con.execute("SELECT COUNT(*) FROM meta.predictions").fetchone()[0]
+        con.execute(
+            """
+            INSERT OR IGNORE INTO meta.predictions
+              (latitude, longitude, issued_at, target_ts, model_version, y_hat)
+            SELECT latitude, longitude, issued_at, target_ts, model_version, y_hat
+            FROM _pred_batch
+            """
+        )
+        logged = con.execute("SELECT COUNT(*) FROM meta.predictions").fetchone()[0] - before
+        # real já gravado: só as horas-alvo deste lote, por local
+        _score(
+            con,
+            """
+            SELECT w.*
+            FROM raw.weather_hourly w
+            SEMI JOIN _pred_batch b
+              ON round(w.latitude,4) = b.latitude AND round(w.longitude,4) = b.longitude
+             AND w.ts > b.target_ts - INTERVAL 1 HOUR AND w.ts <= b.target_ts
+            """,
+            [],
+        )
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.unregister("_pred_batch")
+    return int(logged)
+
+
+def log_prediction(
+    con: duckdb.DuckDBPyConnection, lat: float, lon: float, target_ts, model_version: str, y_hat: float
+) -> int:
+    return log_predictions(
+        con,
+        pd.DataFrame(
+            [{"latitude": lat, "longitude": lon, "target_ts": target_ts,
+              "model_version": model_version, "y_hat": float(y_hat)}]
+        ),
+    )
+
+
+def accuracy_query(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    days: int = ACCURACY_DAYS,
+    model_version: Optional[str] = None,
+    now=None,
+) -> tuple:
+    """(sql, params): MAE/RMSE por local e versão do modelo nos últimos `days` dias."""
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now("UTC").tz_localize(None)
+    where, params = ["day >= ?"], [(now - pd.Timedelta(days=days)).date()]
+    if lat is not None and lon is not None:
+        where.append("latitude = round(?,4) AND longitude = round(?,4)")
+        params += [lat, lon]
+    if model_version:
+        where.append("model_version = ?")
+        params.append(model_version)
+    sql = f"""
+        SELECT latitude, longitude, model_version,
+               CAST(SUM(n) AS INTEGER) AS n,
+               SUM(sum_abs_err) / SUM(n) AS mae,
+               sqrt(SUM(sum_sq_err) / SUM(n)) AS rmse,
+               MAX(last_target_ts) AS last_target_ts
+        FROM meta.prediction_accuracy
+        WHERE {" AND ".join(where)}
+        GROUP BY ALL
+        ORDER BY latitude, longitude, model_version
+    """
+    return sql, params
@@ -0,0 +1,201 @@
+# src/ingestion/alerts.py
+# Alertas por regra (tempestade, calor, chuva forte, vento forte) avaliados NA INGESTÃO.
+# - Cada regra = coluna de raw.weather_hourly + limiar (configurável por
+#   variável de ambiente, ex.: RT_WEATHER_ALERT_HEAT=35)
+# - O escritor chama update_alerts() na mesma transação do INSERT, só com as
+#   linhas novas (_ingest_new): nada de reler o histórico da cidade
+# - Horas que disparam viram episódios ("gaps and islands", como na auditoria):
+#   horas a até MERGE_GAP_H uma da outra são o mesmo episódio
+# - meta.alerts guarda o episódio MAIS RECENTE por (local, regra); um lote novo
+#   estende o episódio se encostar nele, substitui se for mais novo e é ignorado
+#   se for mais antigo (backfill de histórico não apaga o alerta atual)
+# - Ativo = última hora que disparou a até ACTIVE_HOURS de agora (ou no futuro)
+# - Exposto em /alerts; o app só lê os alertas ativos
+#
+# Uso (banco que já tinha dados antes dos alertas):
+#   python -m src.ingestion.alerts --rebuild
+import argparse
+import os
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+import pandas as pd
+import requests
+
+DB_PATH = Path("data") / "rt_weather.duckdb"
+
+
+def _env(name: str, default: float) -> float:
+    return float(os.environ.get(f"RT_WEATHER_ALERT_{name}", default))
+
+
+# regra -> coluna, limiar (valor >= limiar dispara), unidade, rótulo e ícone
+RULES = {
+    "storm": {"column": "weathercode", "threshold": _env("STORM", 95), "unit": "WMO",
+              "label": "Tempestade", "icon": "⛈️"},
+    "heat": {"column": "temperature_2m", "threshold": _env("HEAT", 37), "unit": "°C",
+             "label": "Onda de calor", "icon": "🥵"},
+    "heavy_rain": {"column": "precipitation", "threshold": _env("HEAVY_RAIN", 10), "unit": "mm/h",
+                   "label": "Chuva forte", "icon": "🌧️"},
+    "strong_wind": {"column": "wind_speed_10m", "threshold": _env("STRONG_WIND", 60), "unit": "km/h",
+                    "label": "Vento forte", "icon": "💨"},
+}
+MERGE_GAP_H = int(os.environ.get("RT_WEATHER_ALERT_MERGE_GAP_H", "3"))
+ACTIVE_HOURS = int(os.environ.get("RT_WEATHER_ALERT_ACTIVE_HOURS", "6"))
+
+
+def ensure_alerts_table(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("CREATE SCHEMA IF NOT EXISTS meta;")
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta.alerts (
+            latitude DOUBLE,
+            longitude DOUBLE,
+            rule VARCHAR,
+            threshold DOUBLE,
+            first_ts TIMESTAMP,
+            last_ts TIMESTAMP,
+            peak DOUBLE,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (latitude, longitude, rule)
+        );
+        """
+    )
+
+
+def _hits_sql(relation: str) -> str:
+    """Uma linha por (local, regra, hora) que dispara, vinda de `relation`."""
+    parts = [
+        f"""
+        SELECT round(latitude,4) AS latitude, round(longitude,4) AS longitude,
+               '{name}' AS rule, {r['threshold']}::DOUBLE AS threshold,
+               date_trunc('hour', ts) AS ts, {r['column']}::DOUBLE AS value
+        FROM {relation}
+        WHERE {r['column']} >= {r['threshold']}
+        """
+        for name, r in RULES.items()
+    ]
+    return " UNION ALL ".join(parts)
+
+
+def update_alerts(con: duckdb.DuckDBPyConnection, relation: str = "_ingest_new") -> int:
+    """Avalia as regras nas linhas de `relation` e atualiza meta.alerts; devolve os episódios vistos."""
+    gap = f"INTERVAL {MERGE_GAP_H} HOUR"
+    con.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE _alert_new AS
+        WITH hits AS ({_hits_sql(relation)}),
+        marked AS (
+          SELECT *,
+                 CASE WHEN ts - LAG(ts) OVER w <= {gap} THEN 0 ELSE 1 END AS starts
+          FROM (SELECT latitude, longitude, rule, threshold, ts, MAX(value) AS value FROM hits GROUP BY ALL)
+          WINDOW w AS (PARTITION BY latitude, longitude, rule ORDER BY ts)
+        ),
+        islands AS (
+          SELECT *, SUM(starts) OVER (PARTITION BY latitude, longitude, rule ORDER BY ts) AS island
+          FROM marked
+        )
+        SELECT latitude, longitude, rule, threshold,
+               MIN(ts) AS first_ts, MAX(ts) AS last_ts, MAX(value) AS peak
+        FROM islands
+        GROUP BY latitude, longitude, rule, threshold, island
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY latitude, longitude, rule ORDER BY MAX(ts) DESC) = 1
+        """
+    )
+    n = con.execute("SELECT COUNT(*) FROM _alert_new").fetchone()[0]
+    if n:
+        now = pd.Timestamp.now("UTC").tz_localize(None).floor("s").to_pydatetime()
+        touches = f"(EXCLUDED.first_ts <= last_ts + {gap} AND EXCLUDED.last_ts >= first_ts - {gap})"
+        newer = "(EXCLUDED.last_ts > last_ts)"
+        con.execute(
+            f"""
+            INSERT INTO meta.alerts
+            SELECT latitude, longitude, rule, threshold, first_ts, last_ts, peak, ?::TIMESTAMP
+            FROM _alert_new
+            ON CONFLICT DO UPDATE SET
+              threshold = CASE WHEN {touches} OR {newer} THEN EXCLUDED.threshold ELSE threshold END,
+              first_ts = CASE WHEN {touches} THEN least(first_ts, EXCLUDED.first_ts)
+                              WHEN {newer} THEN EXCLUDED.first_ts ELSE first_ts END,
+              last_ts = CASE WHEN {touches} OR {newer} THEN greatest(last_ts, EXCLUDED.last_ts) ELSE last_ts END,
+              peak = CASE WHEN {touches} THEN greatest(peak, EXCLUDED.peak)
+                          WHEN {newer} THEN EXCLUDED.peak ELSE peak END,
+              updated_at = CASE WHEN {touches} OR {newer} THEN EXCLUDED.updated_at ELSE updated_at END
+            """,
+            [now],
+        )
+    con.execute("DROP TABLE _alert_new")
+    return int(n)
+
+
+def rebuild_alerts(con: duckdb.DuckDBPyConnection) -> int:
+    """Refaz meta.alerts a partir de todo raw.weather_hourly (uma vez, p/ banco antigo)."""
+    ensure_alerts_table(con)
+    con.execute("BEGIN TRANSACTION")
+    try:
+        con.execute("DELETE FROM meta.alerts")
+        n = update_alerts(con, "raw.weather_hourly")
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return n
+
+
+def alerts_query(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    active_only: bool = True,
+    active_hours: int = ACTIVE_HOURS,
+    now=None,
+) -> tuple:
+    """(sql, params): episódio mais recente por local/regra (só os ativos, por padrão)."""
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now("UTC").tz_localize(None)
+    where, params = [], []
+    if lat is not None and lon is not None:
+        where.append("latitude = round(?,4) AND longitude = round(?,4)")
+        params += [lat, lon]
+    if active_only:
+        where.append("last_ts >= ?")
+        params.append((now - pd.Timedelta(hours=active_hours)).to_pydatetime())
+    sql = f"""
+        SELECT latitude, longitude, rule, threshold, first_ts, last_ts, peak, updated_at
+        FROM meta.alerts
+        {("WHERE " + " AND ".join(where)) if where else ""}
+        ORDER BY latitude, longitude, rule
+    """
+    return sql, params
+
+
+def describe(rule: str, peak: float) -> str:
+    """Texto curto do alerta para a UI, ex.: '🥵 **Onda de calor** (pico 38.2 °C)'."""
+    r = RULES.get(rule, {"label": rule, "icon": "⚠️", "unit": ""})
+    detail = f"código {peak:.0f}" if r["unit"] == "WMO" else f"pico {peak:.1f} {r['unit']}"
+    return f"{r['icon']} **{r['label']}** ({detail})"
+
+
+def main():
+    from src.ingestion.client import API_BASE  # client importa este módulo
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rebuild", action="store_true", help="refaz meta.alerts com todo o histórico")
+    args = ap.parse_args()
+    if not args.rebuild:
+        ap.error("nada a fazer (use --rebuild)")
+
+    try:
+        # API no ar: a reconstrução entra na fila do escritor dela
+        r = requests.post(f"{API_BASE}/alerts/rebuild", timeout=3600)
+        r.raise_for_status()
+        n = r.json()["episodes"]
+    except requests.ConnectionError:
+        if not DB_PATH.exists():
+            print("Banco não encontrado. Faça backfill/coleta primeiro.")
+            return
+        with duckdb.connect(DB_PATH.as_posix()) as con:
+            n = rebuild_alerts(con)
+    print(f"[OK] meta.alerts refeita: {n} episódios (local x regra)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,37 @@
 # - /collect: últimas horas (forecast) -> filtra FUTURO
 # - /backfill: histórico por intervalo (start_date/end_date) ou por 'days'
 # - Dedup por (ts, latitude, longitude)
-# - Lat/Lon normalizados (4 casas)
+# - Lat/Lon normalizados (4 casas); coleta/backfill a até RT_WEATHER_SNAP_KM de
+#   um local já gravado usam esse local (src/ingestion/locations.py)
+# - /locations/nearest: locais gravados mais próximos de uma coordenada
+# - /jobs/*: mesma coleta/backfill em background (polling por job_id)
+# - /watermark: último ts gravado por local (para auto-refresh do app)
+# - /series, /features: leitura em Arrow IPC / Parquet / JSON (streaming);
+#   app e scripts leem por aqui -> só o processo da API abre o arquivo DuckDB
+# - /audit/*: auditoria de cobertura de todos os locais (meta.coverage)
+# - /predict: previsão t+1h de um local (features em SQL + modelo em memória);
+#   multi=true inclui umidade, prob. de chuva e condição (modelo multi-alvo);
+#   cada previsão servida vai para meta.predictions
+# - /alerts: alertas ativos (tempestade, calor, chuva e vento fortes) por local,
+#   avaliados na ingestão só sobre as linhas novas (src/ingestion/alerts.py)
+# - /accuracy: MAE/RMSE por local e versão do modelo, atualizados a cada ingestão
+#   (ASOF JOIN só das linhas novas, src/ingestion/accuracy.py)
+# - /metrics: métricas Prometheus (etapas da ingestão, erros upstream, lag, ...)
+# - Escritas (ingestão, delete, auditoria) passam por UM escritor com fila e
+#   micro-lotes (src/ingestion/writer.py): sem disputa de lock entre requisições
+# - DELETE /raw: limpeza de dados brutos (usada pelos botões do app)
+# - /retention/run: horário só dos últimos N dias, resto em refined.weather_daily
+#   (+ Parquet em data/archive) e CHECKPOINT
+# - Nada de DuckDB no import: pasta e tabelas são criadas no lifespan do app
+#   (partida do worker) e o escritor é fechado nele, na saída
+# - Profiling opcional (RT_WEATHER_PROFILE=1 ou header X-Profile: 1): cProfile
+#   do endpoint + plano de cada statement DuckDB em profiles/
 
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 from datetime import date, timedelta
 from typing import Optional
@@ -12,149 +41,335 @@ from typing import Optional
 import duckdb
 import pandas as pd
 import requests
-from fastapi import FastAPI, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from src.ingestion.accuracy import (
+    ACCURACY_DAYS,
+    accuracy_query,
+    ensure_prediction_tables,
+    log_prediction,
+    score_new_rows,
+)
+from src.ingestion.alerts import ACTIVE_HOURS, alerts_query, ensure_alerts_table, rebuild_alerts, update_alerts
+from src.ingestion.arrow_stream import MEDIA_TYPES, STREAMERS
+from src.ingestion.audit_fleet import ensure_meta_tables, run_fleet_audit
+from src.ingestion import profiling
+from src.ingestion.jobs import JobRegistry
+from src.ingestion.locations import SNAP_KM, LocationIndex
+from src.ingestion.payload import HOURLY_VARS, drop_future, parse_payload, payload_to_arrow, ts_bounds
+from src.ingestion.writer import IngestWriter, insert_batch
+from src.ingestion.metrics import (
+    ALERTS_ACTIVE,
+    DB_FILE_BYTES,
+    FEATURE_BUILD_SECONDS,
+    HTTP_REQUEST_SECONDS,
+    INGEST_LAG_HOURS,
+    INGEST_STAGE_SECONDS,
+    MODEL_MAE,
+    MODEL_RMSE,
+    REGISTRY,
+    ROWS_INGESTED,
+    UPSTREAM_ERRORS,
+)
+from src.ingestion.queries import (
+    COMPACT_TYPES,
+    RAW_TYPES,
+    delete_raw_rows,
+    features_query,
+    raw_table_ddl,
+    series_query,
+)
+from src.ingestion.retention import ARCHIVE_DIR, DAILY_DAYS, HOURLY_DAYS, apply_retention, ensure_daily_table
+from src.inference.predict import (
+    MULTI_MODEL_PATH,
+    load_feature_cols,
+    load_model,
+    model_version,
+    predict_rows,
+    predict_targets,
+)
 
 # ---------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------
 DB_PATH = Path("data") / "rt_weather.duckdb"
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-HOURLY_VARS = [
-    "temperature_2m",
-    "relative_humidity_2m",   # pode vir como 'relativehumidity_2m'
-    "precipitation",
-    "wind_speed_10m",         # pode vir como 'windspeed_10m'
-    "weathercode",
-    "precipitation_probability",
-    "cloudcover",
-]
+# upstream configurável (ex.: stub local em benchmarks/openmeteo_stub.py)
+FORECAST_URL = os.environ.get("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+ARCHIVE_URL = os.environ.get("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+# tipos compactos (REAL/UTINYINT) para banco novo; ver queries.COMPACT_TYPES
+COMPACT = os.environ.get("RT_WEATHER_COMPACT", "").lower() in ("1", "true", "yes")
+
 
 # ---------------------------------------------------------------------
 # DuckDB: criar tabela se não existir (10 colunas)
 # ---------------------------------------------------------------------
-def ensure_table() -> None:
-    con = duckdb.connect(DB_PATH.as_posix())
+def _create_tables(con: duckdb.DuckDBPyConnection) -> None:
     con.execute("CREATE SCHEMA IF NOT EXISTS raw;")
-    con.execute(
-        """
-        CREATE TABLE IF NOT EXISTS raw.weather_hourly (
-            ts TIMESTAMP,
-            latitude DOUBLE,
-            longitude DOUBLE,
-            temperature_2m DOUBLE,
-            relative_humidity_2m DOUBLE,
-            precipitation DOUBLE,
-            wind_speed_10m DOUBLE,
-            weathercode SMALLINT,
-            precipitation_probability DOUBLE,
-            cloudcover DOUBLE
-        );
-        """
-    )
+    # só vale para banco novo; um banco existente é convertido por
+    # scripts/migrate_duckdb.py --compact
+    types = COMPACT_TYPES if COMPACT else RAW_TYPES
+    con.execute(raw_table_ddl(COMPACT))
     # Migração idempotente (ignora se já existir)
-    for col, typ in [
-        ("weathercode", "SMALLINT"),
-        ("precipitation_probability", "DOUBLE"),
-        ("cloudcover", "DOUBLE"),
-    ]:
+    for col in ("weathercode", "precipitation_probability", "cloudcover"):
+        typ = types[col]
         try:
             con.execute(f"ALTER TABLE raw.weather_hourly ADD COLUMN {col} {typ};")
         except Exception:
             pass
-    con.close()
+    ensure_meta_tables(con)
+    ensure_prediction_tables(con)
+    ensure_alerts_table(con)
+    ensure_daily_table(con)
+
+
+def ensure_table() -> None:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect(DB_PATH.as_posix())
+    try:
+        _create_tables(con)
+    finally:
+        con.close()
+
+
+def _on_insert(con: duckdb.DuckDBPyConnection) -> None:
+    """Na transação de cada lote, só com as linhas novas (_ingest_new)."""
+    score_new_rows(con)  # previsões que esperavam por estas horas
+    update_alerts(con)   # regras de alerta
+
+
+# único escritor do arquivo neste processo (recria as tabelas ao conectar)
+writer = IngestWriter(DB_PATH, on_connect=_create_tables, on_insert=_on_insert)
+
+# conexão de leitura compartilhada pelo processo (um cursor por requisição)
+_read_con: Optional[duckdb.DuckDBPyConnection] = None
+_read_lock = threading.Lock()
+
+
+def _reader() -> duckdb.DuckDBPyConnection:
+    global _read_con
+    with _read_lock:
+        if _read_con is None:
+            _read_con = duckdb.connect(DB_PATH.as_posix())
+        return profiling.wrap_connection(_read_con.cursor())
+
+
+# índice dos locais gravados; None = refazer na próxima consulta
+_locations: Optional[LocationIndex] = None
+_locations_lock = threading.Lock()
+
 
-ensure_table()
+def _location_index() -> LocationIndex:
+    global _locations
+    with _locations_lock:
+        if _locations is None:
+            con = _reader()
+            try:
+                _locations = LocationIndex.from_connection(con)
+            finally:
+                con.close()
+        return _locations
+
+
+def _invalidate_locations() -> None:
+    global _locations
+    with _locations_lock:
+        _locations = None
+
+
+def _snap(latitude: float, longitude: float, snap: bool) -> tuple:
+    """(lat, lon, snapped_from): coordenada do local gravado mais próximo dentro de
+    SNAP_KM, ou a pedida (4 casas); snapped_from = pedido original + distância, ou None."""
+    lat, lon = round(latitude, 4), round(longitude, 4)
+    near = _location_index().snap(lat, lon) if snap else None
+    if near is None or (near["lat"], near["lon"]) == (lat, lon):
+        return lat, lon, None
+    return near["lat"], near["lon"], {"lat": lat, "lon": lon, "distance_km": near["distance_km"]}
+
+
+def _after_ingest(lat: float, lon: float, inserted: int) -> None:
+    ROWS_INGESTED.inc(inserted, latitude=lat, longitude=lon)
+    if inserted and not _location_index().contains(lat, lon):
+        _invalidate_locations()  # local novo: entra no índice
 
 # ---------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------
 def _json_to_df(payload: dict, lat: float, lon: float) -> pd.DataFrame:
-    """Converte o JSON da Open-Meteo em DataFrame; ts fica naive em UTC."""
-    hourly = payload.get("hourly", {})
-    times = hourly.get("time", [])
-    n = len(times)
-
-    df = pd.DataFrame({"ts": pd.to_datetime(times, utc=True)})
-
-    # alguns campos têm nome alternativo na API
-    def pick(key: str):
-        if key == "relative_humidity_2m":
-            return hourly.get("relative_humidity_2m") or hourly.get("relativehumidity_2m")
-        if key == "wind_speed_10m":
-            return hourly.get("wind_speed_10m") or hourly.get("windspeed_10m")
-        return hourly.get(key)
-
-    for k in HOURLY_VARS:
-        vals = pick(k)
-        if vals is None or len(vals) != n:
-            vals = [None] * n
-        df[k] = vals
-
-    df["latitude"] = round(lat, 4)
-    df["longitude"] = round(lon, 4)
-
-    # deixa ts como naive em UTC (compatível com TIMESTAMP do DuckDB)
-    df["ts"] = pd.to_datetime(df["ts"], utc=True).dt.tz_localize(None)
-
-    # ordem final: ts, lat/lon, depois variáveis horárias
-    return df[["ts", "latitude", "longitude"] + HOURLY_VARS]
-
-
-def _insert_new_rows(con: duckdb.DuckDBPyConnection, df: pd.DataFrame) -> int:
-    """Conta e insere apenas as linhas novas usando SELECT … EXCEPT …"""
-    if df.empty:
-        return 0
-    con.register("df", df)
-
-    # Conta quantas serão inseridas
-    n = con.execute("""
-        SELECT COUNT(*) FROM (
-            SELECT
-              ts, latitude, longitude,
-              temperature_2m, relative_humidity_2m, precipitation, wind_speed_10m,
-              weathercode, precipitation_probability, cloudcover
-            FROM df
-            EXCEPT
-            SELECT
-              ts, latitude, longitude,
-              temperature_2m, relative_humidity_2m, precipitation, wind_speed_10m,
-              weathercode, precipitation_probability, cloudcover
-            FROM raw.weather_hourly
-        ) t
-    """).fetchone()[0]
-
-    # Faz o INSERT
-    con.execute("""
-        INSERT INTO raw.weather_hourly (
-          ts, latitude, longitude,
-          temperature_2m, relative_humidity_2m, precipitation, wind_speed_10m,
-          weathercode, precipitation_probability, cloudcover
-        )
-        SELECT
-          ts, latitude, longitude,
-          temperature_2m, relative_humidity_2m, precipitation, wind_speed_10m,
-          weathercode, precipitation_probability, cloudcover
-        FROM df
-        EXCEPT
-        SELECT
-          ts, latitude, longitude,
-          temperature_2m, relative_humidity_2m, precipitation, wind_speed_10m,
-          weathercode, precipitation_probability, cloudcover
-        FROM raw.weather_hourly;
-    """)
-
-    return int(n)
+    """Converte o JSON da Open-Meteo em DataFrame; ts fica naive em UTC.
+    Mantido por compatibilidade: a ingestão usa o pa.Table de parse_payload direto."""
+    return payload_to_arrow(payload, lat, lon).to_pandas()
+
+
+def _insert_new_rows(con: duckdb.DuckDBPyConnection, df, endpoint: str = "other") -> int:
+    """Grava só as linhas novas de `df` (pa.Table ou DataFrame) direto em `con`.
+    As requisições usam o escritor (writer.insert); isto fica para scripts/benchmarks."""
+    return insert_batch(con, [df], endpoint=endpoint)[0]
+
+
+def _fetch_upstream(url: str, endpoint: str, timeout: int) -> requests.Response:
+    """GET na Open-Meteo medindo a etapa 'fetch' e contando erros por motivo."""
+    try:
+        with INGEST_STAGE_SECONDS.time(endpoint=endpoint, stage="fetch"):
+            r = requests.get(url, timeout=timeout)
+            r.raise_for_status()
+        return r
+    except requests.HTTPError as e:
+        UPSTREAM_ERRORS.inc(endpoint=endpoint, reason=str(e.response.status_code))
+        raise
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(endpoint=endpoint, reason=type(e).__name__)
+        raise
+
+
+def _do_collect(latitude: float, longitude: float, past_hours: int, snap: bool = True) -> dict:
+    """Busca as últimas horas (forecast), descarta FUTURO e grava as linhas novas."""
+    lat, lon, snapped_from = _snap(latitude, longitude, snap)
+
+    hourly_list = ",".join(HOURLY_VARS)
+    url = (
+        f"{FORECAST_URL}"
+        f"?latitude={lat}&longitude={lon}"
+        f"&hourly={hourly_list}"
+        f"&past_hours={past_hours}"
+        f"&forecast_hours=48"
+        f"&timezone=UTC"
+    )
+    r = _fetch_upstream(url, "collect", timeout=30)
+    with INGEST_STAGE_SECONDS.time(endpoint="collect", stage="parse"):
+        tbl = parse_payload(r.content, lat, lon)
+
+    # filtra FUTURO (ts já é UTC naive)
+    tbl = drop_future(tbl)
+
+    # fila do escritor: espera o micro-lote em que este frame foi gravado
+    with INGEST_STAGE_SECONDS.time(endpoint="collect", stage="write"):
+        inserted = writer.insert(tbl).result()
+    _after_ingest(lat, lon, inserted)
+    first_ts, last_ts = ts_bounds(tbl)
+
+    return {
+        "inserted_rows": inserted,
+        "rows_returned": tbl.num_rows,
+        "lat": lat,
+        "lon": lon,
+        "snapped_from": snapped_from,
+        "timezone": "UTC",
+        "first_ts_utc": first_ts,
+        "last_ts_utc": last_ts,
+    }
+
+
+def _do_backfill(
+    latitude: float,
+    longitude: float,
+    days: int,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    snap: bool = True,
+) -> dict:
+    """Busca o histórico (archive) por intervalo ou pelos últimos `days` e grava as linhas novas."""
+    lat, lon, snapped_from = _snap(latitude, longitude, snap)
+
+    if not start_date or not end_date:
+        end = date.today()
+        start = end - timedelta(days=days)
+        s, e = start.isoformat(), end.isoformat()
+    else:
+        s, e = start_date, end_date
+
+    hourly_list = ",".join(HOURLY_VARS)
+    url = (
+        f"{ARCHIVE_URL}"
+        f"?latitude={lat}&longitude={lon}"
+        f"&start_date={s}&end_date={e}"
+        f"&hourly={hourly_list}"
+        f"&timezone=UTC"
+    )
+    r = _fetch_upstream(url, "backfill", timeout=60)
+    with INGEST_STAGE_SECONDS.time(endpoint="backfill", stage="parse"):
+        tbl = parse_payload(r.content, lat, lon)
+
+    # fila do escritor: espera o micro-lote em que este frame foi gravado
+    with INGEST_STAGE_SECONDS.time(endpoint="backfill", stage="write"):
+        inserted = writer.insert(tbl).result()
+    _after_ingest(lat, lon, inserted)
+    first_ts, last_ts = ts_bounds(tbl)
+
+    return {
+        "inserted_rows": inserted,
+        "rows_returned": tbl.num_rows,
+        "lat": lat,
+        "lon": lon,
+        "snapped_from": snapped_from,
+        "first_ts_utc": first_ts,
+        "last_ts_utc": last_ts,
+        "range_used": {"start_date": s, "end_date": e},
+    }
 
 # ---------------------------------------------------------------------
 # FastAPI
 # ---------------------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # tabelas antes da 1ª requisição (e não no import do módulo)
+    ensure_table()
+    yield
+    # grava o que estiver na fila do escritor antes de sair
+    writer.close()
+
+
 app = FastAPI(
     title="Tech Challenge Fase 3 – Weather API",
     description="Coleta de clima horário (Open-Meteo) + persistência em DuckDB",
-    version="1.2.0",
+    version="1.3.0",
+    lifespan=lifespan,
 )
+# rotas com gancho de cProfile (inativo sem RT_WEATHER_PROFILE / X-Profile)
+app.router.route_class = profiling.ProfiledRoute
+
+# coleta/backfill assíncronos: o cliente recebe o job_id e faz polling
+jobs = JobRegistry(max_workers=2)
+
+@app.middleware("http")
+async def _time_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - t0,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
+
+@app.middleware("http")
+async def _profile_requests(request: Request, call_next):
+    if not profiling.wants_profile(request.headers):
+        return await call_next(request)
+
+    prof, token = profiling.start(request.method, request.url.path)
+    t0 = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        profiling.stop(token)
+
+    # o resumo sai depois do corpo (respostas em streaming executam a consulta aos poucos)
+    body = response.body_iterator
+
+    async def _body_then_finish():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            prof.finish(response.status_code, time.perf_counter() - t0)
+
+    response.body_iterator = _body_then_finish()
+    response.headers["X-Profile-Dir"] = prof.dir.as_posix()
+    return response
 
 @app.get("/health")
 def health():
@@ -165,91 +380,423 @@ def collect(
     latitude: float = Query(-23.55),
     longitude: float = Query(-46.63),
     past_hours: int = Query(6, ge=1, le=168),
+    snap: bool = Query(True, description=f"usa o local gravado a até {SNAP_KM:g} km"),
 ):
     try:
-        ensure_table()
-        lat, lon = round(latitude, 4), round(longitude, 4)
+        return _do_collect(latitude, longitude, past_hours, snap)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
-        hourly_list = ",".join(HOURLY_VARS)
-        url = (
-            "https://api.open-meteo.com/v1/forecast"
-            f"?latitude={lat}&longitude={lon}"
-            f"&hourly={hourly_list}"
-            f"&past_hours={past_hours}"
-            f"&forecast_hours=48"
-            f"&timezone=UTC"
-        )
-        r = requests.get(url, timeout=30)
-        r.raise_for_status()
-        df = _json_to_df(r.json(), lat, lon)
-
-        # filtra FUTURO de forma tz-aware (evita erro de comparação)
-        ts_aware = pd.to_datetime(df["ts"], utc=True, errors="coerce")
-        df = df[ts_aware <= pd.Timestamp.now(tz="UTC")]
-
-        con = duckdb.connect(DB_PATH.as_posix())
-        inserted = _insert_new_rows(con, df)
-        first_ts = df["ts"].min().isoformat() if not df.empty else None
-        last_ts  = df["ts"].max().isoformat() if not df.empty else None
-        con.close()
+@app.post("/backfill")
+def backfill(
+    latitude: float = Query(-23.55),
+    longitude: float = Query(-46.63),
+    days: int = Query(30, ge=1, le=180),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    snap: bool = Query(True, description=f"usa o local gravado a até {SNAP_KM:g} km"),
+):
+    try:
+        return _do_backfill(latitude, longitude, days, start_date, end_date, snap)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
+@app.delete("/raw")
+def delete_raw(
+    latitude: Optional[float] = Query(None),
+    longitude: Optional[float] = Query(None),
+    all: bool = Query(False, description="apaga TODOS os locais (exige all=true)"),
+):
+    """Remove SOMENTE linhas de raw.weather_hourly: de um local ou (all=true) de todos."""
+    try:
+        if (latitude is None) != (longitude is None):
+            raise ValueError("informe latitude E longitude")
+        if latitude is None and not all:
+            raise ValueError("informe latitude/longitude ou all=true")
+        n = writer.run(lambda con: delete_raw_rows(con, latitude, longitude)).result()
+        _invalidate_locations()
+        return {"deleted_rows": n, "lat": latitude, "lon": longitude, "all": latitude is None}
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.get("/locations/nearest")
+def locations_nearest(
+    latitude: float = Query(...),
+    longitude: float = Query(...),
+    k: int = Query(1, ge=1, le=50),
+    radius_km: float = Query(SNAP_KM, ge=0, description="raio do snap (0 = nunca)"),
+):
+    """Locais gravados mais próximos (haversine) e, se houver um dentro do raio, o snap."""
+    try:
+        idx = _location_index()
         return {
-            "inserted_rows": inserted,
-            "rows_returned": int(len(df)),
-            "lat": lat,
-            "lon": lon,
-            "timezone": "UTC",
-            "first_ts_utc": first_ts,
-            "last_ts_utc": last_ts,
+            "lat": round(latitude, 4),
+            "lon": round(longitude, 4),
+            "radius_km": radius_km,
+            "snapped": idx.snap(latitude, longitude, radius_km),
+            "nearest": idx.nearest(latitude, longitude, k),
+            "locations": len(idx),
         }
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
-@app.post("/backfill")
-def backfill(
+# ---------------------------------------------------------------------
+# Jobs em background (não bloqueiam o dashboard)
+# ---------------------------------------------------------------------
+@app.post("/jobs/collect", status_code=202)
+def submit_collect(
+    latitude: float = Query(-23.55),
+    longitude: float = Query(-46.63),
+    past_hours: int = Query(6, ge=1, le=168),
+    snap: bool = Query(True),
+):
+    return jobs.submit(
+        "collect", _do_collect,
+        latitude=latitude, longitude=longitude, past_hours=past_hours, snap=snap,
+    )
+
+@app.post("/jobs/backfill", status_code=202)
+def submit_backfill(
     latitude: float = Query(-23.55),
     longitude: float = Query(-46.63),
     days: int = Query(30, ge=1, le=180),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
+    snap: bool = Query(True),
 ):
+    return jobs.submit(
+        "backfill", _do_backfill,
+        latitude=latitude, longitude=longitude, days=days,
+        start_date=start_date, end_date=end_date, snap=snap,
+    )
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = Query(None)):
+    return jobs.list(status)
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"job não encontrado: {job_id}"})
+    return job
+
+@app.get("/watermark")
+def watermark(
+    latitude: float = Query(-23.55),
+    longitude: float = Query(-46.63),
+):
+    """Primeiro/último ts gravado (UTC) e total de linhas do local: o app faz polling disto."""
     try:
-        ensure_table()
         lat, lon = round(latitude, 4), round(longitude, 4)
+        con = _reader()
+        first_ts, last_ts, n = con.execute(
+            """
+            SELECT MIN(ts), MAX(ts), COUNT(*)
+            FROM raw.weather_hourly
+            WHERE round(latitude,4)=? AND round(longitude,4)=?
+            """,
+            [lat, lon],
+        ).fetchone()
+        con.close()
+        return {
+            "lat": lat,
+            "lon": lon,
+            "first_ts_utc": first_ts.isoformat() if first_ts is not None else None,
+            "last_ts_utc": last_ts.isoformat() if last_ts is not None else None,
+            "rows": int(n),
+        }
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+# ---------------------------------------------------------------------
+# Leitura (streaming Arrow/Parquet/JSON direto dos RecordBatches do DuckDB)
+# ---------------------------------------------------------------------
+def _split_columns(columns: Optional[str]):
+    return [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+
+
+def _stream_query(sql: str, params: list, fmt: str, batch_rows: int) -> StreamingResponse:
+    cur = _reader()
+    try:
+        reader = cur.execute(sql, params).fetch_record_batch(batch_rows)
+    except Exception:
+        cur.close()
+        raise
+
+    def body():
+        try:
+            yield from STREAMERS[fmt](reader)
+        finally:
+            cur.close()
+
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[fmt])
 
-        if not start_date or not end_date:
-            end = date.today()
-            start = end - timedelta(days=days)
-            s, e = start.isoformat(), end.isoformat()
-        else:
-            s, e = start_date, end_date
-
-        hourly_list = ",".join(HOURLY_VARS)
-        url = (
-            "https://archive-api.open-meteo.com/v1/archive"
-            f"?latitude={lat}&longitude={lon}"
-            f"&start_date={s}&end_date={e}"
-            f"&hourly={hourly_list}"
-            f"&timezone=UTC"
+
+@app.get("/series")
+def series(
+    latitude: Optional[float] = Query(None),
+    longitude: Optional[float] = Query(None),
+    start: Optional[str] = Query(None, description="ISO 8601; sem fuso = UTC"),
+    end: Optional[str] = Query(None, description="ISO 8601; sem fuso = UTC"),
+    columns: Optional[str] = Query(None, description="lista separada por vírgula"),
+    bucket_hours: Optional[int] = Query(None, ge=1, le=8760),
+    format: str = Query("arrow", pattern="^(arrow|parquet|json)$"),
+    batch_rows: int = Query(65536, ge=1024, le=1_000_000),
+):
+    """Série bruta (ou agregada por balde de horas) de um local ou de todos."""
+    try:
+        sql, params = series_query(
+            latitude, longitude, start, end, _split_columns(columns), bucket_hours
         )
-        r = requests.get(url, timeout=60)
-        r.raise_for_status()
-        df = _json_to_df(r.json(), lat, lon)
-
-        con = duckdb.connect(DB_PATH.as_posix())
-        inserted = _insert_new_rows(con, df)
-        first_ts = df["ts"].min().isoformat() if not df.empty else None
-        last_ts  = df["ts"].max().isoformat() if not df.empty else None
-        con.close()
+        return _stream_query(sql, params, format, batch_rows)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/features")
+def features(
+    latitude: Optional[float] = Query(None),
+    longitude: Optional[float] = Query(None),
+    start: Optional[str] = Query(None, description="ISO 8601; sem fuso = UTC"),
+    end: Optional[str] = Query(None, description="ISO 8601; sem fuso = UTC"),
+    columns: Optional[str] = Query(None, description="lista separada por vírgula"),
+    latest: bool = Query(False, description="só a última hora de cada local"),
+    format: str = Query("arrow", pattern="^(arrow|parquet|json)$"),
+    batch_rows: int = Query(65536, ge=1024, le=1_000_000),
+):
+    """Features do modelo (mesmas de make_features), calculadas no DuckDB."""
+    try:
+        sql, params = features_query(
+            latitude, longitude, start, end, _split_columns(columns), latest
+        )
+        return _stream_query(sql, params, format, batch_rows)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
+# ---------------------------------------------------------------------
+# Auditoria de cobertura (todos os locais, em SQL)
+# ---------------------------------------------------------------------
+@app.post("/audit/run")
+def audit_run(days: int = Query(30, ge=1, le=3650)):
+    """Recalcula meta.coverage / meta.coverage_gaps e devolve a cobertura por local."""
+    try:
+        cov = writer.run(lambda con: run_fleet_audit(con, days)).result()
         return {
-            "inserted_rows": inserted,
-            "rows_returned": int(len(df)),
+            "days": days,
+            "audited_locations": int(len(cov)),
+            "locations": json.loads(cov.to_json(orient="records", date_format="iso")),
+        }
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/audit/coverage")
+def audit_coverage(
+    max_coverage_pct: Optional[float] = Query(None, description="só locais abaixo deste %"),
+    format: str = Query("json", pattern="^(arrow|parquet|json)$"),
+):
+    """Último snapshot de meta.coverage (pior cobertura primeiro)."""
+    try:
+        where, params = "", []
+        if max_coverage_pct is not None:
+            where, params = "WHERE coverage_pct < ?", [max_coverage_pct]
+        sql = f"SELECT * FROM meta.coverage {where} ORDER BY coverage_pct, latitude, longitude"
+        return _stream_query(sql, params, format, 65536)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/audit/gaps")
+def audit_gaps(
+    latitude: Optional[float] = Query(None),
+    longitude: Optional[float] = Query(None),
+    format: str = Query("json", pattern="^(arrow|parquet|json)$"),
+):
+    """Buracos (horas faltantes consecutivas) do último snapshot."""
+    try:
+        where, params = "", []
+        if latitude is not None and longitude is not None:
+            where = "WHERE round(latitude,4)=round(?,4) AND round(longitude,4)=round(?,4)"
+            params = [latitude, longitude]
+        sql = f"SELECT * FROM meta.coverage_gaps {where} ORDER BY latitude, longitude, gap_start"
+        return _stream_query(sql, params, format, 65536)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+# ---------------------------------------------------------------------
+# Retenção (na fila do escritor; reescrever o arquivo só pela CLI, com a API parada)
+# ---------------------------------------------------------------------
+@app.post("/retention/run")
+def retention_run(
+    hourly_days: int = Query(HOURLY_DAYS, ge=1),
+    daily_days: int = Query(DAILY_DAYS, ge=0, description="0 = manter rollups para sempre"),
+    archive: bool = Query(True, description="grava o que sai em Parquet antes de apagar"),
+    dry_run: bool = Query(False),
+):
+    try:
+        report = writer.run(
+            lambda con: apply_retention(
+                con, DB_PATH, hourly_days, daily_days, ARCHIVE_DIR if archive else None, dry_run
+            )
+        ).result()
+        _invalidate_locations()
+        return report
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+# ---------------------------------------------------------------------
+# Inferência (t+1h) e métricas
+# ---------------------------------------------------------------------
+@app.get("/predict")
+def predict(
+    latitude: float = Query(-23.55),
+    longitude: float = Query(-46.63),
+    multi: bool = Query(False, description="inclui umidade, prob. de chuva e condição (se o modelo multi-alvo existir)"),
+    log: bool = Query(True, description="grava a previsão em meta.predictions"),
+):
+    """Previsão da próxima hora com as features da última hora gravada do local."""
+    try:
+        lat, lon = round(latitude, 4), round(longitude, 4)
+        cur = _reader()
+        try:
+            with FEATURE_BUILD_SECONDS.time(source="sql"):
+                feat = cur.execute(*features_query(lat, lon, latest=True)).df()
+        finally:
+            cur.close()
+        if feat.empty:
+            return JSONResponse(status_code=404, content={"error": "sem dados para este local"})
+
+        X = feat.reindex(columns=load_feature_cols(), fill_value=0)
+        if X.isna().any(axis=None):
+            return JSONResponse(
+                status_code=409, content={"error": "histórico insuficiente para as features (< 25 h)"}
+            )
+        # y_hat sempre do modelo de temperatura dedicado (erra menos que a saída
+        # de temperatura do multi-alvo); sem ele não há previsão (503)
+        y_hat = float(predict_rows(load_model(), X, mode="single")[0])
+        version = model_version()
+        targets = None
+        if multi and MULTI_MODEL_PATH.exists():
+            # demais alvos só se o multi-alvo foi treinado; ausente = resposta sem "targets"
+            targets = predict_targets(load_model(MULTI_MODEL_PATH), X)[0]
+        base_ts = pd.Timestamp(feat["ts"].iloc[0])
+        target_ts = base_ts + pd.Timedelta(hours=1)
+        if log:
+            # na fila do escritor, sem esperar: a resposta não paga a escrita
+            writer.run(lambda con: log_prediction(con, lat, lon, target_ts, version, y_hat))
+        out = {
             "lat": lat,
             "lon": lon,
-            "first_ts_utc": first_ts,
-            "last_ts_utc": last_ts,
-            "range_used": {"start_date": s, "end_date": e},
+            "base_ts_utc": base_ts.isoformat(),
+            "target_ts_utc": target_ts.isoformat(),
+            "y_hat": y_hat,
+            "model_version": version,
         }
+        if targets is not None:
+            out["targets"] = targets
+            out["multi_model_version"] = model_version(MULTI_MODEL_PATH)
+        return out
+    except FileNotFoundError as e:
+        return JSONResponse(status_code=503, content={"error": f"modelo não encontrado: {e}"})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/alerts")
+def alerts(
+    latitude: Optional[float] = Query(None),
+    longitude: Optional[float] = Query(None),
+    active_only: bool = Query(True, description="só episódios com hora recente/futura"),
+    active_hours: int = Query(ACTIVE_HOURS, ge=1, le=720),
+    format: str = Query("json", pattern="^(arrow|parquet|json)$"),
+):
+    """Alertas por local e regra (episódio mais recente), mantidos pela ingestão."""
+    try:
+        if (latitude is None) != (longitude is None):
+            raise ValueError("informe latitude E longitude")
+        sql, params = alerts_query(latitude, longitude, active_only, active_hours)
+        return _stream_query(sql, params, format, 65536)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.post("/alerts/rebuild")
+def alerts_rebuild():
+    """Refaz meta.alerts com todo o histórico (banco com dados anteriores aos alertas)."""
+    try:
+        return {"episodes": writer.run(rebuild_alerts).result()}
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/accuracy")
+def accuracy(
+    latitude: Optional[float] = Query(None),
+    longitude: Optional[float] = Query(None),
+    days: int = Query(ACCURACY_DAYS, ge=1, le=3650, description="janela (dias de target_ts)"),
+    model_version: Optional[str] = Query(None),
+    format: str = Query("json", pattern="^(arrow|parquet|json)$"),
+):
+    """MAE/RMSE das previsões servidas já com valor real, por local e versão do modelo."""
+    try:
+        if (latitude is None) != (longitude is None):
+            raise ValueError("informe latitude E longitude")
+        sql, params = accuracy_query(latitude, longitude, days, model_version)
+        return _stream_query(sql, params, format, 65536)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+def _collect_live_metrics() -> None:
+    """Roda a cada scrape: tamanho do arquivo e atraso de ingestão por local."""
+    wal = DB_PATH.with_name(DB_PATH.name + ".wal")
+    DB_FILE_BYTES.set(sum(p.stat().st_size for p in (DB_PATH, wal) if p.exists()))
+
+    cur = _reader()
+    try:
+        rows = cur.execute(
+            """
+            SELECT round(latitude,4), round(longitude,4), MAX(ts)
+            FROM raw.weather_hourly
+            GROUP BY ALL
+            """
+        ).fetchall()
+        acc = cur.execute(*accuracy_query()).fetchall()
+        active = cur.execute(
+            f"SELECT rule, COUNT(*) FROM ({alerts_query()[0]}) GROUP BY rule", alerts_query()[1]
+        ).fetchall()
+    finally:
+        cur.close()
+    now = pd.Timestamp.now("UTC").tz_localize(None)
+    INGEST_LAG_HOURS.clear()
+    for la, lo, last_ts in rows:
+        INGEST_LAG_HOURS.set((now - pd.Timestamp(last_ts)) / pd.Timedelta(hours=1), latitude=la, longitude=lo)
+    ALERTS_ACTIVE.clear()
+    for rule, n in active:
+        ALERTS_ACTIVE.set(n, rule=rule)
+    MODEL_MAE.clear()
+    MODEL_RMSE.clear()
+    for la, lo, version, _, mae, rmse, _ in acc:
+        MODEL_MAE.set(mae, latitude=la, longitude=lo, model_version=version)
+        MODEL_RMSE.set(rmse, latitude=la, longitude=lo, model_version=version)
+
+
+REGISTRY.add_collector(_collect_live_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
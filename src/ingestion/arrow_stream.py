@@ -0,0 +1,88 @@
+# src/ingestion/arrow_stream.py
+# Serialização em streaming dos RecordBatches do DuckDB (fetch_record_batch):
+# - arrow:   Arrow IPC stream (cliente lê com pyarrow.ipc.open_stream)
+# - parquet: um row group por lote; o rodapé vai no último pedaço
+# - json:    array JSON de registros, emitido lote a lote; NaN/±Infinity viram
+#            null (json.dumps os escreveria como tokens fora do padrão JSON)
+# Nenhum formato materializa o resultado inteiro: memória ~ tamanho de um lote.
+import json
+from typing import Iterator
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "json": "application/json",
+}
+
+
+class _Chunks:
+    """Destino 'file-like' mínimo: acumula bytes até o gerador esvaziar."""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self.parts)
+        self.parts.clear()
+        return out
+
+
+def stream_arrow(reader: pa.RecordBatchReader) -> Iterator[bytes]:
+    sink = _Chunks()
+    with pa.ipc.new_stream(sink, reader.schema) as writer:
+        yield sink.drain()  # schema
+        for batch in reader:
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()  # marcador de fim do stream
+
+
+def stream_parquet(reader: pa.RecordBatchReader) -> Iterator[bytes]:
+    sink = _Chunks()
+    with pq.ParquetWriter(sink, reader.schema, compression="zstd") as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()  # rodapé
+
+
+def _finite(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Colunas float com NaN/±inf -> null, vetorizado (antes do to_pylist)."""
+    cols = []
+    for col in batch.columns:
+        if pa.types.is_floating(col.type) and col.null_count < len(col):
+            col = pc.if_else(pc.is_finite(col), col, pa.scalar(None, col.type))
+        cols.append(col)
+    return pa.RecordBatch.from_arrays(cols, schema=batch.schema)
+
+
+def stream_json(reader: pa.RecordBatchReader) -> Iterator[bytes]:
+    yield b"["
+    sep = b""
+    for batch in reader:
+        rows = [
+            json.dumps(rec, default=str, ensure_ascii=False, allow_nan=False)
+            for rec in _finite(batch).to_pylist()
+        ]
+        if rows:
+            yield sep + ",".join(rows).encode("utf-8")
+            sep = b","
+    yield b"]"
+
+
+STREAMERS = {"arrow": stream_arrow, "parquet": stream_parquet, "json": stream_json}
@@ -1,25 +1,14 @@
 from pathlib import Path
 import argparse
-import duckdb
 import pandas as pd
 
+from src.ingestion.client import read_series
+
 DB_PATH = Path("data/rt_weather.duckdb")
 
 def audit(lat: float, lon: float, days: int = 30):
-    con = duckdb.connect(DB_PATH.as_posix())
-    try:
-        # pega tudo da cidade
-        df = con.execute(
-            """
-            SELECT ts
-            FROM raw.weather_hourly
-            WHERE round(latitude,4)=round(?,4) AND round(longitude,4)=round(?,4)
-            ORDER BY ts
-            """,
-            [lat, lon],
-        ).df()
-    finally:
-        con.close()
+    # pega tudo da cidade (via API; DuckDB local se ela estiver fora)
+    df = read_series(lat, lon, columns=["ts"], db_path=DB_PATH)
 
     if df.empty:
         print("Nenhum dado para essa cidade. Faça backfill/coleta primeiro.")
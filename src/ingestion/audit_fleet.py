@@ -0,0 +1,216 @@
+# src/ingestion/audit_fleet.py
+# Auditoria de qualidade de TODOS os locais de uma vez, inteiramente em SQL:
+# - cobertura horária na janela [último ts - N dias, último ts] de cada local
+# - buracos (gaps) via "gaps and islands": horas consecutivas viram ilhas
+#   (h - ROW_NUMBER() horas é constante dentro da ilha); gap = espaço entre ilhas
+# - horas duplicadas (mais de uma linha na mesma hora)
+# - valores fora da faixa física esperada
+# Resultado persistido em meta.coverage / meta.coverage_gaps (último snapshot)
+# e exposto pela API (/audit/run, /audit/coverage, /audit/gaps).
+#
+# Uso: python -m src.ingestion.audit_fleet --days 30
+from pathlib import Path
+import argparse
+
+import duckdb
+import pandas as pd
+import requests
+
+from src.ingestion.client import API_BASE
+
+DB_PATH = Path("data/rt_weather.duckdb")
+
+# faixas físicas aceitas (NULL não conta como fora da faixa)
+VALID_RANGES = {
+    "temperature_2m": (-90, 60),
+    "relative_humidity_2m": (0, 100),
+    "precipitation": (0, 500),
+    "wind_speed_10m": (0, 500),
+    "weathercode": (0, 99),
+    "precipitation_probability": (0, 100),
+    "cloudcover": (0, 100),
+}
+
+
+def ensure_meta_tables(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("CREATE SCHEMA IF NOT EXISTS meta;")
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta.coverage (
+            audited_at TIMESTAMP,
+            latitude DOUBLE,
+            longitude DOUBLE,
+            window_start TIMESTAMP,
+            window_end TIMESTAMP,
+            hours_expected INTEGER,
+            hours_present INTEGER,
+            coverage_pct DOUBLE,
+            gap_runs INTEGER,
+            missing_hours INTEGER,
+            longest_gap_h INTEGER,
+            duplicate_hours INTEGER,
+            out_of_range_rows INTEGER
+        );
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta.coverage_gaps (
+            audited_at TIMESTAMP,
+            latitude DOUBLE,
+            longitude DOUBLE,
+            gap_start TIMESTAMP,
+            gap_end TIMESTAMP,
+            missing_hours INTEGER
+        );
+        """
+    )
+
+
+def _out_of_range_expr() -> str:
+    return " OR ".join(f"({c} NOT BETWEEN {lo} AND {hi})" for c, (lo, hi) in VALID_RANGES.items())
+
+
+def run_fleet_audit(con: duckdb.DuckDBPyConnection, days: int = 30) -> pd.DataFrame:
+    """Audita todos os locais, substitui o snapshot em meta.coverage* e devolve a cobertura."""
+    ensure_meta_tables(con)
+    audited_at = pd.Timestamp.now("UTC").tz_localize(None).floor("s").to_pydatetime()
+
+    con.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE _audit_hours AS
+        WITH bounds AS (
+            SELECT
+                round(latitude,4)  AS lat,
+                round(longitude,4) AS lon,
+                date_trunc('hour', MAX(ts)) AS window_end
+            FROM raw.weather_hourly
+            GROUP BY ALL
+        )
+        SELECT
+            b.lat, b.lon,
+            b.window_end - to_days(?::INTEGER) AS window_start,
+            b.window_end,
+            date_trunc('hour', w.ts) AS h,
+            COUNT(*) AS n_rows,
+            COUNT(*) FILTER (WHERE {_out_of_range_expr()}) AS bad_rows
+        FROM raw.weather_hourly w
+        JOIN bounds b
+          ON round(w.latitude,4) = b.lat AND round(w.longitude,4) = b.lon
+        WHERE w.ts >= b.window_end - to_days(?::INTEGER)
+        GROUP BY ALL
+        """,
+        [days, days],
+    )
+
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE _audit_gaps AS
+        WITH islands AS (
+            SELECT lat, lon, window_start, MIN(h) AS run_start, MAX(h) AS run_end
+            FROM (
+                SELECT *,
+                       h - to_hours(ROW_NUMBER() OVER (PARTITION BY lat, lon ORDER BY h)) AS grp
+                FROM _audit_hours
+            )
+            GROUP BY lat, lon, window_start, grp
+        ),
+        gaps AS (
+            SELECT
+                lat, lon,
+                LAG(run_end, 1, window_start - INTERVAL 1 HOUR)
+                    OVER (PARTITION BY lat, lon ORDER BY run_start) + INTERVAL 1 HOUR AS gap_start,
+                run_start - INTERVAL 1 HOUR AS gap_end
+            FROM islands
+        )
+        SELECT lat, lon, gap_start, gap_end,
+               CAST(datediff('hour', gap_start, gap_end) + 1 AS INTEGER) AS missing_hours
+        FROM gaps
+        WHERE gap_end >= gap_start
+        """
+    )
+
+    con.execute("BEGIN TRANSACTION;")
+    try:
+        con.execute("DELETE FROM meta.coverage;")
+        con.execute("DELETE FROM meta.coverage_gaps;")
+        con.execute(
+            """
+            INSERT INTO meta.coverage
+            WITH per_loc AS (
+                SELECT
+                    lat, lon, window_start, window_end,
+                    CAST(datediff('hour', window_start, window_end) + 1 AS INTEGER) AS hours_expected,
+                    CAST(COUNT(*) AS INTEGER) AS hours_present,
+                    CAST(COUNT(*) FILTER (WHERE n_rows > 1) AS INTEGER) AS duplicate_hours,
+                    CAST(SUM(bad_rows) AS INTEGER) AS out_of_range_rows
+                FROM _audit_hours
+                GROUP BY ALL
+            ),
+            gap_stats AS (
+                SELECT lat, lon,
+                       COUNT(*) AS gap_runs,
+                       SUM(missing_hours) AS missing_hours,
+                       MAX(missing_hours) AS longest_gap_h
+                FROM _audit_gaps
+                GROUP BY ALL
+            )
+            SELECT
+                ? AS audited_at,
+                p.lat, p.lon, p.window_start, p.window_end,
+                p.hours_expected, p.hours_present,
+                100.0 * p.hours_present / p.hours_expected AS coverage_pct,
+                CAST(COALESCE(g.gap_runs, 0) AS INTEGER),
+                CAST(COALESCE(g.missing_hours, 0) AS INTEGER),
+                CAST(COALESCE(g.longest_gap_h, 0) AS INTEGER),
+                p.duplicate_hours,
+                p.out_of_range_rows
+            FROM per_loc p
+            LEFT JOIN gap_stats g USING (lat, lon)
+            """,
+            [audited_at],
+        )
+        con.execute(
+            "INSERT INTO meta.coverage_gaps SELECT ?, lat, lon, gap_start, gap_end, missing_hours FROM _audit_gaps",
+            [audited_at],
+        )
+        con.execute("COMMIT;")
+    except Exception:
+        con.execute("ROLLBACK;")
+        raise
+    finally:
+        con.execute("DROP TABLE IF EXISTS _audit_hours;")
+        con.execute("DROP TABLE IF EXISTS _audit_gaps;")
+
+    return con.execute(
+        "SELECT * FROM meta.coverage ORDER BY coverage_pct, latitude, longitude"
+    ).df()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=30)
+    args = ap.parse_args()
+
+    # a API é quem grava no banco; sem ela no ar, roda direto no arquivo
+    try:
+        r = requests.post(f"{API_BASE}/audit/run", params={"days": args.days}, timeout=600)
+        r.raise_for_status()
+        cov = pd.DataFrame(r.json()["locations"])
+    except requests.ConnectionError:
+        con = duckdb.connect(DB_PATH.as_posix())
+        try:
+            cov = run_fleet_audit(con, args.days)
+        finally:
+            con.close()
+
+    if cov.empty:
+        print("Nenhum dado. Faça backfill/coleta primeiro.")
+        return
+    print(f"=== AUDITORIA (todos os locais, {args.days} dias) ===")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(cov.drop(columns=["audited_at"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
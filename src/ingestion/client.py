@@ -0,0 +1,276 @@
+# src/ingestion/client.py
+# Cliente de LEITURA da API (/series, /features, /watermark) para o app e os scripts.
+# (+ delete_raw: limpeza de dados brutos, gravada pelo escritor único da API)
+# (+ nearest_location: local gravado mais próximo, para o snap de coordenadas manuais)
+# (+ predict_next / read_accuracy: previsão servida pela API, que a registra em
+#    meta.predictions, e a acurácia acumulada dessas previsões)
+# (+ read_alerts: alertas ativos mantidos pela ingestão em meta.alerts)
+# - transporte em Arrow IPC: o DataFrame sai direto dos lotes, sem JSON no meio
+#   (iter_features devolve os próprios lotes: previsão em lote sem materializar tudo)
+# - só o processo da API abre o arquivo DuckDB; se a API estiver fora do ar
+#   (ninguém gravando), a MESMA consulta roda numa conexão local somente-leitura
+import os
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import requests
+
+from src.ingestion.accuracy import ACCURACY_DAYS, accuracy_query
+from src.ingestion.alerts import ACTIVE_HOURS, alerts_query
+from src.ingestion.locations import SNAP_KM, LocationIndex
+from src.ingestion.queries import delete_raw_rows, features_query, series_query
+
+API_BASE = os.environ.get("RT_WEATHER_API", "http://127.0.0.1:8000")
+DB_PATH = Path("data") / "rt_weather.duckdb"
+
+
+def _params(**kw) -> dict:
+    out = {}
+    for k, v in kw.items():
+        if v is None or v is False:
+            continue
+        if isinstance(v, pd.Timestamp):
+            v = v.isoformat()
+        elif isinstance(v, (list, tuple)):
+            v = ",".join(v)
+        out[k] = v
+    return out
+
+
+def _get_arrow(path: str, params: dict, timeout: float) -> pd.DataFrame:
+    with requests.get(
+        f"{API_BASE}{path}", params={**params, "format": "arrow"}, stream=True, timeout=timeout
+    ) as r:
+        if r.status_code >= 400:
+            raise RuntimeError(r.json().get("error", r.text))
+        r.raw.decode_content = True
+        return pa.ipc.open_stream(r.raw).read_all().to_pandas()
+
+
+def _local(sql: str, params: list, db_path: Path) -> pd.DataFrame:
+    if not Path(db_path).exists():
+        return pd.DataFrame()
+    with duckdb.connect(Path(db_path).as_posix(), read_only=True) as con:
+        return con.execute(sql, params).df()
+
+
+def read_series(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    start=None,
+    end=None,
+    columns: Optional[Sequence[str]] = None,
+    bucket_hours: Optional[int] = None,
+    db_path: Path = DB_PATH,
+    timeout: float = 60,
+) -> pd.DataFrame:
+    """Série de raw.weather_hourly (ts UTC naive), via API com fallback local."""
+    try:
+        return _get_arrow(
+            "/series",
+            _params(latitude=lat, longitude=lon, start=start, end=end,
+                    columns=columns, bucket_hours=bucket_hours),
+            timeout,
+        )
+    except requests.ConnectionError:
+        return _local(*series_query(lat, lon, start, end, columns, bucket_hours), db_path)
+
+
+def read_features(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    start=None,
+    end=None,
+    columns: Optional[Sequence[str]] = None,
+    latest: bool = False,
+    db_path: Path = DB_PATH,
+    timeout: float = 60,
+) -> pd.DataFrame:
+    """Features por local (ver queries.features_query), via API com fallback local."""
+    try:
+        return _get_arrow(
+            "/features",
+            _params(latitude=lat, longitude=lon, start=start, end=end,
+                    columns=columns, latest=latest),
+            timeout,
+        )
+    except requests.ConnectionError:
+        return _local(*features_query(lat, lon, start, end, columns, latest), db_path)
+
+
+def iter_features(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    start=None,
+    end=None,
+    columns: Optional[Sequence[str]] = None,
+    batch_rows: int = 65536,
+    db_path: Path = DB_PATH,
+    timeout: float = 600,
+) -> Iterator[pa.RecordBatch]:
+    """Mesmas features de read_features, mas lote a lote (memória ~ batch_rows linhas)."""
+    params = _params(latitude=lat, longitude=lon, start=start, end=end, columns=columns)
+    try:
+        r = requests.get(
+            f"{API_BASE}/features",
+            params={**params, "format": "arrow", "batch_rows": batch_rows},
+            stream=True,
+            timeout=timeout,
+        )
+    except requests.ConnectionError:
+        if not Path(db_path).exists():
+            return
+        with duckdb.connect(Path(db_path).as_posix(), read_only=True) as con:
+            yield from con.execute(*features_query(lat, lon, start, end, columns)).fetch_record_batch(batch_rows)
+        return
+    with r:
+        if r.status_code >= 400:
+            raise RuntimeError(r.json().get("error", r.text))
+        r.raw.decode_content = True
+        yield from pa.ipc.open_stream(r.raw)
+
+
+def read_watermark(lat: float, lon: float, db_path: Path = DB_PATH, timeout: float = 3):
+    """MAX(ts) do local (UTC naive) ou None."""
+    try:
+        r = requests.get(
+            f"{API_BASE}/watermark", params={"latitude": lat, "longitude": lon}, timeout=timeout
+        )
+        r.raise_for_status()
+        ts = r.json().get("last_ts_utc")
+        return pd.Timestamp(ts) if ts else None
+    except requests.ConnectionError:
+        df = _local(
+            """
+            SELECT MAX(ts) AS ts
+            FROM raw.weather_hourly
+            WHERE round(latitude,4)=round(?,4) AND round(longitude,4)=round(?,4)
+            """,
+            [lat, lon],
+            db_path,
+        )
+        return None if df.empty or pd.isna(df["ts"].iloc[0]) else pd.Timestamp(df["ts"].iloc[0])
+
+
+def read_time_range(lat: float, lon: float, db_path: Path = DB_PATH, timeout: float = 3) -> tuple:
+    """(MIN(ts), MAX(ts)) do local (UTC naive), ou (None, None) sem dados; sem ler a série."""
+    try:
+        r = requests.get(
+            f"{API_BASE}/watermark", params={"latitude": lat, "longitude": lon}, timeout=timeout
+        )
+        r.raise_for_status()
+        body = r.json()
+        first, last = body.get("first_ts_utc"), body.get("last_ts_utc")
+    except requests.ConnectionError:
+        df = _local(
+            """
+            SELECT MIN(ts) AS first, MAX(ts) AS last
+            FROM raw.weather_hourly
+            WHERE round(latitude,4)=round(?,4) AND round(longitude,4)=round(?,4)
+            """,
+            [lat, lon],
+            db_path,
+        )
+        first, last = (None, None) if df.empty else (df["first"].iloc[0], df["last"].iloc[0])
+    if first is None or last is None or pd.isna(first) or pd.isna(last):
+        return None, None
+    return pd.Timestamp(first), pd.Timestamp(last)
+
+
+def nearest_location(
+    lat: float,
+    lon: float,
+    radius_km: float = SNAP_KM,
+    db_path: Path = DB_PATH,
+    timeout: float = 3,
+) -> Optional[dict]:
+    """Local gravado a até radius_km de (lat, lon): {'lat', 'lon', 'distance_km'} ou None."""
+    try:
+        r = requests.get(
+            f"{API_BASE}/locations/nearest",
+            params={"latitude": lat, "longitude": lon, "radius_km": radius_km},
+            timeout=timeout,
+        )
+        r.raise_for_status()
+        return r.json().get("snapped")
+    except requests.ConnectionError:
+        if not Path(db_path).exists():
+            return None
+        with duckdb.connect(Path(db_path).as_posix(), read_only=True) as con:
+            return LocationIndex.from_connection(con).snap(lat, lon, radius_km)
+
+
+def predict_next(lat: float, lon: float, multi: bool = False, timeout: float = 10) -> Optional[dict]:
+    """Previsão t+1h pela API (/predict; a API grava a previsão em meta.predictions).
+    None se a API estiver fora do ar: o chamador calcula localmente."""
+    try:
+        r = requests.get(
+            f"{API_BASE}/predict",
+            params=_params(latitude=lat, longitude=lon, multi=multi),
+            timeout=timeout,
+        )
+    except requests.ConnectionError:
+        return None
+    if r.status_code >= 400:
+        raise RuntimeError(r.json().get("error", r.text))
+    return r.json()
+
+
+def read_accuracy(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    days: int = ACCURACY_DAYS,
+    db_path: Path = DB_PATH,
+    timeout: float = 10,
+) -> pd.DataFrame:
+    """MAE/RMSE das previsões servidas (por local e versão do modelo), via API com fallback local."""
+    try:
+        return _get_arrow("/accuracy", _params(latitude=lat, longitude=lon, days=days), timeout)
+    except requests.ConnectionError:
+        try:
+            return _local(*accuracy_query(lat, lon, days), db_path)
+        except duckdb.CatalogException:  # banco anterior ao log de previsões
+            return pd.DataFrame()
+
+
+def read_alerts(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    active_hours: int = ACTIVE_HOURS,
+    db_path: Path = DB_PATH,
+    timeout: float = 5,
+) -> pd.DataFrame:
+    """Alertas ativos (um por local/regra), via API com fallback local."""
+    try:
+        return _get_arrow(
+            "/alerts", _params(latitude=lat, longitude=lon, active_hours=active_hours), timeout
+        )
+    except requests.ConnectionError:
+        try:
+            return _local(*alerts_query(lat, lon, True, active_hours), db_path)
+        except duckdb.CatalogException:  # banco anterior aos alertas
+            return pd.DataFrame()
+
+
+def delete_raw(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    db_path: Path = DB_PATH,
+    timeout: float = 60,
+) -> int:
+    """Apaga linhas de raw.weather_hourly (e os alertas delas) de um local (ou de todos, sem lat/lon).
+    Com a API no ar, a escrita entra na fila do escritor dela; senão, conexão local."""
+    params = {"latitude": lat, "longitude": lon} if lat is not None else {"all": "true"}
+    try:
+        r = requests.delete(f"{API_BASE}/raw", params=params, timeout=timeout)
+        if r.status_code >= 400:
+            raise RuntimeError(r.json().get("error", r.text))
+        return int(r.json()["deleted_rows"])
+    except requests.ConnectionError:
+        if not Path(db_path).exists():
+            return 0
+        with duckdb.connect(Path(db_path).as_posix()) as con:
+            return delete_raw_rows(con, lat, lon)  # mesma limpeza do escritor da API
@@ -0,0 +1,69 @@
+# src/ingestion/jobs.py
+# Jobs em background para a API (coleta/backfill sem bloquear quem chama).
+# - submit(): agenda a função num pool de threads e devolve o id na hora
+# - get()/list(): status para polling (queued -> running -> done | error)
+# - guarda só os últimos `keep` jobs em memória (não persiste entre reinícios)
+
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobRegistry:
+    def __init__(self, max_workers: int = 2, keep: int = 200):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._keep = keep
+
+    def submit(self, kind: str, fn: Callable[..., dict], **params) -> dict:
+        """Agenda fn(**params); devolve o snapshot inicial do job."""
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "params": params,
+            "status": "queued",
+            "created_at": _now_iso(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+            while len(self._jobs) > self._keep:
+                self._jobs.popitem(last=False)
+        self._pool.submit(self._run, job["job_id"], fn, params)
+        return dict(job)
+
+    def _run(self, job_id: str, fn: Callable[..., dict], params: dict) -> None:
+        self._update(job_id, status="running", started_at=_now_iso())
+        try:
+            result = fn(**params)
+            self._update(job_id, status="done", result=result, finished_at=_now_iso())
+        except Exception as e:
+            self._update(job_id, status="error", error=str(e), finished_at=_now_iso())
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self, status: Optional[str] = None) -> list:
+        with self._lock:
+            jobs = [dict(j) for j in self._jobs.values()]
+        if status:
+            jobs = [j for j in jobs if j["status"] == status]
+        return jobs[::-1]  # mais recentes primeiro
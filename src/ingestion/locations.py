@@ -0,0 +1,71 @@
+# src/ingestion/locations.py
+# Índice espacial dos locais já gravados em raw.weather_hourly.
+# - BallTree (sklearn) com distância haversine sobre (lat, lon) em radianos
+# - snap(): coordenada pedida a até RT_WEATHER_SNAP_KM (padrão 2 km; 0 desliga)
+#   de um local gravado vira esse local -> a série existente é reaproveitada em
+#   vez de nascer um local "novo" a 500 m (mais chamadas à Open-Meteo e mais linhas)
+# - A API mantém um índice em memória e o refaz quando entra um local novo ou
+#   quando há DELETE/retenção; o cliente (app) consulta /locations/nearest
+# - sklearn só é importado ao montar um índice não vazio: importar este módulo
+#   (API, client, app) não paga os ~0,7 s do sklearn na partida
+import os
+from typing import Optional
+
+import duckdb
+import numpy as np
+
+SNAP_KM = float(os.environ.get("RT_WEATHER_SNAP_KM", "2"))
+EARTH_RADIUS_KM = 6371.0088
+
+LOCATIONS_SQL = """
+SELECT DISTINCT round(latitude,4) AS latitude, round(longitude,4) AS longitude
+FROM raw.weather_hourly
+ORDER BY 1, 2
+"""
+
+
+class LocationIndex:
+    """Locais gravados (lat, lon arredondados a 4 casas) + BallTree haversine."""
+
+    def __init__(self, coords):
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self._keys = {(round(a, 4), round(b, 4)) for a, b in self.coords.tolist()}
+        self._tree = None
+        if len(self.coords):
+            from sklearn.neighbors import BallTree
+
+            self._tree = BallTree(np.radians(self.coords), metric="haversine")
+
+    @classmethod
+    def from_connection(cls, con: duckdb.DuckDBPyConnection) -> "LocationIndex":
+        return cls(con.execute(LOCATIONS_SQL).fetchall())
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def contains(self, lat: float, lon: float) -> bool:
+        return (round(lat, 4), round(lon, 4)) in self._keys
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list:
+        """Até k locais gravados mais próximos: [{'lat', 'lon', 'distance_km'}], do mais perto."""
+        if self._tree is None:
+            return []
+        k = min(k, len(self.coords))
+        dist, idx = self._tree.query(np.radians([[lat, lon]]), k=k)
+        return [
+            {
+                "lat": float(self.coords[i, 0]),
+                "lon": float(self.coords[i, 1]),
+                "distance_km": round(float(d) * EARTH_RADIUS_KM, 3),
+            }
+            for d, i in zip(dist[0], idx[0])
+        ]
+
+    def snap(self, lat: float, lon: float, radius_km: float = SNAP_KM) -> Optional[dict]:
+        """Local gravado mais próximo se estiver a até radius_km; senão None."""
+        if radius_km <= 0:
+            return None
+        near = self.nearest(lat, lon, k=1)
+        if near and near[0]["distance_km"] <= radius_km:
+            return near[0]
+        return None
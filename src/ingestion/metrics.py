@@ -0,0 +1,221 @@
+# src/ingestion/metrics.py
+# Métricas no formato texto do Prometheus (sem dependência externa).
+# - Counter / Gauge / Histogram com labels, thread-safe
+# - Histogram.time(**labels): context manager que mede o bloco em segundos
+# - REGISTRY.add_collector(fn): fn roda a cada scrape (gauges "ao vivo",
+#   ex.: tamanho do arquivo DuckDB e atraso de ingestão por local)
+# A API expõe REGISTRY.render() em /metrics.
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _fmt(v: float) -> str:
+    v = float(v)
+    if v == math.inf:
+        return "+Inf"
+    return str(int(v)) if v.is_integer() and abs(v) < 1e15 else repr(v)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+
+    def _key(self, labels: dict) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key: Tuple, extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines += self._render_one(key, value)
+        return lines
+
+    def _render_one(self, key, value) -> list:
+        return [f"{self.name}{self._labels(key)} {_fmt(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _render_one(self, key, value) -> list:
+        counts, total = value
+        lines = []
+        for b, c in zip(self.buckets, counts):
+            le = 'le="%s"' % _fmt(b)
+            lines.append(f"{self.name}_bucket{self._labels(key, le)} {c}")
+        lines.append(f"{self.name}_sum{self._labels(key)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{self._labels(key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: list = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # reimportar o módulo (ex.: --reload) reaproveita a métrica existente
+            return self._metrics.setdefault(metric.name, metric)
+
+    def add_collector(self, fn: Callable[[], None]) -> None:
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in list(self._collectors):
+            try:
+                fn()
+            except Exception:
+                pass  # métrica "ao vivo" indisponível não derruba o scrape
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+
+# ---------------------------------------------------------------------
+# Métricas do projeto (compartilhadas entre API, features e inferência)
+# ---------------------------------------------------------------------
+INGEST_STAGE_SECONDS = histogram(
+    "rt_ingest_stage_seconds",
+    "Tempo por etapa da ingestão (fetch, parse, dedup, insert)",
+    ["endpoint", "stage"],
+)
+UPSTREAM_ERRORS = counter(
+    "rt_upstream_errors_total",
+    "Erros ao chamar a Open-Meteo (status HTTP ou tipo da exceção)",
+    ["endpoint", "reason"],
+)
+ROWS_INGESTED = counter(
+    "rt_rows_ingested_total",
+    "Linhas novas gravadas por local",
+    ["latitude", "longitude"],
+)
+DB_FILE_BYTES = gauge("rt_db_file_bytes", "Tamanho do arquivo DuckDB (+ WAL) em bytes")
+INGEST_LAG_HOURS = gauge(
+    "rt_ingest_lag_hours",
+    "Horas desde o último registro gravado, por local",
+    ["latitude", "longitude"],
+)
+HTTP_REQUEST_SECONDS = histogram(
+    "rt_http_request_seconds",
+    "Duração das requisições HTTP da API",
+    ["method", "route", "status"],
+)
+FEATURE_BUILD_SECONDS = histogram(
+    "rt_feature_build_seconds",
+    "Tempo para montar as features do modelo",
+    ["source"],
+)
+MODEL_PREDICT_SECONDS = histogram(
+    "rt_model_predict_seconds",
+    "Tempo da chamada model.predict",
+    ["mode"],
+)
+WRITER_BATCH_REQUESTS = histogram(
+    "rt_writer_batch_requests",
+    "Requisições de ingestão agrupadas por transação do escritor",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+WRITER_BATCH_ROWS = histogram(
+    "rt_writer_batch_rows",
+    "Linhas recebidas por transação do escritor (antes do dedup)",
+    buckets=(10, 100, 1_000, 10_000, 50_000, 100_000, 500_000),
+)
+WRITER_QUEUE_DEPTH = gauge("rt_writer_queue_depth", "Itens aguardando o escritor")
+MODEL_MAE = gauge(
+    "rt_model_mae",
+    "MAE (°C) das previsões servidas nos últimos 7 dias, por local e versão do modelo",
+    ["latitude", "longitude", "model_version"],
+)
+MODEL_RMSE = gauge(
+    "rt_model_rmse",
+    "RMSE (°C) das previsões servidas nos últimos 7 dias, por local e versão do modelo",
+    ["latitude", "longitude", "model_version"],
+)
+ALERTS_ACTIVE = gauge("rt_alerts_active", "Locais com alerta ativo, por regra", ["rule"])
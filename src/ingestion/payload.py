@@ -0,0 +1,103 @@
+# src/ingestion/payload.py
+# Parse do JSON da Open-Meteo direto para Arrow (sem DataFrame intermediário).
+# - Decoder: orjson (requirements.txt; bem mais rápido em payloads grandes); se
+#   não estiver instalado, cai para o json da biblioteca padrão
+# - Cada lista "hourly" vira UMA coluna Arrow tipada (None -> null, não NaN),
+#   já nos tipos de raw.weather_hourly (weathercode SMALLINT)
+# - ts: "YYYY-MM-DDTHH:MM" (timezone=UTC) -> timestamp[us] naive, via NumPy;
+#   aceita também epoch em segundos (timeformat=unixtime)
+# - O pa.Table é registrado no DuckDB sem cópia (con.register)
+from typing import Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    import orjson as _orjson
+except ImportError:  # ambiente sem o requirements.txt completo
+    _orjson = None
+    import json as _json
+
+HOURLY_VARS = [
+    "temperature_2m",
+    "relative_humidity_2m",   # pode vir como 'relativehumidity_2m'
+    "precipitation",
+    "wind_speed_10m",         # pode vir como 'windspeed_10m'
+    "weathercode",
+    "precipitation_probability",
+    "cloudcover",
+]
+
+# nomes alternativos que a API às vezes devolve
+ALIASES = {
+    "relative_humidity_2m": "relativehumidity_2m",
+    "wind_speed_10m": "windspeed_10m",
+}
+
+# mesmos tipos da tabela raw.weather_hourly
+SCHEMA = pa.schema(
+    [("ts", pa.timestamp("us")), ("latitude", pa.float64()), ("longitude", pa.float64())]
+    + [(k, pa.int16() if k == "weathercode" else pa.float64()) for k in HOURLY_VARS]
+)
+
+
+def loads(raw: Union[bytes, str]) -> dict:
+    """json.loads com orjson quando disponível."""
+    if _orjson is not None:
+        return _orjson.loads(raw)
+    return _json.loads(raw)
+
+
+def _parse_times(times: list) -> pa.Array:
+    if not times:
+        return pa.array([], pa.timestamp("us"))
+    if isinstance(times[0], (int, float)):
+        arr = np.asarray(times, dtype="int64").astype("datetime64[s]")
+        return pa.array(arr.astype("datetime64[us]"))
+    try:
+        return pa.array(np.array(times, dtype="datetime64[us]"))
+    except ValueError:
+        # formato inesperado (ex.: com offset): caminho lento, mas converte para UTC
+        ts = pd.to_datetime(times, utc=True).tz_localize(None)
+        return pa.array(ts.to_numpy().astype("datetime64[us]"))
+
+
+def payload_to_arrow(payload: dict, lat: float, lon: float) -> pa.Table:
+    """Converte o JSON (já decodificado) em pa.Table com o schema de raw.weather_hourly."""
+    hourly = payload.get("hourly", {})
+    times = hourly.get("time", [])
+    n = len(times)
+
+    columns = [
+        _parse_times(times),
+        pa.array(np.full(n, round(lat, 4))),
+        pa.array(np.full(n, round(lon, 4))),
+    ]
+    for k in HOURLY_VARS:
+        vals = hourly.get(k) or hourly.get(ALIASES.get(k, ""))
+        if vals is None or len(vals) != n:
+            columns.append(pa.nulls(n, SCHEMA.field(k).type))
+        else:
+            columns.append(pa.array(vals, SCHEMA.field(k).type))
+    return pa.Table.from_arrays(columns, schema=SCHEMA)
+
+
+def parse_payload(raw: Union[bytes, str], lat: float, lon: float) -> pa.Table:
+    """Corpo HTTP cru -> pa.Table (decoder rápido + colunas tipadas)."""
+    return payload_to_arrow(loads(raw), lat, lon)
+
+
+def ts_bounds(tbl: pa.Table) -> tuple:
+    """(primeiro, último) ts em ISO, ou (None, None) se vazio."""
+    if tbl.num_rows == 0:
+        return None, None
+    mm = pc.min_max(tbl["ts"])
+    return mm["min"].as_py().isoformat(), mm["max"].as_py().isoformat()
+
+
+def drop_future(tbl: pa.Table) -> pa.Table:
+    """Remove horas posteriores a agora (forecast devolve também as próximas horas)."""
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    return tbl.filter(pc.less_equal(tbl["ts"], pa.scalar(now.to_pydatetime(), pa.timestamp("us"))))
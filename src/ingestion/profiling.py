@@ -0,0 +1,226 @@
+# src/ingestion/profiling.py
+# Profiling sob demanda das requisições da API (desligado por padrão).
+# - Liga para todas as requisições com RT_WEATHER_PROFILE=1, ou por requisição
+#   com o header "X-Profile: 1"
+# - cProfile do endpoint (roda na thread do endpoint, inclusive os síncronos
+#   que o FastAPI despacha para o threadpool) -> request.prof + request.txt
+# - Plano com tempos reais (equivalente ao EXPLAIN ANALYZE) de cada statement
+#   DuckDB executado pela requisição -> sql_NN.json + sql.txt (resumo); se o
+#   resultado não foi consumido até o fim (ex.: fetchone), o DuckDB não grava o
+#   plano e o proxy roda EXPLAIN ANALYZE ao fechar a conexão (mesmo formato)
+# - Escritas que a requisição manda para o escritor único (writer.insert/run)
+#   levam o RequestProfile junto e são perfiladas na conexão do escritor,
+#   marcadas [writer] no sql.txt; o lote do escritor pode conter linhas de
+#   outras requisições, então o tempo é do lote inteiro
+# Saída: profiles/<data>_<método>_<rota>_<id>/
+#   python -m pstats profiles/.../request.prof   (ou snakeviz)
+import contextlib
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+from fastapi.routing import APIRoute
+
+PROFILE_DIR = Path(os.environ.get("RT_WEATHER_PROFILE_DIR", "profiles"))
+PROFILE_ALL = os.environ.get("RT_WEATHER_PROFILE", "").lower() in ("1", "true", "yes")
+PROFILE_HEADER = "x-profile"
+TOP_FUNCTIONS = 40
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "rt_request_profile", default=None
+)
+
+
+class RequestProfile:
+    """Artefatos de profiling de UMA requisição (um diretório em profiles/)."""
+
+    def __init__(self, method: str, path: str):
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        self.dir = PROFILE_DIR / f"{stamp}_{method.upper()}_{slug}_{uuid.uuid4().hex[:6]}"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.method = method
+        self.path = path
+        self.statements: list = []
+        self._lock = threading.Lock()
+
+    def next_sql_path(self, con, sql: str, params, source: str = "") -> Path:
+        with self._lock:
+            n = len(self.statements) + 1
+            out = self.dir / f"sql_{n:02d}.json"
+            self.statements.append(
+                {"file": out.name, "sql": sql, "params": params, "con": id(con), "source": source}
+            )
+        return out
+
+    def explain_missing(self, con) -> None:
+        """EXPLAIN ANALYZE das leituras desta conexão que ficaram sem plano JSON."""
+        for st in self.statements:
+            out = self.dir / st["file"]
+            if st["con"] != id(con) or out.exists():
+                continue
+            if not st["sql"].lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            con.execute("PRAGMA disable_profiling")
+            sql = "EXPLAIN ANALYZE " + st["sql"]
+            rows = con.execute(sql, st["params"]).fetchall() if st["params"] is not None else con.execute(sql).fetchall()
+            out.write_text("\n".join(r[1] for r in rows), encoding="utf-8")
+            st["explained"] = True
+
+    def save_cprofile(self, prof: cProfile.Profile) -> None:
+        prof.dump_stats(self.dir / "request.prof")
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        (self.dir / "request.txt").write_text(buf.getvalue(), encoding="utf-8")
+
+    def finish(self, status: int, elapsed_s: float) -> None:
+        """Resumo: tempo total e, por statement, latência/linhas lidas do JSON do DuckDB."""
+        lines = [f"{self.method} {self.path} -> {status} em {elapsed_s * 1000:.1f} ms", ""]
+        for st in self.statements:
+            out, info = self.dir / st["file"], {}
+            try:
+                info = json.loads(out.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pass  # sem plano (escrita com resultado não consumido)
+            lat = info.get("latency")
+            if st.get("explained"):
+                timing = "EXPLAIN ANALYZE (refeita ao fechar)"
+            elif isinstance(lat, (int, float)):
+                timing = f"{lat * 1000:9.2f} ms  rows={info.get('rows_returned', '?')}"
+            else:
+                timing = "sem plano"
+            sql = " ".join(st["sql"].split())
+            if st.get("source"):
+                sql = f"[{st['source']}] {sql}"
+            lines.append(f"{out.name}  {timing}  {sql[:160]}")
+            lines.append(f"    params={repr(st['params'])[:200]}")
+        (self.dir / "sql.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def wants_profile(headers) -> bool:
+    return PROFILE_ALL or headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes")
+
+
+def start(method: str, path: str) -> tuple:
+    prof = RequestProfile(method, path)
+    return prof, _current.set(prof)
+
+
+def stop(token) -> None:
+    _current.reset(token)
+
+
+def current() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+# ---------------------------------------------------------------------
+# DuckDB: um arquivo de plano por statement
+# ---------------------------------------------------------------------
+class _ProfiledConnection:
+    """Proxy da conexão: antes de cada execute aponta o profiling JSON do DuckDB
+    para um arquivo novo; o resto (register, fetch*, close, ...) passa direto."""
+
+    def __init__(self, con: duckdb.DuckDBPyConnection, prof: RequestProfile, source: str = ""):
+        self._con = con
+        self._prof = prof
+        self._source = source
+
+    def execute(self, sql: str, params=None):
+        out = self._prof.next_sql_path(self._con, sql, params, self._source)
+        self._con.execute("PRAGMA disable_profiling")
+        self._con.execute(f"SET profiling_output='{out.resolve().as_posix()}'")
+        self._con.execute("SET enable_profiling='json'")
+        if params is None:
+            return self._con.execute(sql)
+        return self._con.execute(sql, params)
+
+    def close(self) -> None:
+        try:
+            self._prof.explain_missing(self._con)
+        except Exception:
+            pass  # profiling nunca derruba a requisição
+        finally:
+            self._con.close()
+
+    def __getattr__(self, name):
+        return getattr(self._con, name)
+
+
+def wrap_connection(con: duckdb.DuckDBPyConnection):
+    """Devolve a própria conexão quando não há profiling ativo (custo zero)."""
+    prof = _current.get()
+    return con if prof is None else _ProfiledConnection(con, prof)
+
+
+@contextlib.contextmanager
+def writer_connection(con: duckdb.DuckDBPyConnection, prof: Optional[RequestProfile]):
+    """Conexão do escritor perfilada para o RequestProfile que enfileirou a escrita.
+    A conexão continua aberta depois: o profiling é desligado na saída para não
+    vazar para o próximo lote (que pode não ser de uma requisição perfilada)."""
+    if prof is None:
+        yield con
+        return
+    try:
+        yield _ProfiledConnection(con, prof, source="writer")
+    finally:
+        try:
+            con.execute("PRAGMA disable_profiling")
+            prof.explain_missing(con)
+        except Exception:
+            pass  # profiling nunca derruba a escrita
+
+
+# ---------------------------------------------------------------------
+# FastAPI: cProfile na thread que executa o endpoint
+# ---------------------------------------------------------------------
+def _profiled(endpoint):
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            prof = _current.get()
+            if prof is None:
+                return await endpoint(*args, **kwargs)
+            p = cProfile.Profile()
+            p.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                p.disable()
+                prof.save_cprofile(p)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        prof = _current.get()
+        if prof is None:
+            return endpoint(*args, **kwargs)
+        p = cProfile.Profile()
+        p.enable()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            p.disable()
+            prof.save_cprofile(p)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Use em app.router.route_class ANTES de declarar as rotas."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
@@ -0,0 +1,249 @@
+# src/ingestion/queries.py
+# Consultas de LEITURA compartilhadas (API /series e /features, app e scripts).
+# - series_query: série bruta ou agregada por balde de tempo (min/máx/média)
+# - features_query: mesmas features de make_features, calculadas no DuckDB sobre
+#   a série de 1 ponto por hora de cada local (lags por linha, médias móveis, hora cíclica)
+# Cada função devolve (sql, params); quem executa decide se é a API ou uma conexão local.
+# Exceção: delete_raw_rows executa na conexão recebida (escritor da API ou conexão
+# local do client.py com a API fora do ar), para os dois apagarem as mesmas tabelas.
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+RAW_COLUMNS = [
+    "ts",
+    "latitude",
+    "longitude",
+    "temperature_2m",
+    "relative_humidity_2m",
+    "precipitation",
+    "wind_speed_10m",
+    "weathercode",
+    "precipitation_probability",
+    "cloudcover",
+]
+# tipos de armazenamento de raw.weather_hourly
+RAW_TYPES = {
+    "ts": "TIMESTAMP",
+    "latitude": "DOUBLE",
+    "longitude": "DOUBLE",
+    "temperature_2m": "DOUBLE",
+    "relative_humidity_2m": "DOUBLE",
+    "precipitation": "DOUBLE",
+    "wind_speed_10m": "DOUBLE",
+    "weathercode": "SMALLINT",
+    "precipitation_probability": "DOUBLE",
+    "cloudcover": "DOUBLE",
+}
+# opt-in (RT_WEATHER_COMPACT=1): % inteiros 0–100 em UTINYINT (1 byte) e medidas
+# com 1 casa decimal em REAL (4 bytes); lat/lon seguem DOUBLE (comparadas com round(…,4))
+COMPACT_TYPES = {
+    **RAW_TYPES,
+    "temperature_2m": "REAL",
+    "relative_humidity_2m": "UTINYINT",
+    "precipitation": "REAL",
+    "wind_speed_10m": "REAL",
+    "weathercode": "UTINYINT",
+    "precipitation_probability": "UTINYINT",
+    "cloudcover": "UTINYINT",
+}
+
+
+def raw_table_ddl(compact: bool = False) -> str:
+    types = COMPACT_TYPES if compact else RAW_TYPES
+    cols = ",\n    ".join(f"{c} {types[c]}" for c in RAW_COLUMNS)
+    return f"CREATE TABLE IF NOT EXISTS raw.weather_hourly (\n    {cols}\n);"
+
+
+def delete_raw_rows(con, lat: Optional[float] = None, lon: Optional[float] = None) -> int:
+    """Apaga as linhas brutas de um local (ou de todos, sem lat/lon) e os alertas
+    calculados a partir delas (meta.alerts, se existir); devolve as linhas apagadas."""
+    where, params = "", []
+    if lat is not None:
+        where, params = "WHERE round(latitude,4)=round(?,4) AND round(longitude,4)=round(?,4)", [lat, lon]
+    n = con.execute(f"SELECT COUNT(*) FROM raw.weather_hourly {where}", params).fetchone()[0]
+    con.execute(f"DELETE FROM raw.weather_hourly {where}", params)
+    has_alerts = con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'meta' AND table_name = 'alerts'"
+    ).fetchone()[0]
+    if has_alerts:  # banco anterior aos alertas não tem a tabela
+        con.execute(f"DELETE FROM meta.alerts {where}", params)
+    return int(n)
+
+
+# colunas que podem ser agregadas por balde (numéricas contínuas)
+BUCKET_COLUMNS = [
+    "temperature_2m",
+    "relative_humidity_2m",
+    "precipitation",
+    "wind_speed_10m",
+    "precipitation_probability",
+    "cloudcover",
+]
+
+LAGS_H = [1, 2, 3, 4, 5, 6, 24]
+FEATURE_COLUMNS = (
+    [f"temp_lag_{k}h" for k in LAGS_H]
+    + ["temp_ma_3h", "temp_ma_6h", "relative_humidity_2m", "precipitation",
+       "wind_speed_10m", "hour_sin", "hour_cos"]
+)
+TARGET_COLUMN = "temp_t_plus_1h"
+
+
+def to_utc_naive(value) -> Optional[pd.Timestamp]:
+    """Aceita str/Timestamp (com ou sem fuso) e devolve Timestamp UTC naive (padrão do banco)."""
+    if value is None or value == "":
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts
+
+
+def _where(
+    lat: Optional[float],
+    lon: Optional[float],
+    start,
+    end,
+) -> Tuple[str, list]:
+    conds, params = [], []
+    if lat is not None and lon is not None:
+        conds.append("round(latitude,4)=round(?,4) AND round(longitude,4)=round(?,4)")
+        params += [lat, lon]
+    start, end = to_utc_naive(start), to_utc_naive(end)
+    if start is not None:
+        conds.append("ts >= ?")
+        params.append(start.to_pydatetime())
+    if end is not None:
+        conds.append("ts <= ?")
+        params.append(end.to_pydatetime())
+    return ("WHERE " + " AND ".join(conds)) if conds else "", params
+
+
+def _check_columns(columns: Optional[Sequence[str]], allowed: List[str]) -> List[str]:
+    if not columns:
+        return list(allowed)
+    bad = [c for c in columns if c not in allowed]
+    if bad:
+        raise ValueError(f"colunas inválidas: {bad}; permitidas: {allowed}")
+    return list(columns)
+
+
+def series_query(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    start=None,
+    end=None,
+    columns: Optional[Sequence[str]] = None,
+    bucket_hours: Optional[int] = None,
+) -> Tuple[str, list]:
+    """
+    Série bruta de raw.weather_hourly (ordenada por local e ts).
+    Com bucket_hours: uma linha por (local, balde) com <col>_min/_max/_mean e n.
+    """
+    where, params = _where(lat, lon, start, end)
+    if not bucket_hours:
+        cols = _check_columns(columns, RAW_COLUMNS)
+        for key in ["ts", "latitude", "longitude"][::-1]:
+            if key not in cols:
+                cols.insert(0, key)
+        sql = f"""
+            SELECT {", ".join(cols)}
+            FROM raw.weather_hourly
+            {where}
+            ORDER BY latitude, longitude, ts
+        """
+        return sql, params
+
+    cols = _check_columns(columns, BUCKET_COLUMNS)
+    aggs = ",\n".join(
+        f"MIN({c}) AS {c}_min, MAX({c}) AS {c}_max, AVG({c}) AS {c}_mean" for c in cols
+    )
+    sql = f"""
+        SELECT
+            round(latitude,4)  AS latitude,
+            round(longitude,4) AS longitude,
+            time_bucket(to_hours(?::BIGINT), ts) AS ts,
+            {aggs},
+            COUNT(*) AS n
+        FROM raw.weather_hourly
+        {where}
+        GROUP BY ALL
+        ORDER BY latitude, longitude, ts
+    """
+    return sql, [int(bucket_hours)] + params
+
+
+def features_query(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    start=None,
+    end=None,
+    columns: Optional[Sequence[str]] = None,
+    latest: bool = False,
+) -> Tuple[str, list]:
+    """
+    Features por local (1 ponto por hora), só linhas com features completas.
+    - `temp_t_plus_1h` (alvo) fica NULL na última hora de cada local.
+    - start/end filtram as linhas DEVOLVIDAS; os lags usam o histórico anterior.
+    - latest=True: apenas a última hora de cada local + condições atuais e
+      `temp_24h` (lista das últimas 24 temperaturas, para sparklines).
+    """
+    cols = _check_columns(columns, FEATURE_COLUMNS)
+    where_in, params_in = _where(lat, lon, None, None)
+    out_where, params_out = _where(None, None, start, end)
+
+    # latest: mostra todos os locais (mesmo com histórico curto) + condições atuais
+    extra_feat, extra_out, qualify = "", "", ""
+    conds = [] if latest else [f"{c} IS NOT NULL" for c in FEATURE_COLUMNS]
+    if latest:
+        extra_feat = """,
+                temperature_2m, weathercode, precipitation_probability, cloudcover,
+                LIST(temperature_2m) OVER w24 AS temp_24h"""
+        extra_out = ", temperature_2m, weathercode, precipitation_probability, cloudcover, temp_24h"
+        qualify = "QUALIFY ROW_NUMBER() OVER (PARTITION BY latitude, longitude ORDER BY ts DESC) = 1"
+    if out_where:
+        conds.insert(0, out_where[len("WHERE "):])
+    final_where = ("WHERE " + " AND ".join(conds)) if conds else ""
+
+    sql = f"""
+        WITH hourly AS (
+            SELECT
+                round(latitude,4)  AS latitude,
+                round(longitude,4) AS longitude,
+                date_trunc('hour', ts) AS ts,
+                AVG(temperature_2m)            AS temperature_2m,
+                AVG(relative_humidity_2m)      AS relative_humidity_2m,
+                AVG(precipitation)             AS precipitation,
+                AVG(wind_speed_10m)            AS wind_speed_10m,
+                arg_max(weathercode, ts)       AS weathercode,
+                AVG(precipitation_probability) AS precipitation_probability,
+                AVG(cloudcover)                AS cloudcover
+            FROM raw.weather_hourly
+            {where_in}
+            GROUP BY ALL
+        ),
+        feat AS (
+            SELECT
+                latitude, longitude, ts,
+                {", ".join(f"LAG(temperature_2m, {k}) OVER w AS temp_lag_{k}h" for k in LAGS_H)},
+                CASE WHEN COUNT(temperature_2m) OVER w3 = 3 THEN AVG(temperature_2m) OVER w3 END AS temp_ma_3h,
+                CASE WHEN COUNT(temperature_2m) OVER w6 = 6 THEN AVG(temperature_2m) OVER w6 END AS temp_ma_6h,
+                relative_humidity_2m, precipitation, wind_speed_10m,
+                sin(2 * pi() * hour(ts) / 24) AS hour_sin,
+                cos(2 * pi() * hour(ts) / 24) AS hour_cos,
+                LEAD(temperature_2m, 1) OVER w AS {TARGET_COLUMN}{extra_feat}
+            FROM hourly
+            WINDOW
+                w   AS (PARTITION BY latitude, longitude ORDER BY ts),
+                w3  AS (PARTITION BY latitude, longitude ORDER BY ts ROWS BETWEEN 2 PRECEDING AND CURRENT ROW),
+                w6  AS (PARTITION BY latitude, longitude ORDER BY ts ROWS BETWEEN 5 PRECEDING AND CURRENT ROW),
+                w24 AS (PARTITION BY latitude, longitude ORDER BY ts ROWS BETWEEN 23 PRECEDING AND CURRENT ROW)
+        )
+        SELECT latitude, longitude, ts, {", ".join(cols)}, {TARGET_COLUMN}{extra_out}
+        FROM feat
+        {final_where}
+        {qualify}
+        ORDER BY latitude, longitude, ts
+    """
+    return sql, params_in + params_out
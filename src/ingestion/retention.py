@@ -0,0 +1,319 @@
+# src/ingestion/retention.py
+# Retenção em camadas de raw.weather_hourly (o arquivo deixa de crescer sem limite):
+# 1) horário completo só para os últimos HOURLY_DAYS dias
+# 2) o que for mais antigo vira 1 linha por local/dia em refined.weather_daily
+#    (mín/máx/média de temperatura, chuva somada, etc.). hour_mask marca as horas
+#    (bit h = hora h UTC) que o rollup já contém: num backfill depois do rollup,
+#    só as horas com bit desligado entram na conta (ver _merge_sql)
+# 3) as linhas horárias removidas vão para Parquet (ARCHIVE_DIR/raw_hourly/
+#    year=/month=/) antes do DELETE; sem arquivo (--no-archive) são só descartadas
+# 4) rollups diários mais velhos que DAILY_DAYS (0 = nunca) seguem o mesmo caminho
+# 5) CHECKPOINT; tamanho do arquivo (+ WAL) antes/depois no relatório
+# Reescrever o arquivo (--rebuild, copia o banco para um arquivo novo e troca)
+# devolve ao disco o espaço livre que o CHECKPOINT não devolve; exige a API
+# PARADA, por isso só existe na CLI. Pela API (POST /retention/run) a retenção
+# roda na fila do escritor único.
+#
+# Uso:
+#   python -m src.ingestion.retention --hourly-days 730 --daily-days 0
+#   python -m src.ingestion.retention --dry-run
+#   python -m src.ingestion.retention --rebuild          # com a API parada
+from pathlib import Path
+import argparse
+import os
+
+import duckdb
+import pandas as pd
+import requests
+
+from src.ingestion.client import API_BASE
+
+DB_PATH = Path("data") / "rt_weather.duckdb"
+ARCHIVE_DIR = Path(os.environ.get("RT_WEATHER_ARCHIVE_DIR", Path("data") / "archive"))
+HOURLY_DAYS = int(os.environ.get("RT_WEATHER_KEEP_HOURLY_DAYS", "730"))
+DAILY_DAYS = int(os.environ.get("RT_WEATHER_KEEP_DAILY_DAYS", "0"))  # 0 = manter sempre
+
+
+def ensure_daily_table(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("CREATE SCHEMA IF NOT EXISTS refined;")
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS refined.weather_daily (
+            day DATE,
+            latitude DOUBLE,
+            longitude DOUBLE,
+            hours INTEGER,
+            temp_min DOUBLE,
+            temp_max DOUBLE,
+            temp_mean DOUBLE,
+            relative_humidity_mean DOUBLE,
+            precipitation_sum DOUBLE,
+            wind_speed_max DOUBLE,
+            weathercode_max SMALLINT,
+            precipitation_probability_max DOUBLE,
+            cloudcover_mean DOUBLE,
+            hour_mask INTEGER,
+            PRIMARY KEY (latitude, longitude, day)
+        );
+        """
+    )
+    # rollups de antes da máscara ficam com NULL = "dia todo já contado" (nada é somado a eles)
+    con.execute("ALTER TABLE refined.weather_daily ADD COLUMN IF NOT EXISTS hour_mask INTEGER;")
+
+
+# colunas do rollup -> como combinar o que já existe com as horas novas do mesmo dia
+DAILY_MERGE = {
+    "temp_min": "min",
+    "temp_max": "max",
+    "temp_mean": "mean",
+    "relative_humidity_mean": "mean",
+    "precipitation_sum": "sum",
+    "wind_speed_max": "max",
+    "weathercode_max": "max",
+    "precipitation_probability_max": "max",
+    "cloudcover_mean": "mean",
+}
+
+
+def _merge_sql(col: str, how: str) -> str:
+    """SET de uma coluna no ON CONFLICT: NULL de um lado fica com o outro lado."""
+    old, new = col, f"EXCLUDED.{col}"
+    if how == "min":
+        both = f"least({old}, {new})"
+    elif how == "max":
+        both = f"greatest({old}, {new})"
+    elif how == "sum":
+        both = f"{old} + {new}"
+    else:  # média ponderada pelas horas (distintas) de cada lado
+        both = f"({old} * hours + {new} * EXCLUDED.hours) / (hours + EXCLUDED.hours)"
+    return f"{col} = CASE WHEN {new} IS NULL THEN {old} WHEN {old} IS NULL THEN {new} ELSE {both} END"
+
+
+FULL_DAY_MASK = (1 << 24) - 1
+
+# horas vencidas de raw -> 1 linha por local/hora, sem as horas que o rollup do
+# dia já contém; depois 1 linha por local/dia (médias = média das horas)
+ROLLUP_SQL = f"""
+WITH hourly AS (
+  SELECT
+    CAST(ts AS DATE) AS day,
+    round(latitude,4) AS latitude,
+    round(longitude,4) AS longitude,
+    hour(ts) AS h,
+    MIN(temperature_2m) AS t_min, MAX(temperature_2m) AS t_max, AVG(temperature_2m) AS t_mean,
+    AVG(relative_humidity_2m) AS rh,
+    SUM(precipitation) AS precip,
+    MAX(wind_speed_10m) AS wind,
+    MAX(weathercode) AS wmo,
+    MAX(precipitation_probability) AS pop,
+    AVG(cloudcover) AS cloud
+  FROM raw.weather_hourly
+  WHERE ts < ?
+  GROUP BY ALL
+),
+fresh AS (
+  SELECT h.*
+  FROM hourly h
+  LEFT JOIN refined.weather_daily d
+    ON d.latitude = h.latitude AND d.longitude = h.longitude AND d.day = h.day
+  WHERE d.day IS NULL
+     OR (coalesce(d.hour_mask, {FULL_DAY_MASK}) & (1 << h.h)) = 0
+)
+SELECT
+  day, latitude, longitude,
+  COUNT(*) AS hours,
+  MIN(t_min), MAX(t_max), AVG(t_mean),
+  AVG(rh),
+  SUM(precip),
+  MAX(wind),
+  MAX(wmo),
+  MAX(pop),
+  AVG(cloud),
+  CAST(bit_or(1 << h) AS INTEGER) AS hour_mask
+FROM fresh
+GROUP BY day, latitude, longitude
+"""
+
+
+def file_bytes(db_path: Path) -> int:
+    """Tamanho do arquivo DuckDB + WAL (bytes)."""
+    db_path = Path(db_path)
+    wal = db_path.with_name(db_path.name + ".wal")
+    return sum(p.stat().st_size for p in (db_path, wal) if p.exists())
+
+
+def _archive(con, select_sql: str, params: list, out_dir: Path, ts_col: str) -> None:
+    """Anexa o resultado em Parquet particionado por ano/mês (arquivos novos, nunca sobrescreve)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    con.execute(
+        f"""
+        COPY (
+            SELECT *, year({ts_col}) AS year, month({ts_col}) AS month
+            FROM ({select_sql})
+        ) TO '{out_dir.resolve().as_posix()}'
+        (FORMAT parquet, COMPRESSION zstd, PARTITION_BY (year, month),
+         FILENAME_PATTERN 'retention_{{uuid}}', APPEND true)
+        """,
+        params,
+    )
+
+
+def _count(con, select_sql: str, cutoff) -> int:
+    if cutoff is None:
+        return 0
+    return int(con.execute(f"SELECT COUNT(*) FROM ({select_sql})", [cutoff]).fetchone()[0])
+
+
+def apply_retention(
+    con: duckdb.DuckDBPyConnection,
+    db_path: Path = DB_PATH,
+    hourly_days: int = HOURLY_DAYS,
+    daily_days: int = DAILY_DAYS,
+    archive_dir=ARCHIVE_DIR,
+    dry_run: bool = False,
+    now=None,
+) -> dict:
+    """Aplica a política numa conexão de ESCRITA; devolve o relatório (linhas e bytes)."""
+    if hourly_days < 1:
+        raise ValueError("hourly_days deve ser >= 1")
+    ensure_daily_table(con)
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now("UTC")
+    if now.tzinfo is not None:
+        now = now.tz_convert("UTC").tz_localize(None)
+    hourly_cutoff = (now - pd.Timedelta(days=hourly_days)).floor("D").to_pydatetime()
+    daily_cutoff = (now - pd.Timedelta(days=daily_days)).floor("D").date() if daily_days > 0 else None
+
+    old_hourly = "SELECT * FROM raw.weather_hourly WHERE ts < ?"
+    old_daily = "SELECT * FROM refined.weather_daily WHERE day < ?"
+    report = {
+        "hourly_cutoff": hourly_cutoff.isoformat(),
+        "daily_cutoff": daily_cutoff.isoformat() if daily_cutoff else None,
+        "archive_dir": Path(archive_dir).as_posix() if archive_dir else None,
+        "hourly_rows_expired": _count(con, old_hourly, hourly_cutoff),
+        "bytes_before": file_bytes(db_path),
+        "dry_run": dry_run,
+    }
+    if dry_run:
+        # rollups que já existem (os de agora só nascem na execução de verdade)
+        report["daily_rows_expired"] = _count(con, old_daily, daily_cutoff)
+        return report
+
+    con.execute("BEGIN TRANSACTION")
+    try:
+        # dias já vencidos -> rollup. As horas desses dias já saíram de raw numa
+        # execução anterior; o que sobrar aqui veio de um backfill depois dela.
+        # Horas que o rollup já tem (bit ligado em hour_mask) são ignoradas; as
+        # que faltavam entram na conta do dia
+        merge = ",\n              ".join(_merge_sql(c, how) for c, how in DAILY_MERGE.items())
+        report["days_rolled_up"] = con.execute(
+            f"""
+            INSERT INTO refined.weather_daily
+            {ROLLUP_SQL}
+            ON CONFLICT DO UPDATE SET
+              {merge},
+              hours = hours + EXCLUDED.hours,
+              hour_mask = hour_mask | EXCLUDED.hour_mask
+            """,
+            [hourly_cutoff],
+        ).fetchone()[0]
+
+        if archive_dir and report["hourly_rows_expired"]:
+            _archive(con, old_hourly, [hourly_cutoff], Path(archive_dir) / "raw_hourly", "ts")
+        con.execute("DELETE FROM raw.weather_hourly WHERE ts < ?", [hourly_cutoff])
+
+        report["daily_rows_expired"] = _count(con, old_daily, daily_cutoff)
+        if report["daily_rows_expired"]:
+            if archive_dir:
+                _archive(con, old_daily, [daily_cutoff], Path(archive_dir) / "daily", "day")
+            con.execute("DELETE FROM refined.weather_daily WHERE day < ?", [daily_cutoff])
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+    con.execute("CHECKPOINT")
+    report["bytes_after"] = file_bytes(db_path)
+    return report
+
+
+def rebuild_file(db_path: Path = DB_PATH) -> dict:
+    """Copia o banco para um arquivo novo e troca (devolve o espaço livre ao disco).
+    Falha se outro processo (ex.: a API) estiver com o arquivo aberto."""
+    db_path = Path(db_path)
+    tmp = db_path.with_name(db_path.stem + ".rebuild.duckdb")
+    tmp.unlink(missing_ok=True)
+    before = file_bytes(db_path)
+
+    con = duckdb.connect()
+    try:
+        con.execute(f"ATTACH '{db_path.as_posix()}' AS src")
+        con.execute("CHECKPOINT src")  # aplica o WAL antes de copiar
+        con.execute(f"ATTACH '{tmp.as_posix()}' AS dst")
+        con.execute("COPY FROM DATABASE src TO dst")
+        con.execute("DETACH dst")
+        con.execute("DETACH src")
+    finally:
+        con.close()
+    os.replace(tmp, db_path)
+    return {"bytes_before": before, "bytes_after": file_bytes(db_path)}
+
+
+def _mb(n) -> str:
+    return f"{n / 1e6:.1f} MB" if n is not None else "?"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--hourly-days", type=int, default=HOURLY_DAYS)
+    ap.add_argument("--daily-days", type=int, default=DAILY_DAYS, help="0 = manter sempre")
+    ap.add_argument("--archive-dir", type=Path, default=ARCHIVE_DIR)
+    ap.add_argument("--no-archive", action="store_true", help="descarta em vez de gravar Parquet")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--rebuild", action="store_true", help="reescreve o arquivo (API parada)")
+    args = ap.parse_args()
+    archive = None if args.no_archive else args.archive_dir
+
+    try:
+        # API no ar: a retenção entra na fila do escritor dela
+        r = requests.post(
+            f"{API_BASE}/retention/run",
+            params={
+                "hourly_days": args.hourly_days,
+                "daily_days": args.daily_days,
+                "archive": not args.no_archive,
+                "dry_run": args.dry_run,
+            },
+            timeout=3600,
+        )
+        r.raise_for_status()
+        report = r.json()
+        if args.rebuild:
+            print("[WARN] --rebuild ignorado: a API está com o arquivo aberto; pare-a e rode de novo.")
+    except requests.ConnectionError:
+        if not DB_PATH.exists():
+            print("Banco não encontrado. Faça backfill/coleta primeiro.")
+            return
+        with duckdb.connect(DB_PATH.as_posix()) as con:
+            report = apply_retention(
+                con, DB_PATH, args.hourly_days, args.daily_days, archive, args.dry_run
+            )
+        if args.rebuild and not args.dry_run:
+            rebuilt = rebuild_file(DB_PATH)
+            report["bytes_after"] = rebuilt["bytes_after"]
+            report["rebuilt"] = True
+
+    print("=== RETENÇÃO ===")
+    print(f"horário mantido a partir de: {report['hourly_cutoff']}")
+    print(f"linhas horárias vencidas:    {report['hourly_rows_expired']}")
+    if report.get("daily_cutoff"):
+        print(f"rollups diários vencidos:    {report['daily_rows_expired']} (antes de {report['daily_cutoff']})")
+    if report["dry_run"]:
+        print("(dry-run: nada foi alterado)")
+        return
+    print(f"dias consolidados:           {report.get('days_rolled_up', 0)}")
+    print(f"arquivo: {_mb(report['bytes_before'])} -> {_mb(report.get('bytes_after'))}"
+          + ("  (reescrito)" if report.get("rebuilt") else ""))
+
+
+if __name__ == "__main__":
+    main()
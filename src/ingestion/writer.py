@@ -0,0 +1,274 @@
+# src/ingestion/writer.py
+# Escritor único do DuckDB dentro do processo da API.
+# - DuckDB aceita UM escritor por arquivo: em vez de cada requisição abrir a sua
+#   conexão e disputar o lock, os handlers enfileiram o pa.Table já parseado e
+#   esperam um Future com o nº de linhas novas
+# - Uma thread dedicada junta o que chegar em até RT_WEATHER_WRITER_DELAY_MS
+#   (padrão 200 ms) ou RT_WEATHER_WRITER_MAX_ROWS linhas e grava tudo numa
+#   transação só (dedup contra a tabela + INSERT)
+# - Outras escritas (delete, auditoria) entram na mesma fila via run(fn) e
+#   rodam na ordem de chegada, na conexão do escritor
+# - Os valores são convertidos para os tipos da tabela antes do dedup (a tabela
+#   pode estar no layout compacto, ver queries.COMPACT_TYPES)
+# - on_insert(con) roda na mesma transação, depois do INSERT, com as linhas
+#   novas na tabela temporária _ingest_new (ex.: pontuar previsões pendentes,
+#   src/ingestion/accuracy.py)
+# - Se o lote falhar, cada requisição é regravada sozinha: um frame ruim não
+#   derruba os outros
+# - Requisição perfilada (src/ingestion/profiling.py) leva o RequestProfile junto
+#   com o item da fila: os statements do lote (dedup, INSERT, on_insert) entram
+#   nos planos dela
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+from src.ingestion import profiling
+from src.ingestion.metrics import (
+    INGEST_STAGE_SECONDS,
+    WRITER_BATCH_REQUESTS,
+    WRITER_BATCH_ROWS,
+    WRITER_QUEUE_DEPTH,
+    REGISTRY,
+)
+from src.ingestion.payload import SCHEMA
+
+MAX_DELAY_S = float(os.environ.get("RT_WEATHER_WRITER_DELAY_MS", "200")) / 1000
+MAX_ROWS = int(os.environ.get("RT_WEATHER_WRITER_MAX_ROWS", "50000"))
+
+COLUMNS = SCHEMA.names
+_KEYS = ("ts", "latitude", "longitude")
+
+
+def _as_table(frame) -> pa.Table:
+    """pa.Table ou DataFrame -> pa.Table no schema de raw.weather_hourly."""
+    if not isinstance(frame, pa.Table):
+        frame = pa.Table.from_pandas(frame[COLUMNS], preserve_index=False)
+    return frame.select(COLUMNS).cast(SCHEMA)
+
+
+def insert_batch(
+    con: duckdb.DuckDBPyConnection,
+    frames: Sequence,
+    endpoint: str = "writer",
+    on_insert: Optional[Callable[[duckdb.DuckDBPyConnection], None]] = None,
+) -> list:
+    """Grava as linhas novas de vários frames numa transação; devolve as novas por frame.
+
+    Mesma semântica do antigo SELECT … EXCEPT …: linha idêntica (todas as colunas,
+    NULL = NULL) à que já está na tabela não entra; repetida entre frames do lote
+    conta para o primeiro."""
+    tables = [_as_table(f) for f in frames]
+    if not any(t.num_rows for t in tables):
+        return [0] * len(tables)
+    batch = pa.concat_tables(
+        [
+            t.append_column("_req", pa.array(np.full(t.num_rows, i, dtype=np.int32)))
+            for i, t in enumerate(tables)
+        ]
+    )
+    cols = ", ".join(COLUMNS)
+    # valores no tipo da tabela ANTES do dedup: numa tabela compacta 21.3 DOUBLE
+    # nunca é igual ao 21.3 já gravado como REAL
+    types = dict(
+        con.execute(
+            """
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = 'raw' AND table_name = 'weather_hourly'
+            """
+        ).fetchall()
+    )
+    typed = ", ".join(f"CAST({c} AS {types[c]}) AS {c}" for c in COLUMNS)
+    match = " AND ".join(
+        f"w.{c} = b.{c}" if c in _KEYS else f"w.{c} IS NOT DISTINCT FROM b.{c}" for c in COLUMNS
+    )
+
+    con.register("_ingest_batch", batch)
+    con.execute("BEGIN TRANSACTION")
+    try:
+        with INGEST_STAGE_SECONDS.time(endpoint=endpoint, stage="dedup"):
+            con.execute(
+                f"""
+                CREATE OR REPLACE TEMP TABLE _ingest_new AS
+                SELECT b.*
+                FROM (
+                  SELECT {cols}, MIN(_req) AS _req
+                  FROM (SELECT {typed}, _req FROM _ingest_batch)
+                  GROUP BY ALL
+                ) b
+                ANTI JOIN raw.weather_hourly w ON {match}
+                """
+            )
+        with INGEST_STAGE_SECONDS.time(endpoint=endpoint, stage="insert"):
+            con.execute(f"INSERT INTO raw.weather_hourly ({cols}) SELECT {cols} FROM _ingest_new")
+        per_req = dict(con.execute("SELECT _req, COUNT(*) FROM _ingest_new GROUP BY _req").fetchall())
+        if on_insert is not None and per_req:
+            on_insert(con)
+        con.execute("DROP TABLE _ingest_new")
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.unregister("_ingest_batch")
+    return [int(per_req.get(i, 0)) for i in range(len(tables))]
+
+
+class _Insert:
+    __slots__ = ("table", "future", "prof")
+
+    def __init__(self, table: pa.Table):
+        self.table = table
+        self.future: Future = Future()
+        self.prof = profiling.current()  # contexto de quem enfileirou, não da thread escritora
+
+
+class _Op:
+    __slots__ = ("fn", "future", "prof")
+
+    def __init__(self, fn: Callable):
+        self.fn = fn
+        self.future: Future = Future()
+        self.prof = profiling.current()
+
+
+_STOP = object()
+
+
+class IngestWriter:
+    """Fila + thread escritora. insert()/run() devolvem Futures."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        on_connect: Optional[Callable[[duckdb.DuckDBPyConnection], None]] = None,
+        on_insert: Optional[Callable[[duckdb.DuckDBPyConnection], None]] = None,
+        max_delay_s: float = MAX_DELAY_S,
+        max_rows: int = MAX_ROWS,
+    ):
+        self.db_path = Path(db_path)
+        self.on_connect = on_connect
+        self.on_insert = on_insert
+        self.max_delay_s = max_delay_s
+        self.max_rows = max_rows
+        self._q: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        REGISTRY.add_collector(lambda: WRITER_QUEUE_DEPTH.set(self._q.qsize()))
+
+    # ---------------- API pública ----------------
+    def insert(self, frame) -> Future:
+        """Enfileira um pa.Table/DataFrame; o Future resolve com o nº de linhas novas."""
+        item = _Insert(_as_table(frame))
+        self._submit(item)
+        return item.future
+
+    def run(self, fn: Callable[[duckdb.DuckDBPyConnection], object]) -> Future:
+        """Executa fn(con) na conexão do escritor, na ordem da fila."""
+        item = _Op(fn)
+        self._submit(item)
+        return item.future
+
+    def close(self, timeout: float = 30) -> None:
+        """Grava o que estiver na fila e encerra a thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._q.put(_STOP)
+            thread.join(timeout)
+
+    # ---------------- thread escritora ----------------
+    def _submit(self, item) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="ingest-writer", daemon=True)
+                self._thread.start()
+            self._q.put(item)
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        con = duckdb.connect(self.db_path.as_posix())
+        if self.on_connect is not None:
+            self.on_connect(con)
+        return con
+
+    def _loop(self) -> None:
+        con = None
+        stop = False
+        while not stop:
+            item = self._q.get()
+            if item is _STOP:
+                break
+            if con is None:
+                try:
+                    con = self._connect()
+                except Exception as e:
+                    item.future.set_exception(e)  # tenta conectar de novo no próximo item
+                    continue
+            if isinstance(item, _Op):
+                self._run_op(con, item)
+                continue
+
+            # junta inserts até o prazo ou o limite de linhas; uma _Op fecha o lote
+            batch, rows, pending_op = [item], item.table.num_rows, None
+            deadline = time.monotonic() + self.max_delay_s
+            while rows < self.max_rows:
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    break
+                try:
+                    nxt = self._q.get(timeout=wait)
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                if isinstance(nxt, _Op):
+                    pending_op = nxt
+                    break
+                batch.append(nxt)
+                rows += nxt.table.num_rows
+
+            self._flush(con, batch, rows)
+            if pending_op is not None:
+                self._run_op(con, pending_op)
+        if con is not None:
+            con.close()
+
+    def _flush(self, con, batch: list, rows: int) -> None:
+        WRITER_BATCH_REQUESTS.observe(len(batch))
+        WRITER_BATCH_ROWS.observe(rows)
+        # lote com mais de uma requisição perfilada: os planos vão para a primeira
+        prof = next((it.prof for it in batch if it.prof is not None), None)
+        try:
+            with profiling.writer_connection(con, prof) as c:
+                counts = insert_batch(c, [it.table for it in batch], on_insert=self.on_insert)
+            for it, n in zip(batch, counts):
+                it.future.set_result(n)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            for it in batch:
+                try:
+                    with profiling.writer_connection(con, it.prof) as c:
+                        n = insert_batch(c, [it.table], on_insert=self.on_insert)[0]
+                    it.future.set_result(n)
+                except Exception as e_one:
+                    it.future.set_exception(e_one)
+
+    @staticmethod
+    def _run_op(con, item: _Op) -> None:
+        try:
+            with profiling.writer_connection(con, item.prof) as c:
+                result = item.fn(c)
+            item.future.set_result(result)
+        except Exception as e:
+            item.future.set_exception(e)
@@ -1,13 +1,41 @@
 from pathlib import Path
+import argparse
+import os
 import numpy as np
 import duckdb
 import pandas as pd
 
+from src.ingestion.client import read_series
+
 DB_PATH = Path("data") / "rt_weather.duckdb"
 REF_DIR = Path("data") / "refined"
-REF_DIR.mkdir(parents=True, exist_ok=True)
+TARGET = "temp_t_plus_1h"
+# alvos t+1h (--targets); a temperatura sempre entra, os outros são opcionais
+TARGETS = {
+    "temp": "temp_t_plus_1h",
+    "humidity": "rh_t_plus_1h",
+    "pop": "pop_t_plus_1h",
+    "wmo": "wmo_class_t_plus_1h",
+}
+# classes grossas do weathercode (WMO) para o alvo "wmo"
+WMO_CLASSES = ["Céu limpo", "Nublado", "Névoa", "Chuva", "Neve", "Tempestade"]
+# RT_WEATHER_COMPACT=1: Parquet de features em float32 (metade do tamanho e da memória ao ler)
+COMPACT = os.environ.get("RT_WEATHER_COMPACT", "").lower() in ("1", "true", "yes")
+
+def wmo_class(code) -> np.ndarray:
+    """weathercode -> índice em WMO_CLASSES (NaN continua NaN)."""
+    code = np.asarray(code, dtype=float)
+    cls = np.select(
+        [code <= 1, code <= 3, code <= 48, ((code >= 71) & (code <= 77)) | (code == 85) | (code == 86), code >= 95],
+        [0, 1, 2, 4, 5],
+        default=3,  # garoa, chuva e pancadas
+    )
+    return np.where(np.isnan(code), np.nan, cls)
 
-def make_features(df: pd.DataFrame) -> pd.DataFrame:
+def make_features(df: pd.DataFrame, targets=("temp",)) -> pd.DataFrame:
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        raise ValueError(f"alvos desconhecidos: {sorted(unknown)} (válidos: {list(TARGETS)})")
     df = df.sort_values("ts").reset_index(drop=True)
     df["ts"] = pd.to_datetime(df["ts"])
     df["hour"] = df["ts"].dt.hour
@@ -20,32 +48,71 @@ def make_features(df: pd.DataFrame) -> pd.DataFrame:
     df["temp_ma_3h"] = df["temperature_2m"].rolling(3).mean()
     df["temp_ma_6h"] = df["temperature_2m"].rolling(6).mean()
     df["temp_t_plus_1h"] = df["temperature_2m"].shift(-1)
+    if "humidity" in targets:
+        df["rh_t_plus_1h"] = df["relative_humidity_2m"].shift(-1)
+    if "pop" in targets:
+        df["pop_t_plus_1h"] = df["precipitation_probability"].shift(-1)
+    if "wmo" in targets:
+        df["wmo_class_t_plus_1h"] = pd.Series(wmo_class(df["weathercode"]), index=df.index).shift(-1)
 
     df = df.dropna().reset_index(drop=True)
 
     feat_cols = [c for c in df.columns if c.startswith("temp_lag_")]
     feat_cols += ["temp_ma_3h","temp_ma_6h","relative_humidity_2m","precipitation","wind_speed_10m","hour_sin","hour_cos"]
     feat_cols = [c for c in feat_cols if c in df.columns]
-    cols = ["ts"] + feat_cols + ["temp_t_plus_1h"]
+    target_cols = [col for name, col in TARGETS.items() if name == "temp" or name in targets]
+    cols = ["ts"] + feat_cols + target_cols
     return df[cols]
 
+def feature_matrix(feat: pd.DataFrame, feature_cols=None, dtype=np.float32, targets=(TARGET,)):
+    """Features -> (X, y, cols) com X contíguo (linhas, features) no dtype pedido.
+
+    X é preenchido coluna a coluna num único array: sem o bloco float64
+    intermediário de DataFrame.to_numpy(). As árvores do sklearn trabalham em
+    float32, então o fit não faz outra cópia. y fica em float64 (métricas):
+    1 coluna de `targets` -> vetor; várias -> matriz (linhas, alvos)."""
+    if feature_cols is None:
+        feature_cols = [c for c in feat.columns if c != "ts" and c not in TARGETS.values()]
+    X = np.empty((len(feat), len(feature_cols)), dtype=dtype)
+    for j, c in enumerate(feature_cols):
+        X[:, j] = feat[c].to_numpy()
+    targets = [t for t in targets if t in feat.columns]
+    if not targets:
+        y = None
+    elif len(targets) == 1:
+        y = feat[targets[0]].to_numpy(dtype=np.float64)
+    else:
+        y = feat[targets].to_numpy(dtype=np.float64)
+    return X, y, list(feature_cols)
+
 def main():
-    con = duckdb.connect(DB_PATH.as_posix())
-    df = con.execute("SELECT * FROM raw.weather_hourly ORDER BY ts").df()
-    con.close()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--targets", default="temp", help=f"lista: {','.join(TARGETS)}")
+    args = ap.parse_args()
+    targets = tuple(filter(None, args.targets.split(",")))
+
+    df = read_series(db_path=DB_PATH)
 
     if df.empty or len(df) < 30:
         print("[WARN] Poucos dados: rode /backfill e /collect na API antes.")
         return
 
-    feat = make_features(df)
+    feat = make_features(df, targets)
+    if COMPACT:
+        feat = feat.astype({c: "float32" for c in feat.columns if c != "ts"})
     # salva parquet
+    REF_DIR.mkdir(parents=True, exist_ok=True)
     out_pq = REF_DIR / "weather_features.parquet"
     feat.to_parquet(out_pq, index=False)
     print(f"[OK] salvo {out_pq} (linhas={len(feat)}, colunas={len(feat.columns)})")
 
-    # (opcional) salvar no DuckDB
-    con = duckdb.connect(DB_PATH.as_posix())
+    # (opcional) salvar no DuckDB — só funciona com a API parada (ela é a única
+    # que abre o arquivo); as mesmas features também saem da API em /features
+    try:
+        con = duckdb.connect(DB_PATH.as_posix())
+    except duckdb.IOException:
+        print("[WARN] banco em uso pela API: tabela refined.weather_features não atualizada")
+        return
     con.execute("CREATE SCHEMA IF NOT EXISTS refined;")
     con.register("feat_tmp", feat)
     con.execute("DROP TABLE IF EXISTS refined.weather_features;")
@@ -1,7 +1,15 @@
 # src/training/train.py
 # Treina RandomForestRegressor para prever temperatura da PRÓXIMA hora (t+1h)
-# Salva: modelo (.pkl), lista de colunas usadas no fit (feature_cols.json)
+# Salva: modelo (.pkl), lista de colunas usadas no fit (feature_cols.json) e a
+# mesma floresta achatada (.npz, backend RT_WEATHER_MODEL_BACKEND=flat)
+# - X é montado UMA vez em float32 contíguo (feature_matrix); treino/teste são
+#   fatias (views) dele, sem cópia; o modelo é treinado sem nomes de coluna
+# - Hiperparâmetros: models/best_params.json (src/training/tune.py) se existir,
+#   senão n_estimators=300; os usados vão para models/model_params.json
+# - --targets temp,humidity,pop,wmo: UM modelo multi-saída (src/inference/multi.py)
+#   com o mesmo X, salvo em models/model_rf_multi_next_hour.pkl (+ .npz, .json)
 from pathlib import Path
+import argparse
 import json
 
 import joblib
@@ -11,21 +19,84 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 import matplotlib.pyplot as plt
 
+from src.inference.forest import FlatForest, flat_path
+from src.inference.multi import WMO_TARGET, MultiTargetModel, meta_path
+from src.processing.prepare_data import TARGET, TARGETS, feature_matrix
+
 REF_PQ = Path("data/refined/weather_features.parquet")
 MODEL_DIR = Path("models")
 DOCS_DIR = Path("docs")
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 DOCS_DIR.mkdir(parents=True, exist_ok=True)
+BEST_PARAMS_PATH = MODEL_DIR / "best_params.json"
+DEFAULT_PARAMS = {"n_estimators": 300}
+
 
+def load_params() -> dict:
+    """Parâmetros do RF: os da última busca (tune.py) ou o padrão."""
+    if BEST_PARAMS_PATH.exists():
+        best = json.loads(BEST_PARAMS_PATH.read_text(encoding="utf-8"))
+        return {**DEFAULT_PARAMS, **best["params"]}
+    return dict(DEFAULT_PARAMS)
 
-def time_split(df: pd.DataFrame, test_size: float = 0.2):
-    """Split temporal: primeiras linhas = treino, últimas = teste."""
-    n = len(df)
+
+def time_split(a, test_size: float = 0.2):
+    """Split temporal: primeiras linhas = treino, últimas = teste.
+    Em ndarray devolve views (a[:cut], a[cut:]), sem copiar."""
+    n = len(a)
     cut = int(n * (1 - test_size))
-    return df.iloc[:cut], df.iloc[cut:]
+    if isinstance(a, (pd.DataFrame, pd.Series)):
+        return a.iloc[:cut], a.iloc[cut:]
+    return a[:cut], a[cut:]
+
+
+def save_feature_cols(feature_cols: list) -> None:
+    with open(MODEL_DIR / "feature_cols.json", "w", encoding="utf-8") as f:
+        json.dump(feature_cols, f, ensure_ascii=False, indent=2)
+
+
+def train_multi(X: np.ndarray, Y: np.ndarray, targets: list, feature_cols: list) -> None:
+    """Um RF multi-saída para todos os alvos (mesmo X, mesmo split temporal)."""
+    Xtr, Xte = time_split(X, test_size=0.2)
+    Ytr, Yte = time_split(Y, test_size=0.2)
+
+    params = load_params()
+    print(f"Parâmetros: {params} | alvos: {targets}")
+    model = MultiTargetModel.fit(
+        RandomForestRegressor(**params, random_state=42, n_jobs=-1), Xtr, Ytr, targets
+    )
+    pred = model.decode(model.predict(Xte))
+
+    metrics = {}
+    for j, t in enumerate(targets):
+        y_hat = np.array([p[t] for p in pred], dtype=float)
+        if t == WMO_TARGET:
+            metrics[t] = {"accuracy": float((y_hat == Yte[:, j]).mean())}
+            print(f"{t} -> acurácia={metrics[t]['accuracy']:.1%}")
+        else:
+            metrics[t] = {"mae": mean_absolute_error(Yte[:, j], y_hat)}
+            print(f"{t} -> MAE={metrics[t]['mae']:.2f}")
+
+    model_path = MODEL_DIR / "model_rf_multi_next_hour.pkl"
+    joblib.dump(model, model_path)
+    FlatForest.from_sklearn(model.forest).save(flat_path(model_path))
+    model.save_meta(meta_path(model_path))
+    save_feature_cols(feature_cols)
+    with open(MODEL_DIR / "model_multi_params.json", "w", encoding="utf-8") as f:
+        json.dump({"params": params, "targets": targets, "metrics": metrics}, f, ensure_ascii=False, indent=2)
+    print(f"[OK] modelo multi-alvo salvo em {model_path} (+ .npz, .json)")
 
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--targets", default="temp", help=f"lista: {','.join(TARGETS)}")
+    args = ap.parse_args()
+    names = list(filter(None, args.targets.split(",")))
+    unknown = set(names) - set(TARGETS)
+    if unknown:
+        raise ValueError(f"alvos desconhecidos: {sorted(unknown)} (válidos: {list(TARGETS)})")
+    targets = [TARGETS[n] for n in names]
+
     if not REF_PQ.exists():
         raise FileNotFoundError(
             f"Arquivo de features não encontrado: {REF_PQ}. "
@@ -33,23 +104,27 @@ def main():
         )
 
     df = pd.read_parquet(REF_PQ)
+    missing = [t for t in targets if t not in df.columns]
+    if missing:
+        raise ValueError(
+            f"alvos ausentes no Parquet: {missing}. "
+            f"Rode: python -m src.processing.prepare_data --targets {args.targets}"
+        )
 
-    # X (features) e y (alvo)
-    y = df["temp_t_plus_1h"]
-    X = df.drop(columns=["temp_t_plus_1h", "ts"], errors="ignore")
-
-    # Guarda as colunas usadas no fit
-    feature_cols = X.columns.tolist()
+    # X (features, float32) e y (alvo); feature_cols = colunas usadas no fit
+    X, y, feature_cols = feature_matrix(df, targets=targets)
+    del df
+    if targets != [TARGET]:
+        train_multi(X, y.reshape(len(X), -1), targets, feature_cols)
+        return
 
-    # Split temporal
-    df_xy = pd.concat([X, y], axis=1)
-    train, test = time_split(df_xy, test_size=0.2)
-    Xtr, ytr = train.iloc[:, :-1], train.iloc[:, -1]
-    Xte, yte = test.iloc[:, :-1], test.iloc[:, -1]
+    # Split temporal (views)
+    Xtr, Xte = time_split(X, test_size=0.2)
+    ytr, yte = time_split(y, test_size=0.2)
 
     # Baseline: persistência (y_hat = temp_lag_1h)
-    if "temp_lag_1h" in Xte.columns:
-        y_pred_naive = Xte["temp_lag_1h"].values
+    if "temp_lag_1h" in feature_cols:
+        y_pred_naive = Xte[:, feature_cols.index("temp_lag_1h")]
         mae_n = mean_absolute_error(yte, y_pred_naive)
         rmse_n = np.sqrt(mean_squared_error(yte, y_pred_naive))
         print(f"Baseline (persistência) -> MAE={mae_n:.2f}°C | RMSE={rmse_n:.2f}°C")
@@ -58,7 +133,9 @@ def main():
         print("Baseline indisponível (faltou coluna temp_lag_1h).")
 
     # Modelo
-    rf = RandomForestRegressor(n_estimators=300, random_state=42, n_jobs=-1)
+    params = load_params()
+    print(f"Parâmetros: {params}")
+    rf = RandomForestRegressor(**params, random_state=42, n_jobs=-1)
     rf.fit(Xtr, ytr)
 
     y_pred = rf.predict(Xte)
@@ -69,7 +146,7 @@ def main():
     # Gráfico comparando real vs previsões (janela final)
     last = min(120, len(yte))
     plt.figure(figsize=(9, 4))
-    plt.plot(range(last), yte.values[-last:], label="Real")
+    plt.plot(range(last), yte[-last:], label="Real")
     plt.plot(range(last), y_pred[-last:], label="RF")
     if not np.isnan(mae_n):
         plt.plot(range(last), y_pred_naive[-last:], label="Persistência")
@@ -83,11 +160,13 @@ def main():
     # Salva modelo + colunas
     model_path = MODEL_DIR / "model_rf_temp_next_hour.pkl"
     joblib.dump(rf, model_path)
-    with open(MODEL_DIR / "feature_cols.json", "w", encoding="utf-8") as f:
-        json.dump(feature_cols, f, ensure_ascii=False, indent=2)
+    FlatForest.from_sklearn(rf).save(flat_path(model_path))
+    save_feature_cols(feature_cols)
+    with open(MODEL_DIR / "model_params.json", "w", encoding="utf-8") as f:
+        json.dump({"params": params, "mae": mae, "rmse": rmse}, f, ensure_ascii=False, indent=2)
 
     print(
-        f"[OK] modelo salvo em {model_path}\n"
+        f"[OK] modelo salvo em {model_path} (+ {flat_path(model_path).name})\n"
         f"[OK] {len(feature_cols)} features salvas em models/feature_cols.json"
     )
 
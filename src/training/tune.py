@@ -0,0 +1,246 @@
+# src/training/tune.py
+# Busca de hiperparâmetros do RandomForestRegressor (train.py) em processos paralelos.
+# - X (float32, feature_matrix) e y são montados UMA vez e gravados em
+#   models/tune_cache/*.npy; cada worker abre em memmap (sem cópia por processo)
+# - Folds temporais em janela crescente, só dentro da parte de TREINO do
+#   train.py (os últimos 20% continuam fora); cada fold é um par de fatias
+# - Estratégias: "halving" (successive halving: todos os candidatos com uma
+#   fração das linhas mais recentes de cada fold; o melhor 1/eta sobe de degrau
+#   com eta vezes mais linhas) ou "random" (todos os candidatos com tudo)
+# - Cada ajuste (candidato, fold, fração) vira um JSON em tune_cache/results/:
+#   rodar de novo (ex.: depois de interromper) reaproveita o que já terminou.
+#   Tudo é gravado num .tmp e trocado com os.replace: uma interrupção no meio
+#   da escrita não deixa arquivo truncado (e um ilegível conta como ausente)
+# - Resultado: models/best_params.json (lido pelo train.py)
+#
+# Uso:
+#   python -m src.training.tune --candidates 24 --folds 3 --workers 4
+#   python -m src.training.tune --strategy random --candidates 8
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+
+from src.processing.prepare_data import feature_matrix
+from src.training.train import MODEL_DIR, REF_PQ, time_split
+
+CACHE_DIR = MODEL_DIR / "tune_cache"
+BEST_PARAMS_PATH = MODEL_DIR / "best_params.json"
+
+# espaço de busca (amostrado sem repetição)
+SPACE = {
+    "n_estimators": [100, 200, 300, 500],
+    "max_depth": [None, 12, 16, 20, 28],
+    "min_samples_leaf": [1, 2, 4, 8],
+    "max_features": [1.0, 0.7, 0.5, 0.33],
+    "max_samples": [None, 0.8, 0.5],
+}
+
+# memmaps abertos uma vez por worker (initializer)
+_X = _y = None
+
+
+def sample_candidates(n: int, seed: int = 42) -> list:
+    """n combinações distintas de SPACE (ordem determinística pelo seed)."""
+    rng = np.random.default_rng(seed)
+    total = int(np.prod([len(v) for v in SPACE.values()]))
+    seen, out = set(), []
+    while len(out) < min(n, total):
+        params = {k: v[rng.integers(len(v))] for k, v in SPACE.items()}
+        key = json.dumps(params, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            out.append(params)
+    return out
+
+
+def temporal_folds(n_rows: int, n_folds: int, val_frac: float = 0.1) -> list:
+    """[(fim_treino, fim_validação)]: janela crescente, validação logo depois do treino."""
+    val = max(1, int(n_rows * val_frac))
+    first = n_rows - n_folds * val
+    if first < val:
+        raise ValueError(f"linhas insuficientes para {n_folds} folds ({n_rows})")
+    return [(first + k * val, first + (k + 1) * val) for k in range(n_folds)]
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _save_npy_atomic(path: Path, arr: np.ndarray) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path):
+    """Conteúdo do JSON, ou None se não existir ou estiver ilegível (escrita interrompida)."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _fingerprint(X: np.ndarray, y: np.ndarray) -> str:
+    """sha1 de X e y lido direto dos buffers (sem cópias de tobytes())."""
+    h = hashlib.sha1()
+    h.update(memoryview(np.ascontiguousarray(X)))
+    h.update(memoryview(np.ascontiguousarray(y)))
+    return h.hexdigest()[:16]
+
+
+def build_cache(cache_dir: Path = CACHE_DIR) -> dict:
+    """Monta X/y de treino uma vez e grava em .npy; devolve os metadados (com fingerprint)."""
+    df = pd.read_parquet(REF_PQ)
+    X, y, cols = feature_matrix(df)
+    del df
+    X, _ = time_split(X)  # só a parte de treino do train.py
+    y, _ = time_split(y)
+    fingerprint = _fingerprint(X, y)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    meta_path = cache_dir / "meta.json"
+    meta = _read_json(meta_path) or {}
+    if meta.get("fingerprint") != fingerprint:
+        # meta.json por último: se a escrita parar antes, o fingerprint não bate e refaz
+        _save_npy_atomic(cache_dir / "X.npy", np.ascontiguousarray(X))
+        _save_npy_atomic(cache_dir / "y.npy", y)
+        meta = {"fingerprint": fingerprint, "rows": len(X), "feature_cols": cols}
+        _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False, indent=2))
+    return meta
+
+
+def _init_worker(cache_dir: str) -> None:
+    global _X, _y
+    _X = np.load(Path(cache_dir) / "X.npy", mmap_mode="r")
+    _y = np.load(Path(cache_dir) / "y.npy", mmap_mode="r")
+
+
+def _fit_fold(params: dict, fold: tuple, frac: float, seed: int) -> dict:
+    """Ajusta num fold (últimas `frac` linhas do treino) e mede MAE na validação."""
+    train_end, val_end = fold
+    start = train_end - max(1, int(train_end * frac))
+    t0 = time.perf_counter()
+    model = RandomForestRegressor(**params, random_state=seed, n_jobs=1)
+    model.fit(_X[start:train_end], _y[start:train_end])
+    mae = mean_absolute_error(_y[train_end:val_end], model.predict(_X[train_end:val_end]))
+    return {"mae": float(mae), "fit_s": time.perf_counter() - t0, "train_rows": train_end - start}
+
+
+def _task_key(fingerprint: str, params: dict, fold: tuple, frac: float, seed: int) -> str:
+    raw = json.dumps([fingerprint, params, list(fold), round(frac, 6), seed], sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def _evaluate(pool, candidates: list, folds: list, frac: float, meta: dict, seed: int, results_dir: Path) -> list:
+    """MAE médio de cada candidato nos folds; reaproveita resultados já gravados."""
+    scores = {i: {} for i in range(len(candidates))}
+    pending = {}
+    for i, params in enumerate(candidates):
+        for f, fold in enumerate(folds):
+            path = results_dir / f"{_task_key(meta['fingerprint'], params, fold, frac, seed)}.json"
+            done = _read_json(path)
+            if done is not None and "mae" in done:
+                scores[i][f] = done["mae"]
+            else:
+                pending[pool.submit(_fit_fold, params, fold, frac, seed)] = (i, f, path)
+
+    cached = sum(len(s) for s in scores.values())
+    print(f"  fração {frac:.3f}: {len(pending)} ajustes ({cached} do cache)")
+    for fut in as_completed(pending):
+        i, f, path = pending[fut]
+        res = fut.result()
+        _write_atomic(path, json.dumps({**res, "params": candidates[i], "fold": f, "frac": frac}))
+        scores[i][f] = res["mae"]
+    return [float(np.mean(list(scores[i].values()))) for i in range(len(candidates))]
+
+
+def search(
+    strategy: str = "halving",
+    n_candidates: int = 24,
+    n_folds: int = 3,
+    eta: int = 3,
+    min_frac: float = 0.1,
+    workers: int = None,
+    seed: int = 42,
+    cache_dir: Path = CACHE_DIR,
+) -> dict:
+    meta = build_cache(cache_dir)
+    folds = temporal_folds(meta["rows"], n_folds)
+    candidates = sample_candidates(n_candidates, seed)
+    results_dir = cache_dir / "results"
+    results_dir.mkdir(parents=True, exist_ok=True)
+
+    if strategy == "random":
+        rungs = [1.0]
+    elif strategy == "halving":
+        n_rungs = max(1, int(np.floor(np.log(1 / min_frac) / np.log(eta))) + 1)
+        rungs = [1.0 / eta ** (n_rungs - 1 - r) for r in range(n_rungs)]
+    else:
+        raise ValueError(f"estratégia desconhecida: {strategy}")
+
+    print(f"{len(candidates)} candidatos, {len(folds)} folds, {meta['rows']} linhas, estratégia={strategy}")
+    alive = list(range(len(candidates)))
+    history = []
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(cache_dir.as_posix(),)
+    ) as pool:
+        for r, frac in enumerate(rungs):
+            scores = _evaluate(pool, [candidates[i] for i in alive], folds, frac, meta, seed, results_dir)
+            ranked = sorted(zip(scores, alive))
+            history.append(
+                {"frac": frac, "results": [{"mae": s, "params": candidates[i]} for s, i in ranked]}
+            )
+            if r < len(rungs) - 1:
+                alive = [i for _, i in ranked[: max(1, len(ranked) // eta)]]
+
+    best_mae, best_i = ranked[0]
+    return {
+        "params": candidates[best_i],
+        "cv_mae": best_mae,
+        "strategy": strategy,
+        "folds": [list(f) for f in folds],
+        "rows": meta["rows"],
+        "data_fingerprint": meta["fingerprint"],
+        "created_at_utc": pd.Timestamp.now("UTC").isoformat(),
+        "rungs": history,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--strategy", choices=["halving", "random"], default="halving")
+    ap.add_argument("--candidates", type=int, default=24)
+    ap.add_argument("--folds", type=int, default=3)
+    ap.add_argument("--eta", type=int, default=3)
+    ap.add_argument("--min-frac", type=float, default=0.1, help="fração de linhas do 1º degrau (halving)")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    if not REF_PQ.exists():
+        raise FileNotFoundError(
+            f"Arquivo de features não encontrado: {REF_PQ}. Rode: python -m src.processing.prepare_data"
+        )
+    t0 = time.perf_counter()
+    best = search(
+        args.strategy, args.candidates, args.folds, args.eta, args.min_frac, args.workers, args.seed
+    )
+    _write_atomic(BEST_PARAMS_PATH, json.dumps(best, ensure_ascii=False, indent=2))
+    print(f"[OK] melhor: {best['params']} (MAE cv={best['cv_mae']:.3f}°C) em {time.perf_counter() - t0:.0f}s")
+    print(f"[OK] salvo em {BEST_PARAMS_PATH}; o próximo `python -m src.training.train` usa estes parâmetros")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# tests/conftest.py
+# Raiz do projeto no sys.path (para importar src/*), como em benchmarks/.
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,82 @@
+# tests/test_accuracy.py
+# Acurácia servida: previsões registradas antes do valor real são pontuadas quando
+# a ingestão grava a hora-alvo; a mesma previsão registrada de novo é ignorada.
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ingestion.accuracy import accuracy_query, log_prediction, score_new_rows
+from src.ingestion.queries import raw_table_ddl
+from src.ingestion.writer import insert_batch
+
+LAT, LON = -23.55, -46.63
+T0 = pd.Timestamp("2025-03-01 10:00")
+VERSION = "model_rf_temp_next_hour@20250301T000000"
+
+
+def _actual(hours, temps) -> pd.DataFrame:
+    n = len(hours)
+    return pd.DataFrame(
+        {
+            "ts": [T0 + pd.Timedelta(hours=h) for h in hours],
+            "latitude": LAT,
+            "longitude": LON,
+            "temperature_2m": np.asarray(temps, dtype=float),
+            "relative_humidity_2m": [60.0] * n,
+            "precipitation": [0.0] * n,
+            "wind_speed_10m": [5.0] * n,
+            "weathercode": np.full(n, 3, dtype="int16"),
+            "precipitation_probability": [10.0] * n,
+            "cloudcover": [50.0] * n,
+        }
+    )
+
+
+@pytest.fixture
+def con():
+    c = duckdb.connect()
+    c.execute("CREATE SCHEMA raw")
+    c.execute(raw_table_ddl(False))
+    yield c
+    c.close()
+
+
+def _ingest(con, df) -> list:
+    return insert_batch(con, [df], on_insert=score_new_rows)
+
+
+def _accuracy(con) -> pd.DataFrame:
+    return con.execute(*accuracy_query(LAT, LON, now=T0 + pd.Timedelta(days=1))).df()
+
+
+def test_predictions_are_scored_when_actuals_arrive(con):
+    assert log_prediction(con, LAT, LON, T0 + pd.Timedelta(hours=1), VERSION, 20.0) == 1
+    assert log_prediction(con, LAT, LON, T0 + pd.Timedelta(hours=2), VERSION, 22.0) == 1
+    # rerun do app: mesma previsão (local, hora-alvo, versão) não duplica
+    assert log_prediction(con, LAT, LON, T0 + pd.Timedelta(hours=1), VERSION, 20.5) == 0
+    assert con.execute("SELECT COUNT(*) FROM meta.predictions").fetchone()[0] == 2
+    assert con.execute("SELECT COUNT(*) FROM meta.prediction_accuracy").fetchone()[0] == 0
+
+    assert _ingest(con, _actual([0, 1, 2], [19.0, 21.0, 25.0])) == [3]
+
+    preds = con.execute("SELECT y_hat, actual FROM meta.predictions ORDER BY target_ts").fetchall()
+    assert preds == [(20.0, 21.0), (22.0, 25.0)]  # o y_hat do 1º registro foi mantido
+    acc = _accuracy(con).iloc[0]
+    assert acc["n"] == 2
+    assert acc["mae"] == pytest.approx((1 + 3) / 2)
+    assert acc["rmse"] == pytest.approx(np.sqrt((1 + 9) / 2))
+
+    # mesmas linhas de novo: o dedup não grava nada e nada é pontuado duas vezes
+    assert _ingest(con, _actual([0, 1, 2], [19.0, 21.0, 25.0])) == [0]
+    assert _accuracy(con).iloc[0]["n"] == 2
+
+
+def test_prediction_logged_after_actual_is_scored_immediately(con):
+    log_prediction(con, LAT, LON, T0, VERSION, 18.0)  # cria as tabelas meta
+    _ingest(con, _actual([0, 1], [17.0, 20.0]))
+    assert log_prediction(con, LAT, LON, T0 + pd.Timedelta(hours=1), VERSION, 21.5) == 1
+
+    acc = _accuracy(con).iloc[0]
+    assert acc["n"] == 2
+    assert acc["mae"] == pytest.approx((1 + 1.5) / 2)
@@ -0,0 +1,38 @@
+# tests/test_arrow_stream.py
+# Saída JSON em streaming: NaN/±Infinity do DuckDB precisam sair como null.
+import json
+
+import pyarrow as pa
+
+from src.ingestion.arrow_stream import stream_json
+
+
+def _reader(*batches: pa.RecordBatch) -> pa.RecordBatchReader:
+    return pa.RecordBatchReader.from_batches(batches[0].schema, batches)
+
+
+def _batch(temps) -> pa.RecordBatch:
+    return pa.RecordBatch.from_pydict(
+        {
+            "ts": pa.array(["2025-01-01 00:00"] * len(temps)).cast(pa.timestamp("us")),
+            "temperature_2m": pa.array(temps, pa.float64()),
+            "cloudcover": pa.array([50.0] * len(temps), pa.float32()),
+            "weathercode": pa.array([3] * len(temps), pa.int16()),
+        }
+    )
+
+
+def test_non_finite_floats_become_null():
+    body = b"".join(
+        stream_json(_reader(_batch([21.5, float("nan"), None]), _batch([float("inf"), float("-inf")])))
+    )
+    rows = json.loads(body)  # json.loads aceitaria NaN; o texto não pode ter os tokens
+    assert b"NaN" not in body and b"Infinity" not in body
+    assert [r["temperature_2m"] for r in rows] == [21.5, None, None, None, None]
+    assert rows[0] == {"ts": "2025-01-01 00:00:00", "temperature_2m": 21.5, "cloudcover": 50.0, "weathercode": 3}
+
+
+def test_empty_result_is_empty_array():
+    schema = _batch([1.0]).schema
+    body = b"".join(stream_json(pa.RecordBatchReader.from_batches(schema, [])))
+    assert json.loads(body) == []
@@ -0,0 +1,61 @@
+# tests/test_forest.py
+# Paridade da floresta achatada (src/inference/forest.py) com o predict do sklearn.
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.inference.forest import FlatForest
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 8)).astype(np.float32)
+    y = X[:, 0] * 2 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=len(X))
+    return X, y
+
+
+def _fit(X, y, **kw):
+    return RandomForestRegressor(n_estimators=25, max_depth=10, random_state=0, **kw).fit(X, y)
+
+
+def test_parity_single_row_and_batch(data):
+    X, y = data
+    model = _fit(X, y)
+    flat = FlatForest.from_sklearn(model)
+    for x in (X[:1], X[-1:], X):
+        assert np.allclose(flat.predict(x), model.predict(x))
+
+
+def test_parity_after_save_and_load(data, tmp_path):
+    X, y = data
+    model = _fit(X, y)
+    FlatForest.from_sklearn(model).save(tmp_path / "m.npz")
+    flat = FlatForest.load(tmp_path / "m.npz")
+    assert np.allclose(flat.predict(X), model.predict(X))
+
+
+def test_parity_multi_output(data):
+    X, y = data
+    Y = np.column_stack([y, X[:, 2] ** 2])
+    model = _fit(X, Y)
+    flat = FlatForest.from_sklearn(model)
+    assert flat.predict(X[:1]).shape == (1, 2)
+    assert np.allclose(flat.predict(X), model.predict(X))
+
+
+def test_parity_with_missing_values(data):
+    X, y = data
+    X = X.copy()
+    X[::7, 3] = np.nan  # o sklearn aprende para que lado vai o NaN em cada nó
+    model = _fit(X, y)
+    flat = FlatForest.from_sklearn(model)
+    assert np.allclose(flat.predict(X[:1]), model.predict(X[:1]))
+    assert np.allclose(flat.predict(X), model.predict(X))
+
+
+def test_rejects_wrong_width(data):
+    X, y = data
+    flat = FlatForest.from_sklearn(_fit(X, y))
+    with pytest.raises(ValueError):
+        flat.predict(X[:, :5])
@@ -0,0 +1,91 @@
+# tests/test_payload.py
+# Paridade do parse direto para Arrow (parse_payload + drop_future) com o antigo
+# _json_to_df em pandas + filtro de horas futuras, que a ingestão usava antes.
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.ingestion.payload import HOURLY_VARS, drop_future, parse_payload
+
+LAT, LON = -23.550520, -46.633308
+
+
+def _legacy_json_to_df(payload: dict, lat: float, lon: float) -> pd.DataFrame:
+    """Cópia do _json_to_df original (api.py), referência da paridade."""
+    hourly = payload.get("hourly", {})
+    times = hourly.get("time", [])
+    n = len(times)
+
+    df = pd.DataFrame({"ts": pd.to_datetime(times, utc=True)})
+
+    def pick(key: str):
+        if key == "relative_humidity_2m":
+            return hourly.get("relative_humidity_2m") or hourly.get("relativehumidity_2m")
+        if key == "wind_speed_10m":
+            return hourly.get("wind_speed_10m") or hourly.get("windspeed_10m")
+        return hourly.get(key)
+
+    for k in HOURLY_VARS:
+        vals = pick(k)
+        if vals is None or len(vals) != n:
+            vals = [None] * n
+        df[k] = vals
+
+    df["latitude"] = round(lat, 4)
+    df["longitude"] = round(lon, 4)
+    df["ts"] = pd.to_datetime(df["ts"], utc=True).dt.tz_localize(None)
+    df = df[["ts", "latitude", "longitude"] + HOURLY_VARS]
+    # filtro de FUTURO que o /collect aplicava depois
+    return df[pd.to_datetime(df["ts"], utc=True) <= pd.Timestamp.now(tz="UTC")]
+
+
+def _payload() -> dict:
+    # 30 h passadas + 12 h de previsão, como no /collect (forecast_hours)
+    start = pd.Timestamp.now(tz="UTC").floor("h").tz_localize(None) - pd.Timedelta(hours=30)
+    times = pd.date_range(start, periods=42, freq="h")
+    n = len(times)
+    rng = np.random.default_rng(0)
+    temp = np.round(rng.normal(22, 3, n), 1).tolist()
+    temp[3] = None
+    code = rng.choice([0, 3, 61, 95], n).tolist()
+    code[5] = None
+    return {
+        "latitude": LAT,
+        "longitude": LON,
+        "hourly": {
+            "time": [t.strftime("%Y-%m-%dT%H:%M") for t in times],
+            "temperature_2m": temp,
+            "relativehumidity_2m": rng.integers(30, 100, n).tolist(),  # nome alternativo
+            "precipitation": [None] * n,
+            "windspeed_10m": np.round(rng.uniform(0, 30, n), 1).tolist(),
+            "weathercode": code,
+            "precipitation_probability": rng.integers(0, 100, n - 1).tolist(),  # tamanho errado
+            # cloudcover ausente
+        },
+    }
+
+
+def _normalized(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.reset_index(drop=True).copy()
+    df["ts"] = df["ts"].astype("datetime64[ns]")
+    for c in ["latitude", "longitude"] + HOURLY_VARS:
+        df[c] = pd.to_numeric(df[c]).astype("float64")
+    return df
+
+
+def test_parse_payload_matches_legacy_json_to_df():
+    payload = _payload()
+    expected = _legacy_json_to_df(payload, LAT, LON)
+    got = drop_future(parse_payload(json.dumps(payload).encode(), LAT, LON)).to_pandas()
+
+    assert 0 < len(expected) < len(payload["hourly"]["time"])  # houve horas futuras descartadas
+    assert list(got.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(_normalized(got), _normalized(expected))
+    assert got["cloudcover"].isna().all() and got["precipitation_probability"].isna().all()
+
+
+def test_parse_payload_without_hourly_is_empty():
+    tbl = parse_payload(b'{"latitude": 0, "longitude": 0}', LAT, LON)
+    assert tbl.num_rows == 0
+    assert tbl.column_names == ["ts", "latitude", "longitude"] + HOURLY_VARS
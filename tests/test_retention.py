@@ -0,0 +1,113 @@
+# tests/test_retention.py
+# Rollup diário da retenção quando horas de um dia já consolidado voltam num backfill.
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ingestion.queries import raw_table_ddl
+from src.ingestion.retention import apply_retention
+
+NOW = pd.Timestamp("2025-03-10 12:00")
+DAY = pd.Timestamp("2025-03-01")  # vence com hourly_days=5
+
+
+def _hours(hours) -> pd.DataFrame:
+    ts = [DAY + pd.Timedelta(hours=h) for h in hours]
+    h = np.asarray(hours, dtype=float)
+    return pd.DataFrame(
+        {
+            "ts": ts,
+            "latitude": -23.55,
+            "longitude": -46.63,
+            "temperature_2m": 15 + h / 2,
+            "relative_humidity_2m": 60 + h,
+            "precipitation": h / 10,
+            "wind_speed_10m": 5 + h,
+            "weathercode": np.where(h == 17, 95, 3).astype("int16"),
+            "precipitation_probability": 2 * h,
+            "cloudcover": 50.0,
+        }
+    )
+
+
+@pytest.fixture
+def con():
+    c = duckdb.connect()
+    c.execute("CREATE SCHEMA raw")
+    c.execute(raw_table_ddl(False))
+    yield c
+    c.close()
+
+
+def _insert(con, df: pd.DataFrame) -> None:
+    con.register("_rows", df)
+    con.execute("INSERT INTO raw.weather_hourly BY NAME SELECT * FROM _rows")
+    con.unregister("_rows")
+
+
+def _retain(con, tmp_path) -> None:
+    apply_retention(con, tmp_path / "x.duckdb", hourly_days=5, daily_days=0, archive_dir=None, now=NOW)
+
+
+def _daily(con) -> dict:
+    return con.execute("SELECT * FROM refined.weather_daily").df().iloc[0].to_dict()
+
+
+def test_backfill_of_rolled_up_hours_keeps_rollup(con, tmp_path):
+    _insert(con, _hours(range(24)))
+    _retain(con, tmp_path)
+    full = _daily(con)
+    assert full["hours"] == 24
+
+    _insert(con, _hours(range(6)))  # backfill parcial: horas já consolidadas
+    _retain(con, tmp_path)
+    assert _daily(con) == full
+    assert con.execute("SELECT COUNT(*) FROM raw.weather_hourly").fetchone()[0] == 0
+
+
+def _reference(tmp_path, hours) -> dict:
+    ref = duckdb.connect()
+    ref.execute("CREATE SCHEMA raw")
+    ref.execute(raw_table_ddl(False))
+    _insert(ref, _hours(hours))
+    _retain(ref, tmp_path)
+    expected = _daily(ref)
+    ref.close()
+    return expected
+
+
+def _assert_same(got: dict, expected: dict) -> None:
+    for col, value in expected.items():
+        if isinstance(value, float):
+            assert got[col] == pytest.approx(value), col
+        else:
+            assert got[col] == value, col
+
+
+def test_backfill_of_missing_hours_merges_into_rollup(con, tmp_path):
+    _insert(con, _hours(range(18)))
+    _retain(con, tmp_path)
+    _insert(con, _hours(range(18, 24)))  # as 6 horas que faltavam
+    _retain(con, tmp_path)
+    merged = _daily(con)
+
+    assert merged["hours"] == 24
+    _assert_same(merged, _reference(tmp_path, range(24)))
+
+
+def test_partial_day_backfill_counts_each_hour_once(con, tmp_path):
+    _insert(con, _hours(range(12)))
+    _retain(con, tmp_path)
+    half = _daily(con)
+
+    _insert(con, _hours(range(6)))  # só horas já consolidadas: nada muda
+    _retain(con, tmp_path)
+    assert _daily(con) == half
+    assert half["hours"] == 12
+
+    _insert(con, _hours(range(6, 18)))  # 6-11 repetidas, 12-17 novas
+    _retain(con, tmp_path)
+    merged = _daily(con)
+    assert merged["hours"] == 18
+    _assert_same(merged, _reference(tmp_path, range(18)))
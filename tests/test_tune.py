@@ -0,0 +1,25 @@
+# tests/test_tune.py
+# Cache da busca de hiperparâmetros: fingerprint estável e arquivos interrompidos.
+import hashlib
+
+import numpy as np
+
+from src.training.tune import _fingerprint, _read_json, _write_atomic
+
+
+def test_fingerprint_matches_concatenated_bytes():
+    X = np.arange(60, dtype=np.float32).reshape(20, 3)
+    y = np.linspace(0, 1, 20)
+    # mesmo valor do hash antigo (X.tobytes() + y.tobytes()): caches já gravados continuam válidos
+    assert _fingerprint(X, y) == hashlib.sha1(X.tobytes() + y.tobytes()).hexdigest()[:16]
+    assert _fingerprint(X[:10], y[:10]) != _fingerprint(X, y)
+
+
+def test_truncated_json_counts_as_missing(tmp_path):
+    path = tmp_path / "r.json"
+    assert _read_json(path) is None
+    path.write_text('{"mae": 0.8', encoding="utf-8")  # escrita interrompida
+    assert _read_json(path) is None
+    _write_atomic(path, '{"mae": 0.8}')
+    assert _read_json(path) == {"mae": 0.8}
+    assert not list(tmp_path.glob("*.tmp"))
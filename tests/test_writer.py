@@ -0,0 +1,111 @@
+# tests/test_writer.py
+# Escritor único: dedup dentro do lote e contra a tabela, contagem de linhas novas
+# por requisição e isolamento de um frame ruim no meio do lote.
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ingestion.queries import raw_table_ddl
+from src.ingestion.writer import IngestWriter, insert_batch
+
+T0 = pd.Timestamp("2025-01-01 00:00")
+
+
+def _rows(hours, lat=-23.55, lon=-46.63, rh=60.0) -> pd.DataFrame:
+    h = np.asarray(list(hours), dtype=float)
+    return pd.DataFrame(
+        {
+            "ts": T0 + pd.to_timedelta(h, unit="h"),
+            "latitude": lat,
+            "longitude": lon,
+            "temperature_2m": 20 + h / 2,
+            "relative_humidity_2m": rh,
+            "precipitation": 0.0,
+            "wind_speed_10m": 5.0,
+            "weathercode": np.int16(3),
+            "precipitation_probability": 10.0,
+            "cloudcover": 50.0,
+        }
+    )
+
+
+def _create(compact: bool):
+    def on_connect(con):
+        con.execute("CREATE SCHEMA IF NOT EXISTS raw")
+        con.execute(raw_table_ddl(compact))
+
+    return on_connect
+
+
+def _count(con) -> int:
+    return con.execute("SELECT COUNT(*) FROM raw.weather_hourly").fetchone()[0]
+
+
+@pytest.fixture
+def con():
+    c = duckdb.connect()
+    _create(False)(c)
+    yield c
+    c.close()
+
+
+def test_duplicates_and_overlap_inside_one_batch(con):
+    a = pd.concat([_rows(range(5)), _rows([1, 3])])  # repetidas dentro do próprio frame
+    b = _rows(range(3, 8))  # 3-4 já vêm em a: contam para o primeiro
+    assert insert_batch(con, [a, b]) == [5, 3]
+    assert _count(con) == 8
+
+    # segunda passada: idênticas às gravadas não entram; valor diferente é linha nova
+    changed = _rows([7]).assign(temperature_2m=99.0)
+    assert insert_batch(con, [_rows(range(8)), changed]) == [0, 1]
+    assert _count(con) == 9
+
+
+def test_empty_frames_count_zero(con):
+    assert insert_batch(con, [_rows([]), _rows([0])]) == [0, 1]
+    assert insert_batch(con, [_rows([])]) == [0]
+
+
+def test_on_insert_sees_only_new_rows(con):
+    insert_batch(con, [_rows(range(3))])
+    seen = []
+    insert_batch(
+        con,
+        [_rows(range(5))],
+        on_insert=lambda c: seen.append(c.execute("SELECT COUNT(*) FROM _ingest_new").fetchone()[0]),
+    )
+    assert seen == [2]
+
+
+def test_writer_counts_per_request_and_isolates_bad_frame(tmp_path):
+    db = tmp_path / "w.duckdb"
+    batches = []
+    # tabela compacta: umidade 300 não cabe em UTINYINT e derruba o lote inteiro
+    w = IngestWriter(
+        db,
+        on_connect=_create(True),
+        on_insert=lambda c: batches.append(c.execute("SELECT COUNT(*) FROM _ingest_new").fetchone()[0]),
+        max_delay_s=0.5,
+    )
+    try:
+        futures = [
+            w.insert(_rows(range(4))),
+            w.insert(_rows(range(2, 6))),
+            w.insert(_rows(range(3), lat=-22.9, rh=300.0)),
+            w.insert(_rows(range(3), lat=-30.0)),
+        ]
+        assert futures[0].result(timeout=30) == 4
+        assert futures[1].result(timeout=30) == 2
+        with pytest.raises(duckdb.Error):
+            futures[2].result(timeout=30)
+        assert futures[3].result(timeout=30) == 3
+        # de novo, já no banco: nada novo
+        assert w.insert(_rows(range(6))).result(timeout=30) == 0
+    finally:
+        w.close()
+    assert batches == [4, 2, 3]  # lote desfeito, cada requisição boa regravada sozinha
+
+    with duckdb.connect(db.as_posix(), read_only=True) as c:
+        assert _count(c) == 9
+        assert c.execute("SELECT COUNT(*) FROM raw.weather_hourly WHERE latitude = -22.9").fetchone()[0] == 0